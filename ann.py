@@ -0,0 +1,74 @@
+import logging
+
+import numpy as np
+
+############################
+# HNSW 기반 근사 후보 생성 (Case B, Case C)
+############################
+# chroma_db_bge에 포함된 HNSW 인덱스로 필드별 상위 N개 문서를 조회하고 (하드필터는 where로 push-down),
+# 공고id 단위로 합집합한 후보 집합만 ScoringEngine으로 정확히 재채점한다.
+# 전수 채점 대비 Recall@k를 로그로 남겨 N을 튜닝할 수 있도록 한다.
+
+logger = logging.getLogger(__name__)
+
+
+def build_where(max_experience, locations, doc_type=None) -> dict:
+    """
+    하드필터 + 문서 type 조건을 Chroma where 절로 변환
+    locations: 전개된 "시도 시군구" 문자열 목록 (비어 있으면 조건 없음)
+    """
+    conditions = [{"경력": {"$lte": float(max_experience)}}]
+    if locations:
+        conditions.append({"근무위치": {"$in": list(locations)}})
+    if doc_type is not None:
+        conditions.append({"type": doc_type})
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def ann_candidate_mask(collection, engine, query_vectors: dict, max_experience, locations,
+                       n_results: int = 200) -> np.ndarray:
+    """
+    필드별 질의 벡터로 HNSW 인덱스에서 상위 n_results개 문서를 조회해
+    engine.job_ids 기준 후보 공고 bool 마스크 반환
+    query_vectors: {필드명: [질의 벡터, ...]}
+    """
+    mask = np.zeros(engine.n_jobs, dtype=bool)
+    for doc_type, vecs in query_vectors.items():
+        if len(vecs) == 0:
+            continue
+        try:
+            res = collection.query(
+                query_embeddings=[np.asarray(v, dtype=np.float32).tolist() for v in vecs],
+                n_results=n_results,
+                where=build_where(max_experience, locations, doc_type),
+                include=["metadatas"]
+            )
+        except Exception as e:
+            # 필터 결과가 n_results보다 작은 경우 등 -> 후보 제한 없이 전수 채점
+            logger.warning("ANN query failed for %s: %s", doc_type, e)
+            return engine.job_mask.copy()
+        for metas in res["metadatas"]:
+            mask |= engine.job_mask_for(m["공고id"] for m in metas)
+    return mask & engine.job_mask
+
+
+def recall_at_k(exact_ids, approx_ids, k: int = 5) -> float:
+    """전수 채점 상위 k개 중 근사 결과 상위 k개에 포함된 비율"""
+    exact = list(exact_ids)[:k]
+    if not exact:
+        return 1.0
+    return len(set(exact) & set(list(approx_ids)[:k])) / len(exact)
+
+
+def log_recall(engine, exact_scores, approx_ranked, job_mask=None, k: int = 5, n_results: int = None,
+               n_candidates: int = None) -> float:
+    """
+    전수 채점 결과와 근사 결과의 Recall@k를 계산해 로그로 남김 (N 튜닝용)
+    """
+    exact_ids = [j_id for j_id, _ in engine.rank(exact_scores, k=k, job_mask=job_mask)]
+    recall = recall_at_k(exact_ids, [j_id for j_id, _ in approx_ranked], k)
+    logger.info(
+        "ann recall@%d=%.3f n_results=%s candidates=%s jobs=%d",
+        k, recall, n_results, n_candidates, int(engine.job_mask.sum())
+    )
+    return recall
@@ -1,5 +1,4 @@
 import streamlit as st
-import openai
 import json
 import os
 import sys
@@ -7,7 +6,7 @@ import pandas as pd
 import numpy as np
 
 # [추가] Streamlit 캐시 사용을 위해 임포트
-from streamlit.runtime.caching import cache_data, cache_resource
+from streamlit.runtime.caching import cache_resource
 
 # sqlite3 대신 pysqlite3 사용
 try:
@@ -16,74 +15,279 @@ try:
 except Exception as e:
     st.warning(f"⚠️ sqlite3 업데이트 실패: {e}")
 
-import chromadb
-from chromadb.config import Settings
-from FlagEmbedding import BGEM3FlagModel
-import torch
+import contextlib
+import threading
 import time
-from transformers import AutoModel
+import logging
+
+# torch / transformers / chromadb / FlagEmbedding / openai / pyarrow 등 무거운 모듈은
+# 실제로 필요한 캐시 로더 안에서 지연 import (백그라운드 워밍업에서 미리 로드됨)
+from hard_filter import ALL_REGIONS, HardFilterIndex
+from pipeline import AnnOptions, SparseOptions, build_soft_filter_dict, recommend
+from sparse_index import SPARSE_INDEX_NAME, SparseIndex
+from colbert_rerank import COLBERT_DIR_NAME, INDEX_NAME as COLBERT_INDEX_NAME, ColbertReranker, ColbertStore
+from locations import location_dict
+from posting_store import CARD_COLUMNS
+from text_format import DETAIL_FIELDS, PREVIEW_CHARS, add_display_columns, has_display_columns, preview_column
+from warmup import Warmup
+from metrics import MetricsRegistry
+from result_cache import ResultCache, profile_key
+from session_result import SessionResult
+from posting_digest import digest_column
+from rationale import (
+    RATIONALE_ERROR_TEXT, RATIONALE_MODEL, RATIONALE_SYSTEM_PROMPT, BackgroundStream, build_rationale_prompt,
+    explain_locally, generate_parallel, prompt_token_stats
+)
+
+logger = logging.getLogger("servicedemo")
 
 ############################
 # 0) GPT API Key
 ############################
-openai.api_key = st.secrets["OPENAI_API_KEY"]
-client = openai.OpenAI(api_key=openai.api_key)
+@cache_resource(show_spinner=False)
+def get_openai_client():
+    """
+    OpenAI 클라이언트를 한 번만 생성하여 모든 세션이 공유
+    """
+    import openai
+    openai.api_key = st.secrets["OPENAI_API_KEY"]
+    return openai.OpenAI(api_key=openai.api_key)
+
+@cache_resource(show_spinner=False)
+def get_rationale_runner():
+    """
+    공고별 추천 사유를 동시에 생성하는 AsyncOpenAI 실행기 (전용 이벤트 루프 스레드, 모든 세션이 공유)
+    """
+    import openai
+    from rationale import AsyncRationaleRunner
+
+    api_key = st.secrets["OPENAI_API_KEY"]
+    return AsyncRationaleRunner(lambda: openai.AsyncOpenAI(api_key=api_key), RATIONALE_CONCURRENCY)
 
 ############################
-# 들여쓰기 처리를 위한 기호 목록 (최상단에만 존재)
+# 워밍업 설정
 ############################
-INDENTATION_MARKERS = [
-    "1)", "2)", "3)", "4)", "5)", "6)", "7)", "8)", "9)", "10)", "-", "[",
-    "1. ", "2. ", "3. ", "4. ", "5. ", "6. ", "7. ", "8. ", "9.", "10. ",
-    "■", "●", "ㆍ", "·", "•", "ㅇ", "“", "‘", "[1]", "[2]", "[3]", "[4]", "[5]", "[6]", "[7]", "[8]", "[9]", "[10]",
-    "(1)", "(2)", "(3)", "(4)", "(5)", "(6)", "(7)", "(8)", "(9)", "(10)", "○", "▪", "▶", "•", "【"
-]
+# WARMUP_ENABLED: 프로세스 시작 시 백그라운드에서 모델/스냅샷/인덱스/공고 저장소 미리 로드
+# WARMUP_READY_FILE: 준비 완료 시 생성할 파일 경로 (헬스체크용, 선택)
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "1") == "1"
+WARMUP_READY_FILE = os.environ.get("WARMUP_READY_FILE") or None
 
 ############################
-# 공통 유틸 함수 (apply_indentation, display_partial_text)
+# 근사 검색(ANN) 설정 (Case B, C)
 ############################
-def apply_indentation(text):
-    lines = text.split('\n')
-    indented_lines = []
-    for line in lines:
-        if any(line.strip().startswith(marker) for marker in INDENTATION_MARKERS):
-            indented_lines.append(f"    {line.strip()}")
-        else:
-            indented_lines.append(line)
-    return '\n'.join(indented_lines)
+# ANN_ENABLED: HNSW 인덱스로 필드별 상위 ANN_TOP_N개 후보만 정확히 재채점
+# ANN_MIN_JOBS: 하드필터 통과 공고 수가 이보다 적으면 전수 채점
+# ANN_EVAL_RATE: 전수 채점과 비교해 Recall@5를 로그로 남길 요청 비율
+ANN_ENABLED = os.environ.get("ANN_ENABLED", "0") == "1"
+ANN_TOP_N = int(os.environ.get("ANN_TOP_N", "200"))
+ANN_MIN_JOBS = int(os.environ.get("ANN_MIN_JOBS", "2000"))
+ANN_EVAL_RATE = float(os.environ.get("ANN_EVAL_RATE", "0.0"))
+
+############################
+# 자격요건및우대사항 sparse(lexical) 채점 설정
+############################
+# SPARSE_MODE: "dense" (기존), "sparse" (sparse 점수로 대체), "hybrid" (sparse 후보 축소 + dense + alpha * sparse)
+# sparse 역색인은 python ingest.py --sparse 로 chroma_db_bge/sparse_skills.npz에 생성
+SPARSE_MODE = os.environ.get("SPARSE_MODE", "dense")
+SPARSE_TOP_N = int(os.environ.get("SPARSE_TOP_N", "500"))
+SPARSE_ALPHA = float(os.environ.get("SPARSE_ALPHA", "0.3"))
+
+############################
+# ColBERT 재순위 설정
+############################
+# COLBERT_RERANK: dense 상위 COLBERT_TOP_N개 공고를 ColBERT MaxSim으로 재순위 (python ingest.py --colbert 필요)
+# COLBERT_BUDGET_MS: 요청당 재순위 시간 예산, 초과 시 dense 순서 사용
+COLBERT_RERANK = os.environ.get("COLBERT_RERANK", "0") == "1"
+COLBERT_TOP_N = int(os.environ.get("COLBERT_TOP_N", "50"))
+COLBERT_BUDGET_MS = float(os.environ.get("COLBERT_BUDGET_MS", "150"))
+
+############################
+# 질의 인코더 백엔드 설정
+############################
+# ENCODER_BACKEND: "fp32" (기존 경로), "int8" (동적 양자화 PyTorch), "onnx" (onnxruntime 필요)
+ENCODER_BACKEND = os.environ.get("ENCODER_BACKEND", "fp32")
+
+############################
+# 질의 임베딩 마이크로 배치 설정
+############################
+# EMBED_BATCHING: 모든 세션의 dense 질의 인코딩을 전용 스레드 하나에서 마이크로 배치로 처리
+# EMBED_MAX_BATCH: 한 번에 인코딩할 최대 텍스트 수
+# EMBED_MAX_WAIT_MS: 첫 요청 이후 다른 세션의 요청을 기다리는 최대 시간
+EMBED_BATCHING = os.environ.get("EMBED_BATCHING", "1") == "1"
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", "32"))
+EMBED_MAX_WAIT_MS = float(os.environ.get("EMBED_MAX_WAIT_MS", "5"))
+
+############################
+# 임베딩 양자화 설정
+############################
+# EMBEDDING_QUANTIZATION: "" (float32), "int8", "float16"
+# EMBEDDING_RESCORE_K: 양자화 1차 채점 후 full-precision으로 재채점할 상위 공고 수
+EMBEDDING_QUANTIZATION = os.environ.get("EMBEDDING_QUANTIZATION", "")
+EMBEDDING_RESCORE_K = int(os.environ.get("EMBEDDING_RESCORE_K", "300"))
+
+############################
+# 증분 색인 반영 설정
+############################
+# SNAPSHOT_CHECK_INTERVAL: reindex.py가 남긴 변경 목록을 확인하는 최소 간격(초)
+SNAPSHOT_CHECK_INTERVAL = float(os.environ.get("SNAPSHOT_CHECK_INTERVAL", "30"))
 
-def display_partial_text(label: str, text: str, char_limit=100):
+############################
+# 호스트 공유 스냅샷 설정
+############################
+# SHARED_SNAPSHOT: 임베딩 스냅샷을 chroma_db_bge/shared_snapshot/에 한 번만 발행하고
+# 같은 호스트의 모든 Streamlit 프로세스가 메모리 매핑으로 공유 (프로세스를 여러 개 띄울 때 사용)
+SHARED_SNAPSHOT = os.environ.get("SHARED_SNAPSHOT", "0") == "1"
+
+############################
+# 단계별 지연 메트릭 설정
+############################
+# METRICS_PORT: Prometheus 텍스트 형식 /metrics 엔드포인트 포트 (0이면 비활성화)
+#   한 호스트에 Streamlit 프로세스가 여럿이면 먼저 뜬 프로세스만 포트를 사용하고 나머지는 경고 후 엔드포인트 없이 실행
+#   (프로세스별로 다른 METRICS_PORT를 지정하면 모두 노출)
+# METRICS_JSONL_PATH: 요청 단위 단계별 시간을 남길 rolling JSONL 경로 (비우면 기록하지 않음)
+# METRICS_JSONL_MAX_MB: JSONL 파일이 이 크기를 넘으면 .1로 교체
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_JSONL_PATH = os.environ.get("METRICS_JSONL_PATH") or None
+METRICS_JSONL_MAX_MB = int(os.environ.get("METRICS_JSONL_MAX_MB", "50"))
+
+############################
+# 검색 결과 / 추천 사유 캐시 설정
+############################
+# RESULT_CACHE_ENABLED: 정규화한 검색 조건이 같으면 추천 결과와 추천 사유(GPT 호출)를 재사용
+# RESULT_CACHE_SIZE: 최대 항목 수 (LRU), RESULT_CACHE_TTL: 항목 유효 시간(초)
+# 색인 버전(reindex.py 변경 목록)이 바뀌면 이전 항목은 자동으로 무효화
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "1") == "1"
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "3600"))
+
+############################
+# 결과 표시 설정
+############################
+# RESULT_TOP_K: 추천할 공고 수 (페이지로 나누어 표시)
+# RESULT_PAGE_SIZE: 한 페이지에 표시할 공고 수 (추천 사유는 첫 페이지 공고 기준)
+RESULT_TOP_K = int(os.environ.get("RESULT_TOP_K", "5"))
+RESULT_PAGE_SIZE = int(os.environ.get("RESULT_PAGE_SIZE", "5"))
+
+############################
+# 추천 사유 프롬프트 설정
+############################
+# RATIONALE_DIGEST: 공고 원문 대신 공고 저장소의 필드별 요약 컬럼(posting_digest.py)으로 프롬프트 구성
+# 요청마다 보낸 프롬프트와 원문 기준 프롬프트(단일 프롬프트일 때만)의 토큰 수를 로그 / 요청 메트릭(JSONL)에 남김
+RATIONALE_DIGEST = os.environ.get("RATIONALE_DIGEST", "1") == "1"
+# RATIONALE_DEADLINE: GPT 첫 토큰 기한 (초, 0이면 사용 안 함). 기한 안에 응답이 없거나 호출이 실패하면
+#   필드별 유사도 + 문장 단위 유사도 기반 로컬 설명을 먼저 보여주고, 늦게 온 GPT 응답으로 교체
+#   (로컬 설명은 기한의 절반이 지나도 첫 토큰이 없을 때부터 준비하고, 문장 인코딩은 남은 기한 안에서만 함)
+RATIONALE_DEADLINE = float(os.environ.get("RATIONALE_DEADLINE", "6"))
+# RATIONALE_POLL_SECONDS: 대체 설명을 보여준 뒤 늦은 GPT 응답 완료를 확인하는 간격 (초, 추천 사유 영역만 다시 실행)
+RATIONALE_POLL_SECONDS = float(os.environ.get("RATIONALE_POLL_SECONDS", "2"))
+# RATIONALE_PARALLEL: Top N 공고를 한 프롬프트 대신 공고별 요청으로 나눠 AsyncOpenAI로 동시에 생성 (순위 순서로 표시)
+# RATIONALE_CONCURRENCY: 프로세스 전체 동시 GPT 호출 수 상한
+# POSTING_RATIONALE_CACHE_SIZE: 공고별 설명 캐시 항목 수 (RESULT_CACHE_ENABLED일 때, TTL은 RESULT_CACHE_TTL)
+RATIONALE_PARALLEL = os.environ.get("RATIONALE_PARALLEL", "1") == "1"
+RATIONALE_CONCURRENCY = int(os.environ.get("RATIONALE_CONCURRENCY", "8"))
+POSTING_RATIONALE_CACHE_SIZE = int(os.environ.get("POSTING_RATIONALE_CACHE_SIZE", "4096"))
+
+############################
+# 공통 유틸 함수 (render_job_cards)
+############################
+# 들여쓰기 기호 목록(INDENTATION_MARKERS)과 표시용 텍스트 사전 계산은 text_format.py 참고
+def render_job_cards(df: pd.DataFrame, start_rank: int = 1, details: bool = True):
     """
-    label: 섹션 라벨 (예: '주요 업무', '자격 요건' 등)
-    text: 실제 텍스트
-    char_limit: 미리보기 길이 제한
+    공고 카드 목록 출력 (제출 직후 / 분석 결과 표시에서 공통 사용)
+    df: fetch_postings 결과 (posting_store.CARD_COLUMNS + 최종점수)
+    start_rank: 첫 카드의 순위 (페이지 오프셋)
+    details: 상세 보기 토글 표시 여부. 켠 카드만 공고 저장소에서 전체 텍스트를 읽음
     """
-    if not text or pd.isna(text):
-        st.markdown(f"**{label}:** 내용이 게시되어 있지 않아요!")
-        return
-
-    text = apply_indentation(text)
-    if len(text) <= char_limit:
-        st.markdown(f"**{label}:**")
-        st.text(text)
-    else:
-        truncated = text[:char_limit] + "..."
-        st.markdown(f"**{label}:**")
-        st.text(truncated)
-        with st.expander("상세 보기"):
-            st.text(text)
+    for rank, row in enumerate(df.to_dict("records"), start=start_rank):
+        st.markdown(f"### Top {rank}: {row['공고제목']}")
+        st.markdown(f"**회사명:** {row['회사명']}")
+
+        previews = {field: row.get(preview_column(field)) or "" for field in DETAIL_FIELDS}
+        full_text = None
+        if details and any(len(text) > PREVIEW_CHARS for text in previews.values()):
+            # 같은 공고id가 한 화면에 두 번 나와도 위젯 키가 겹치지 않도록 순위(페이지 오프셋 포함)를 키에 포함
+            if st.toggle("상세 보기", key=f"detail_{rank}_{row['공고id']}"):
+                full_text = get_posting_store().get_details(row["공고id"])
+
+        for field, label in DETAIL_FIELDS.items():
+            if not previews[field]:
+                st.markdown(f"**{label}:** 내용이 게시되어 있지 않아요!")
+                continue
+            st.markdown(f"**{label}:**")
+            st.text(full_text[field] if full_text else previews[field])
+
+        st.markdown(f"**근무 위치:** {row.get('근무위치','')}")
+        exp_val = row.get("경력",0)
+        exp_str = "신입" if int(exp_val) == 0 else f"{int(exp_val)}년 이상"
+        st.markdown(f"**경력:** {exp_str}")
+        st.markdown(f"**최종 점수:** {row.get('최종점수','0.0')}")
+        url_val = row.get("공고상세url", "")
+        if pd.notna(url_val) and url_val:
+            st.markdown(f"""
+                <a href="{url_val}" target="_blank" style="
+                    text-decoration: underline;
+                    color: #006400;
+                    background-color: transparent;
+                    padding: 0;
+                    font-weight: bold;
+                ">🔗 바로가기</a>
+            """, unsafe_allow_html=True)
+        st.markdown("""
+            <div style="height: 1px; background-color: #006400; margin-bottom: 20px;"></div>
+        """, unsafe_allow_html=True)
+
+def render_pagination(n_results: int, page_size: int = RESULT_PAGE_SIZE) -> int:
+    """
+    이전/다음 버튼으로 st.session_state["result_page"]를 이동하고 현재 페이지 번호 반환
+    """
+    n_pages = max(1, -(-n_results // page_size))
+    page = min(st.session_state.get("result_page", 0), n_pages - 1)
+    st.session_state["result_page"] = page
+    if n_pages == 1:
+        return page
+
+    def move(delta):
+        st.session_state["result_page"] = min(max(st.session_state["result_page"] + delta, 0), n_pages - 1)
+
+    prev_col, label_col, next_col = st.columns([1, 2, 1])
+    prev_col.button("◀ 이전", on_click=move, args=(-1,), disabled=page == 0, key="result_prev")
+    label_col.markdown(
+        f"<div style='text-align: center;'>{page + 1} / {n_pages} 페이지</div>", unsafe_allow_html=True
+    )
+    next_col.button("다음 ▶", on_click=move, args=(1,), disabled=page >= n_pages - 1, key="result_next")
+    return page
 
 ############################
-# [추가] 엑셀 파일 캐싱 로드
+# [추가] 공고 저장소 캐싱 로드
 ############################
-@cache_data(show_spinner=False)
-def load_all_excel_data(path:str = "./all_raw.xlsx") -> pd.DataFrame:
+@cache_resource(show_spinner=False)
+def get_posting_store(path: str = "./all_raw.arrow", xlsx_path: str = "./all_raw.xlsx"):
     """
-    all_raw.xlsx 데이터를 한 번만 로드 후 캐싱
-    여러 사용자가 동시에 접근해도 파일을 중복로드하지 않도록 함
+    all_raw.xlsx를 변환한 Arrow 파일을 메모리 매핑으로 한 번만 열어 모든 세션이 공유
+    Arrow 파일이 없으면 최초 1회 엑셀에서 변환
+    """
+    from posting_store import PostingStore
+    return PostingStore.open(path, xlsx_path)
+
+def fetch_postings(job_ids, scores=None, columns=CARD_COLUMNS, rerank_scores=None) -> pd.DataFrame:
     """
-    df = pd.read_excel(path)
-    df["공고id"] = df["공고id"].astype(str)
+    공고id 순서대로 공고 행을 조회하고 최종점수 컬럼을 붙임 (같은 공고id가 여러 행이어도 카드는 공고당 하나)
+    scores: {공고id: 점수} (None이면 0.0)
+    columns: 조회할 컬럼 (None이면 전체)
+    rerank_scores: {공고id: ColBERT MaxSim 점수} (있으면 재순위점수 컬럼으로 별도 추가)
+    """
+    store = get_posting_store()
+    if columns is None or has_display_columns(store.columns):
+        df = store.get_rows(job_ids, columns, unique=True)
+    else:
+        # 표시용 컬럼이 없는 저장소(엑셀 없이 이전 형식 Arrow 파일만 있는 경우)는 조회한 행만 계산
+        df = add_display_columns(store.get_rows(job_ids, list(columns) + list(DETAIL_FIELDS), unique=True))
+    if scores is None:
+        df["최종점수"] = 0.0
+    else:
+        df["최종점수"] = df["공고id"].apply(lambda x: round(scores.get(str(x), 0.0), 4))
+    if rerank_scores is not None:
+        df["재순위점수"] = df["공고id"].apply(lambda x: round(rerank_scores.get(str(x), 0.0), 4))
     return df
 
 ############################
@@ -94,6 +298,8 @@ def get_bge_model():
     """
     BGE 모델을 한 번만 로드하여 모든 세션(사용자)이 공유하도록 함
     """
+    from FlagEmbedding import BGEM3FlagModel
+
     # 로그 출력문 제거
     model = BGEM3FlagModel(
         'BAAI/bge-m3',
@@ -102,6 +308,31 @@ def get_bge_model():
     )
     return model
 
+############################
+# [추가] 질의 인코더 캐싱
+############################
+@cache_resource(show_spinner=False)
+def get_query_encoder(backend: str = "fp32"):
+    """
+    BGE 모델 가중치/토크나이저를 공유하는 질의 인코더 (fp32, int8, onnx)
+    """
+    from encoder import make_encoder
+    return make_encoder(backend, get_bge_model(), max_length=1024)
+
+@cache_resource(show_spinner=False)
+def get_embedding_batcher(backend: str = "fp32"):
+    """
+    세션 공용 마이크로 배치 인코더 (EmbeddingBatcher.encode를 질의 인코더 대신 사용)
+    """
+    from embed_batcher import EmbeddingBatcher
+    return EmbeddingBatcher(get_query_encoder(backend).encode, EMBED_MAX_BATCH, EMBED_MAX_WAIT_MS)
+
+def get_dense_encode(backend: str = "fp32"):
+    """dense 질의 인코딩 함수 (EMBED_BATCHING이면 마이크로 배치 경유)"""
+    if EMBED_BATCHING:
+        return get_embedding_batcher(backend).encode
+    return get_query_encoder(backend).encode
+
 ############################
 # [추가] ChromaDB 컬렉션 캐싱
 ############################
@@ -111,11 +342,134 @@ def get_chroma_collection(db_path: str = "./chroma_db_bge", collection_name: str
     chroma_db를 한 번만 생성하여 모든 세션이 공유.
     읽기 전용으로 사용 시 동시 접근 문제가 줄어듦.
     """
+    import chromadb
+
     # 로그 출력문 제거
     client_chroma = chromadb.PersistentClient(path=db_path)
     collection = client_chroma.get_collection(collection_name)
     return collection
 
+############################
+# [추가] 임베딩 스냅샷 + 하드필터 인덱스 캐싱
+############################
+@cache_resource(show_spinner=False)
+def get_snapshot_refresher(db_path: str = "./chroma_db_bge", collection_name: str = "job_postings_collection"):
+    """
+    컬렉션의 임베딩/메타데이터를 프로세스당 한 번만 읽어 읽기 전용 스냅샷으로 공유하고,
+    location_dict와 스냅샷 메타데이터로 근무위치 비트맵 / 경력 정렬 배열(하드필터 인덱스)을 구성.
+    하드필터와 점수 계산은 이 스냅샷 위에서 수행되어 요청마다 Chroma를 조회하지 않음.
+    증분 색인(reindex.py)이 변경 목록을 남기면 바뀐 문서만 다시 읽어 스냅샷/인덱스를 교체.
+    SHARED_SNAPSHOT이면 스냅샷 배열은 호스트 공유 발행본을 메모리 매핑으로 참조 (프로세스별 복사 없음).
+    """
+    from reindex import SnapshotRefresher
+    from shared_snapshot import SharedSnapshotStore
+
+    collection = get_chroma_collection(db_path, collection_name)
+    shared = SharedSnapshotStore.for_db(db_path, EMBEDDING_QUANTIZATION) if SHARED_SNAPSHOT else None
+    snapshot_kwargs = {}
+    if EMBEDDING_QUANTIZATION:
+        # 1차 채점은 양자화 행렬, full-precision은 디스크에 내려 메모리 매핑으로 재채점 시에만 사용
+        # (공유 스냅샷은 발행본 자체가 메모리 매핑이므로 별도 파일 불필요)
+        snapshot_kwargs = {"quantization": EMBEDDING_QUANTIZATION, "rescore_k": EMBEDDING_RESCORE_K}
+        if shared is None:
+            snapshot_kwargs["full_precision_path"] = os.path.join(db_path, "snapshot_float32.npy")
+    return SnapshotRefresher(
+        collection,
+        db_path,
+        lambda snapshot: HardFilterIndex.from_snapshot(snapshot, location_dict),
+        check_interval=SNAPSHOT_CHECK_INTERVAL,
+        shared=shared,
+        **snapshot_kwargs
+    )
+
+############################
+# [추가] sparse 역색인 캐싱
+############################
+@cache_resource(show_spinner=False, max_entries=1)
+def get_sparse_index(path: str, mtime: float):
+    """
+    자격요건및우대사항 sparse 역색인 (파일 수정 시각이 바뀌면 다시 로드 - reindex.py 반영)
+    """
+    return SparseIndex.load(path)
+
+def get_sparse_options(db_path: str = "./chroma_db_bge"):
+    """SPARSE_MODE가 dense가 아니고 역색인 파일이 있을 때만 SparseOptions 반환"""
+    if SPARSE_MODE == "dense":
+        return None
+    path = os.path.join(db_path, SPARSE_INDEX_NAME)
+    if not os.path.exists(path):
+        logger.warning("SPARSE_MODE=%s but %s is missing; using dense scoring", SPARSE_MODE, path)
+        return None
+    return SparseOptions(
+        get_sparse_index(path, os.path.getmtime(path)),
+        get_query_encoder(ENCODER_BACKEND).encode_sparse,
+        mode=SPARSE_MODE, top_n=SPARSE_TOP_N, alpha=SPARSE_ALPHA
+    )
+
+############################
+# [추가] ColBERT 토큰 벡터 저장소 캐싱
+############################
+@cache_resource(show_spinner=False, max_entries=1)
+def get_colbert_store(path: str, mtime: float):
+    """
+    float16 토큰 벡터 파일을 메모리 매핑 (색인 파일 수정 시각이 바뀌면 다시 열기 - reindex.py 반영)
+    """
+    return ColbertStore(path)
+
+@cache_resource(show_spinner=False, max_entries=1)
+def get_colbert_reranker_for(path: str, mtime: float):
+    """
+    저장소 버전별 ColbertReranker (요청 간에 측정한 질의 인코딩 비용 추정치를 유지)
+    """
+    return ColbertReranker(
+        get_colbert_store(path, mtime),
+        get_query_encoder(ENCODER_BACKEND).encode_colbert,
+        top_n=COLBERT_TOP_N, budget_ms=COLBERT_BUDGET_MS
+    )
+
+def get_colbert_reranker(db_path: str = "./chroma_db_bge"):
+    """COLBERT_RERANK가 켜져 있고 저장소가 있을 때만 ColbertReranker 반환"""
+    if not COLBERT_RERANK:
+        return None
+    path = os.path.join(db_path, COLBERT_DIR_NAME)
+    index_path = os.path.join(path, COLBERT_INDEX_NAME)
+    if not os.path.exists(index_path):
+        logger.warning("COLBERT_RERANK=1 but %s is missing; using dense order", index_path)
+        return None
+    return get_colbert_reranker_for(path, os.path.getmtime(index_path))
+
+@cache_resource(show_spinner=False)
+def get_metrics():
+    """
+    프로세스 단위 메트릭 저장소 (모든 세션이 공유)
+    단계: hard_filter, embed, score, rerank, join, render, rationale_ttft, rationale, total
+    태그: Case(A~D), 하드필터 통과 공고 수 구간, 소프트필터 개수
+    """
+    registry = MetricsRegistry(jsonl_path=METRICS_JSONL_PATH, jsonl_max_bytes=METRICS_JSONL_MAX_MB * 2 ** 20)
+    if METRICS_PORT:
+        registry.serve(METRICS_PORT)
+    return registry
+
+@cache_resource(show_spinner=False)
+def get_result_cache():
+    """
+    모든 세션이 공유하는 검색 결과 / 추천 사유 캐시 (적중률, 절약한 LLM 호출 수를 /metrics에 노출)
+    """
+    cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+    get_metrics().add_collector(cache.prometheus_lines)
+    return cache
+
+@cache_resource(show_spinner=False)
+def get_posting_rationale_cache():
+    """
+    공고별 추천 사유 캐시 ((공고id, 소프트필터 조건) 단위, 모든 세션이 공유)
+    """
+    cache = ResultCache(
+        POSTING_RATIONALE_CACHE_SIZE, RESULT_CACHE_TTL, name="posting_rationale_cache", llm_values=True
+    )
+    get_metrics().add_collector(cache.prometheus_lines)
+    return cache
+
 ############################
 # 1) 세션 상태 초기화
 ############################
@@ -128,54 +482,39 @@ if "selected_sido" not in st.session_state:
 ############################
 # 2) 한국 시도/시군구 데이터
 ############################
-location_dict = {
-    "서울": ["종로구", "중구", "용산구", "성동구", "광진구", "동대문구", "중랑구", "성북구",
-             "강북구", "도봉구", "노원구", "은평구", "서대문구", "마포구", "양천구",
-             "강서구", "구로구", "금천구", "영등포구", "동작구", "관악구", "서초구",
-             "강남구", "송파구", "강동구"],
-    "부산": ["중구", "서구", "동구", "영도구", "부산진구", "동래구", "남구", "북구",
-             "해운대구", "사하구", "금정구", "강서구", "연제구", "수영구", "사상구",
-             "기장군"],
-    "대구": ["중구", "동구", "서구", "남구", "북구", "수성구", "달서구", "달성군", "군위군"],
-    "인천": ["강화군", "옹진군", "중구", "동구", "미추홀구", "연수구", "남동구",
-             "부평구", "계양구", "서구"],
-    "광주": ["동구", "서구", "남구", "북구", "광산구"],
-    "대전": ["동구", "중구", "서구", "유성구", "대덕구"],
-    "울산": ["중구", "남구", "동구", "북구", "울주군"],
-    "세종": [],
-    "경기": ["수원시", "고양시", "용인시", "성남시", "부천시", "화성시", "안산시",
-             "남양주시", "안양시", "평택시", "시흥시", "파주시", "의정부시",
-             "김포시", "광주시", "광명시", "군포시", "하남시", "오산시", "양주시",
-             "이천시", "구리시", "안성시", "포천시", "의왕시", "양평군", "여주시",
-             "동두천시", "과천시", "가평군", "연천군"],
-    "강원": ["춘천시", "원주시", "강릉시", "동해시", "태백시", "속초시", "삼척시",
-             "홍천군", "횡성군", "영월군", "평창군", "정선군", "철원군", "화천군",
-             "양구군", "인제군", "고성군", "양양군"],
-    "충북": ["청주시", "충주시", "제천시", "보은군", "옥천군", "영동군", "증평군",
-             "진천군", "괴산군", "음성군", "단양군"],
-    "충남": ["천안시", "공주시", "보령시", "아산시", "서산시", "논산시", "계룡시",
-             "당진시", "금산군", "부여군", "서천군", "청양군", "홍성군", "예산군",
-             "태안군"],
-    "전북": ["전주시", "군산시", "익산시", "정읍시", "남원시", "김제시", "완주군",
-             "진안군", "무주군", "장수군", "임실군", "순창군", "고창군", "부안군"],
-    "전남": ["목포시", "여수시", "순천시", "나주시", "광양시", "담양군", "곡성군",
-             "구례군", "고흥군", "보성군", "화순군", "장흥군", "강진군", "해남군",
-             "영암군", "무안군", "함평군", "영광군", "장성군", "완도군", "진도군",
-             "신안군"],
-    "경북": ["포항시", "경주시", "김천시", "안동시", "구미시", "영주시", "영천시",
-             "상주시", "문경시", "경산시", "의성군", "청송군", "영양군", "영덕군",
-             "청도군", "고령군", "성주군", "칠곡군", "예천군", "봉화군", "울진군",
-             "울릉군"],
-    "경남": ["창원시", "진주시", "통영시", "사천시", "김해시", "밀양시", "거제시",
-             "양산시", "의령군", "함안군", "창녕군", "고성군", "남해군", "하동군",
-             "산청군", "함양군", "거창군", "합천군"],
-    "제주": ["제주시", "서귀포시"]
-}
+# locations.py의 location_dict 사용 (UI와 하드필터 인덱스에서 공유)
+
+############################
+# 2-1) 백그라운드 워밍업 (프로세스당 한 번)
+############################
+@cache_resource(show_spinner=False)
+def start_warmup():
+    """
+    BGE 모델 로드 + 더미 encode, 임베딩 스냅샷, 하드필터 인덱스, 공고 저장소를
+    백그라운드 스레드에서 미리 로드. 첫 사용자가 모든 로드 시간을 기다리지 않도록 함
+    """
+    db_path = "./chroma_db_bge"
+    return Warmup(
+        [
+            ("query_encoder", lambda: get_dense_encode(ENCODER_BACKEND)(["warmup"])),
+            ("embedding_snapshot", lambda: get_snapshot_refresher(db_path, "job_postings_collection")),
+            ("posting_store", lambda: get_posting_store()),
+            ("openai_client", lambda: get_rationale_runner() if RATIONALE_PARALLEL else get_openai_client()),
+        ],
+        ready_file=WARMUP_READY_FILE
+    ).start()
+
+warmup = start_warmup() if WARMUP_ENABLED else None
 
 ############################
 # 3) Streamlit 기본 UI
 ############################
 st.title("💬 맞춤형 채용 공고 추천 서비스")
+if warmup is not None and not warmup.ready:
+    if warmup.status == "failed":
+        st.caption("⚠️ 사전 로딩에 실패했어요. 첫 검색 시 다시 불러올게요.")
+    else:
+        st.caption("⏳ 추천 모델을 준비하고 있어요. 준비 전에 검색하시면 조금 더 오래 걸릴 수 있어요.")
 st.markdown("""
     <div style="height: 4px; background-color: #006400; margin-bottom: 20px;"></div>
 """, unsafe_allow_html=True)
@@ -212,23 +551,40 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 ############################
-# '맞춤형 채용 공고 추천' UI
+# 화면 영역 (fragment)
 ############################
-if st.session_state["selected_tab"] == "job_recommendation":
-    st.subheader("👍 지원자님의 요청 사항에 맞는 공고들을 추천해드려요.")
-    st.subheader("""
-    📌 **입력 시 안내사항**
-
-    입력하실 때 불확실하거나 모호한 부분이 있어도 걱정하지 마세요!  
-    해당 내용은 생략하셔도 괜찮으며, 제공해주신 정보만으로도 최적의 채용 공고를 추천해드릴게요.
-    """)
-
+# 위젯 조작 시 페이지 전체가 아니라 해당 영역(fragment)만 다시 실행한다.
+# - 입력 폼(job_inputs, preference_inputs), 근무 위치 선택(location_picker): 위젯 값은 key로 session_state에 보관
+# - 결과(results_panel): 페이지 이동 / 상세 보기 토글은 결과 영역만 다시 실행
+# - 추천 사유(rationale_panel): 저장된 설명만 표시
+#   대체 설명을 보여주고 늦은 GPT 응답을 기다리는 동안은 late_rationale_panel이 RATIONALE_POLL_SECONDS마다
+#   이 영역만 다시 실행해 확인하고, 응답이 끝나면 st.rerun()을 한 번 호출해 폴링 없는 rationale_panel로 돌아감
+# 결과와 추천 사유는 제출한 실행에서만 새로 그려지며, 그 외 제출 후 추가 st.rerun()은 하지 않는다.
+# st.fragment가 없는 Streamlit 버전에서는 일반 함수로 동작 (전체 재실행, 늦은 응답은 다음 실행부터 표시)
+_st_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+fragment = _st_fragment or (lambda func: func)
+
+def polling_fragment(run_every: float):
+    """run_every초마다 해당 영역만 다시 실행되는 fragment (st.fragment가 없으면 일반 함수)"""
+    return _st_fragment(run_every=run_every) if _st_fragment is not None else (lambda func: func)
+
+SUBMIT_LABEL = "🚀 답변 제출"
+
+@fragment
+def job_inputs():
+    """(1) 직무명, (2) 경력"""
     # (1) 지원 직무(공고제목)
-    job_title = st.text_input("1️⃣ 지원하고자 하는 **직무명**을 작성해주세요.", placeholder="예) 데이터 분석가")
+    st.text_input("1️⃣ 지원하고자 하는 **직무명**을 작성해주세요.", placeholder="예) 데이터 분석가", key="job_title")
 
     # (2) 경력
-    experience = st.slider("2️⃣ 지원하고자 하는 분야와 관련된 **경력**(근무 연수)을 선택해주세요.", 0, 20, 0)
+    st.slider("2️⃣ 지원하고자 하는 분야와 관련된 **경력**(근무 연수)을 선택해주세요.", 0, 20, 0, key="experience")
 
+@fragment
+def location_picker():
+    """
+    (3) 시/도, (4) 시/군/구 선택. 선택 결과는 지역 키 목록으로 st.session_state["selected_regions"]에 저장
+    (이 영역의 multiselect 조작은 이 fragment만 다시 실행)
+    """
     # (3) 근무 시/도 선택
     if st.session_state["selected_sido"] == ["전체"]:
         sido_options = ["전체"]
@@ -253,18 +609,15 @@ if st.session_state["selected_tab"] == "job_recommendation":
     )
 
     # (4) 시/군/구 선택
-    selected_sigungu = []
+    # 근무위치는 지역 키("전체", 시/도명, "시도 시군구", "세종")로 보관하고
+    # 하드필터 인덱스의 비트맵으로 바로 조회 (시군구 문자열 목록으로 전개하지 않음)
+    selected_regions = []
     if st.session_state["selected_sido"] == ["전체"]:
-        for sido_key, sigungu_list in location_dict.items():
-            if sido_key == "세종":
-                selected_sigungu.append("세종")
-            else:
-                for sg in sigungu_list:
-                    selected_sigungu.append(f"{sido_key} {sg}")
+        selected_regions.append(ALL_REGIONS)
     else:
         for sido in st.session_state["selected_sido"]:
             if sido == "세종":
-                selected_sigungu.append("세종")
+                selected_regions.append("세종")
                 continue
 
             sigungu_key = f"selected_sigungu_{sido}"
@@ -307,538 +660,434 @@ if st.session_state["selected_tab"] == "job_recommendation":
                 continue
 
             if st.session_state[sigungu_key] == ["전체"]:
-                for sg in location_dict[sido]:
-                    selected_sigungu.append(f"{sido} {sg}")
+                selected_regions.append(sido)
             else:
                 for sg in st.session_state[sigungu_key]:
-                    selected_sigungu.append(f"{sido} {sg}")
+                    selected_regions.append(f"{sido} {sg}")
+
+    st.session_state["selected_regions"] = selected_regions
 
+@fragment
+def preference_inputs():
+    """(5) 업무, (6) 스킬 및 툴, (7) 혜택 및 복지 + 각 중요도 (내용을 입력한 항목만 중요도 표시)"""
     # (5) 원하는 업무(주요업무)
-    job_task = st.text_area("4️⃣ 원하시는 **업무**를 작성해주세요.", placeholder="예) 저는 데이터 분석 및 시각화를 하고 싶어요.")
-    job_task_importance = (
-        st.slider("⭐️ 중요도", 1, 5, 3, key="job_task_importance") if job_task else None
-    )
+    if st.text_area("4️⃣ 원하시는 **업무**를 작성해주세요.", placeholder="예) 저는 데이터 분석 및 시각화를 하고 싶어요.", key="job_task"):
+        st.slider("⭐️ 중요도", 1, 5, 3, key="job_task_importance")
 
     # (6) 본인의 스킬 및 활용 가능한 툴 (자격요건 및 우대사항)
-    job_skills = st.text_area("5️⃣ 지원자님의 **스킬 및 활용 가능한 툴**을 작성해주세요.", placeholder="예) Python과 SQL을 잘해요.")
-    job_skills_importance = (
-        st.slider("⭐️ 중요도", 1, 5, 3, key="job_skills_importance") if job_skills else None
-    )
+    if st.text_area("5️⃣ 지원자님의 **스킬 및 활용 가능한 툴**을 작성해주세요.", placeholder="예) Python과 SQL을 잘해요.", key="job_skills"):
+        st.slider("⭐️ 중요도", 1, 5, 3, key="job_skills_importance")
 
     # (7) 원하시는 혜택 및 복지
-    job_benefits = st.text_area("6️⃣ 원하시는 **혜택 및 복지**를 작성해주세요.", placeholder="예) 유연근무가 가능했으면 좋겠어요.")
-    job_benefits_importance = (
-        st.slider("⭐️ 중요도", 1, 5, 3, key="job_benefits_importance") if job_benefits else None
-    )
-    
-    if "analysis_result" not in st.session_state:
-        st.session_state["analysis_result"] = None
-    if "submitted" not in st.session_state:
-        st.session_state["submitted"] = False
+    if st.text_area("6️⃣ 원하시는 **혜택 및 복지**를 작성해주세요.", placeholder="예) 유연근무가 가능했으면 좋겠어요.", key="job_benefits"):
+        st.slider("⭐️ 중요도", 1, 5, 3, key="job_benefits_importance")
 
-    # (A) submitted=False → 활성 버튼
-    if not st.session_state["submitted"]:
-        if st.button("🚀 답변 제출"):
-            st.session_state["submitted"] = True
-            st.rerun()
+@fragment
+def results_panel():
+    """
+    저장된 분석 결과의 현재 페이지 카드
+    세션에는 공고id / 점수만 있으므로 현재 페이지 행만 공고 저장소에서 조회 (상세 보기를 켠 카드만 전체 텍스트 조회)
+    """
+    result = st.session_state.get("analysis_result")
+    if result is None or len(result) == 0:
+        return
+    if result.case == "A":
+        st.success(f"🔎 작성하신 직무 기반 상위 {len(result)}개 공고를 보여드려요!")
+    else:
+        st.success(f"🔎 맞춤형 공고 상위 {len(result)}개를 보여드려요!")
+    # 가로 줄
+    st.markdown("""<div style="height: 4px; background-color: #006400; margin-bottom: 20px;"></div>""", unsafe_allow_html=True)
 
-    # (B) submitted=True → 비활성화 버튼 & 분석 수행
-    if st.session_state["submitted"]:
-        with st.spinner("검색 중입니다. 잠시만 기다려주세요.️"):
-            ##############################################################################
-            # A) 사용자 입력 구조화: 경력, 근무위치 => 하드필터
-            #    (주요업무, 자격요건및우대사항, 혜택및복지) => 소프트필터
-            #    (공고제목) => 별도 로직
-            ##############################################################################
-            hard_filter_dict = {
-                "경력": experience,
-                "근무위치": selected_sigungu
-            }
-
-            # 소프트필터(주요업무, 자격요건및우대사항, 혜택및복지)만 dict에 담음
-            soft_filters = []
-            if job_task and job_task_importance is not None:
-                soft_filters.append(("주요업무", [job_task.strip()], job_task_importance))
-            if job_skills and job_skills_importance is not None:
-                # "자격요건및우대사항" 컬럼에 매칭
-                soft_filters.append(("자격요건및우대사항", [job_skills.strip()], job_skills_importance))
-            if job_benefits and job_benefits_importance is not None:
-                soft_filters.append(("혜택및복지", [job_benefits.strip()], job_benefits_importance))
-
-            total_importance = sum([f[2] for f in soft_filters])
-            soft_filter_dict = {}
-            if total_importance > 0:
-                for col_name, kw_list, imp in soft_filters:
-                    weight = round(imp / total_importance, 4)
-                    soft_filter_dict[col_name] = {
-                        "가중치": weight,
-                        "조건": kw_list
-                    }
-
-            user_input_json = {"soft_filter": soft_filter_dict}
-            job_title_input = job_title.strip()
-
-            ##############################################################################
-            # B) 임베딩 모델 및 ChromaDB 컬렉션 로드 (BGE만 사용)
-            ##############################################################################
-            db_path = "./chroma_db_bge"
-            bge_model = get_bge_model()  # @st.cache_resource(show_spinner=False)로 캐싱된 BGE 모델
-
-            def embed_with_model(text: str):
-                if not text.strip():
-                    text = " "
-                out = bge_model.encode(
-                    [text],
-                    max_length=1024,
-                    return_dense=True,
-                    return_sparse=False,
-                    return_colbert_vecs=False
-                )
-                return out["dense_vecs"][0]
-
-            collection = get_chroma_collection(db_path, "job_postings_collection")
-
-            def cosine_similarity(vec1, vec2):
-                dot = np.dot(vec1, vec2)
-                norm1 = np.linalg.norm(vec1)
-                norm2 = np.linalg.norm(vec2)
-                if norm1 == 0 or norm2 == 0:
-                    return 0.0
-                return float(dot / (norm1 * norm2))
-
-            ##############################################################################
-            # C) 하드필터 (경력, 근무위치) -> ChromaDB Where 조건
-            ##############################################################################
-            hard_exp = float(hard_filter_dict["경력"])
-            hard_locs = hard_filter_dict["근무위치"]
-
-            and_conditions = []
-            # (1) 경력 조건
-            and_conditions.append({"경력": {"$lte": hard_exp}})
-
-            # (2) 근무위치 조건
-            if "전체" not in hard_locs and len(hard_locs) > 0:
-                and_conditions.append({"근무위치": {"$in": hard_locs}})
-
-            if len(and_conditions) == 1:
-                where_clause = and_conditions[0]
-            elif len(and_conditions) > 1:
-                where_clause = {"$and": and_conditions}
-            else:
-                where_clause = {}
+    page = render_pagination(len(result))
+    job_ids, scores = result.page(page, RESULT_PAGE_SIZE)
+    render_job_cards(fetch_postings(job_ids, scores), start_rank=page * RESULT_PAGE_SIZE + 1)
 
-            filtered_docs = collection.get(
-                where=where_clause,
-                include=["embeddings", "metadatas"],
-                limit=999999
-            )
+def stored_rationale(result):
+    """
+    이전 제출의 추천 사유: 결과 캐시에서 (cache_key, index_version)으로 조회
+    (GPT 응답, 늦은 응답을 기다리는 중이면 대체 설명. 없거나 캐시를 쓰지 않으면 None)
+    """
+    if not RESULT_CACHE_ENABLED or result is None or result.cache_key is None:
+        return None
+    return get_result_cache().peek_rationale(result.cache_key, result.index_version)
+
+def late_rationale_pending() -> bool:
+    """대체 설명을 보여준 뒤 늦은 GPT 응답을 기다리는 중인지 (finish_late_rationale이 끝나면 False)"""
+    result = st.session_state.get("analysis_result")
+    if not RESULT_CACHE_ENABLED or result is None or result.cache_key is None:
+        return False
+    return get_result_cache().rationale_pending(result.cache_key, result.index_version)
+
+def show_rationale(divider: bool = True):
+    """저장된 추천 사유 표시 (이전 제출 결과. 결과 캐시에서 만료 / 제거되었으면 표시하지 않음)"""
+    explanation = stored_rationale(st.session_state.get("analysis_result"))
+    if explanation is None:
+        return
+    if divider:
+        st.markdown("---")
+    st.markdown("### 공고 추천 이유")
+    st.write(explanation)
+
+@fragment
+def rationale_panel():
+    """저장된 추천 사유 표시"""
+    show_rationale()
+
+@polling_fragment(RATIONALE_POLL_SECONDS)
+def late_rationale_panel(divider: bool = True):
+    """
+    대체 설명 표시 + 늦은 GPT 응답 대기 (RATIONALE_POLL_SECONDS마다 이 영역만 다시 실행)
+    응답이 끝나면(성공 / 실패) 앱 전체를 한 번 다시 실행해 폴링을 멈추고 rationale_panel로 표시
+    """
+    if not late_rationale_pending():
+        st.rerun()
+    show_rationale(divider)
 
-            if len(filtered_docs["ids"]) == 0:
-                st.warning("경력 및 근무위치 조건을 만족하는 공고가 없어요.")
-                st.stop()
-
-            ##############################################################################
-            # D) 공고제목 + 나머지 소프트필터 로직 분기
-            # - Case A: job_title만 있고 (job_task, job_skills, job_benefits)는 없음
-            # - Case B: job_title + (주요업무 or 자격요건 or 혜택) 중 하나 이상
-            # - Case C: job_title이 없고, 소프트필터(주요업무, 자격요건, 혜택) 있음
-            # - Case D: job_title이 없고, 소프트필터도 없음
-            ##############################################################################
-            has_job_title = bool(job_title_input)
-            has_job_task = bool(job_task.strip())
-            has_job_skills = bool(job_skills.strip())
-            has_job_benefits = bool(job_benefits.strip())
-            soft_filter_count = sum([has_job_task, has_job_skills, has_job_benefits])
-
-            # ================================
-            # D-1) 유틸: 최종 공고 표시 함수
-            # ================================
-            def show_job_postings(final_df):
-                for idx, (_, row) in enumerate(final_df.iterrows(), start=1):
-                    st.markdown(f"### Top {idx}: {row['공고제목']}")
-                    st.markdown(f"**회사명:** {row['회사명']}")
-                    display_partial_text("주요 업무", row.get("주요업무", ""))
-                    display_partial_text("자격 요건", row.get("자격요건", ""))
-                    display_partial_text("우대 사항", row.get("우대사항", ""))
-                    display_partial_text("혜택 및 복지", row.get("혜택및복지", ""))
-                    st.markdown(f"**근무 위치:** {row.get('근무위치','')}")
-                    exp_val = row.get("경력",0)
-                    exp_str = "신입" if int(exp_val) == 0 else f"{int(exp_val)}년 이상"
-                    st.markdown(f"**경력:** {exp_str}")
-                    st.markdown(f"**최종 점수:** {row.get('최종점수','0.0')}")
-                    url_val = row.get("공고상세url", "")
-                    if pd.notna(url_val) and url_val:
-                        st.markdown(f"""
-                            <a href="{url_val}" target="_blank" style="
-                                text-decoration: underline;
-                                color: #006400;
-                                background-color: transparent;
-                                padding: 0;
-                                font-weight: bold;
-                            ">🔗 바로가기</a>
-                        """, unsafe_allow_html=True)
-                    st.markdown("""
-                        <div style="height: 1px; background-color: #006400; margin-bottom: 20px;"></div>
-                    """, unsafe_allow_html=True)
-
-            # ==============================================
-            # D-2) “소프트필터” (주요업무, 자격요건및우대사항, 혜택및복지) 계산 함수
-            # ==============================================
-            def calc_soft_filter_scores(docs, user_filter_dict):
-                """
-                docs: 하드필터를 통과한 ChromaDB 문서들
-                user_filter_dict: {"주요업무": {...}, "자격요건및우대사항": {...}, "혜택및복지": {...}}
-                """
-                # 1) 각 필드별 사용자 임베딩
-                keyword_embeddings = {}
-                for col_type, info in user_filter_dict.items():
-                    emb_list = []
-                    for kw in info["조건"]:
-                        emb_list.append(embed_with_model(kw))
-                    keyword_embeddings[col_type] = emb_list
-
-                # 2) job_id별 raw 유사도
-                sim_raw = {}
-                for i, doc_id in enumerate(docs["ids"]):
-                    emb = np.array(docs["embeddings"][i], dtype=np.float32)
-                    meta = docs["metadatas"][i]
-                    j_id = meta["공고id"]
-                    t = meta["type"]
-
-                    if j_id not in sim_raw:
-                        sim_raw[j_id] = {}
-
-                    if t in user_filter_dict:
-                        kw_embs = keyword_embeddings[t]
-                        if len(kw_embs) == 0:
-                            raw_sim = 0.0
-                        else:
-                            scores = []
-                            for kw_vec in kw_embs:
-                                s = cosine_similarity(emb, kw_vec)
-                                scores.append(s)
-                            raw_sim = np.mean(scores) if scores else 0.0
-
-                        sim_raw[j_id][t] = raw_sim
-
-                # 3) 최종 점수 (가중합)
-                final_scores = {}
-                for j_id in sim_raw.keys():
-                    score_sum = 0.0
-                    for doc_type, info in user_filter_dict.items():
-                        raw_val = sim_raw[j_id].get(doc_type, 0.0)
-                        weight = info["가중치"]
-                        score_sum += raw_val * weight
-                    final_scores[j_id] = score_sum
-
-                return final_scores
-
-            # ======================================================
-            # D-3) 하드필터 통과한 문서들 중에서 job_id 리스트 추출
-            # ======================================================
-            all_job_ids = []
-            for meta in filtered_docs["metadatas"]:
-                j_id = meta["공고id"]
-                if j_id not in all_job_ids:
-                    all_job_ids.append(j_id)
-
-            # ======================================================
-            # D-4) 상황별 분기
-            # ======================================================
-            if has_job_title and soft_filter_count == 0:
-                # --------------------------------------------------
-                # Case A: 공고제목 "단독"
-                # --------------------------------------------------
-                title_vec = embed_with_model(job_title_input)
-
-                doc_scores = {}
-                for i, doc_id in enumerate(filtered_docs["ids"]):
-                    meta = filtered_docs["metadatas"][i]
-                    t = meta["type"]
-                    j_id = meta["공고id"]
-                    if t == "공고제목":
-                        emb = np.array(filtered_docs["embeddings"][i], dtype=np.float32)
-                        sim = cosine_similarity(title_vec, emb)
-                        doc_scores[j_id] = sim
-
-                if not doc_scores:
-                    st.warning("공고제목 임베딩을 계산했지만, 해당 타입 문서가 없습니다.")
-                    st.stop()
-
-                sorted_ids = sorted(doc_scores.keys(), key=lambda x: doc_scores[x], reverse=True)[:5]
-
-                # [캐싱] 엑셀 파일 로드
-                df_all = load_all_excel_data("./all_raw.xlsx")
-                top_df = df_all[df_all["공고id"].isin(sorted_ids)].copy()
-                top_df["최종점수"] = top_df["공고id"].apply(lambda x: round(doc_scores.get(str(x), 0.0), 4))
-                top_df = top_df.sort_values("최종점수", ascending=False)
-
-                if len(top_df) == 0:
-                    st.warning("공고제목 유사도 기반 추천 결과가 없어요.")
-                    st.stop()
-
-                st.success("🔎 작성하신 직무 기반 상위 5개 공고를 보여드려요!")
-                show_job_postings(top_df)
-
-            elif has_job_title and soft_filter_count > 0:
-                # --------------------------------------------------
-                # Case B: 공고제목 + (주요업무 or 자격요건 or 혜택 등) 1개 이상
-                # --------------------------------------------------
-                title_vec = embed_with_model(job_title_input)
-
-                pass_ids = []
-                for i, doc_id in enumerate(filtered_docs["ids"]):
-                    meta = filtered_docs["metadatas"][i]
-                    t = meta["type"]
-                    j_id = meta["공고id"]
-                    if t == "공고제목":
-                        emb = np.array(filtered_docs["embeddings"][i], dtype=np.float32)
-                        sim = cosine_similarity(title_vec, emb)
-                        # threshold로 0.7
-                        if sim >= 0.7:
-                            if j_id not in pass_ids:
-                                pass_ids.append(j_id)
-
-                if not pass_ids:
-                    st.warning("직무 조건의 threshold를 만족하는 공고가 없습니다.")
-                    st.stop()
-
-                pass_docs_ids = []
-                pass_docs_embeddings = []
-                pass_docs_metas = []
-
-                for i, doc_id in enumerate(filtered_docs["ids"]):
-                    meta = filtered_docs["metadatas"][i]
-                    j_id = meta["공고id"]
-                    if j_id in pass_ids:
-                        pass_docs_ids.append(doc_id)
-                        pass_docs_embeddings.append(filtered_docs["embeddings"][i])
-                        pass_docs_metas.append(meta)
-
-                pass_docs = {
-                    "ids": pass_docs_ids,
-                    "embeddings": pass_docs_embeddings,
-                    "metadatas": pass_docs_metas
-                }
-
-                if len(soft_filter_dict) == 0:
-                    # 혹시 모를 케이스 대비
-                    job_ids = []
-                    for meta in pass_docs["metadatas"]:
-                        j_id = meta["공고id"]
-                        if j_id not in job_ids:
-                            job_ids.append(j_id)
-                    top5_ids = job_ids[:5]
-                    df_all = load_all_excel_data("./all_raw.xlsx")
-                    filtered_df = df_all[df_all["공고id"].isin(top5_ids)].copy()
-                    filtered_df["최종점수"] = 0.0
-                    show_job_postings(filtered_df)
-                    st.stop()
-                else:
-                    final_scores = calc_soft_filter_scores(pass_docs, soft_filter_dict)
-                    if not final_scores:
-                        st.warning("소프트필터 점수를 계산할 문서가 없어요.")
-                        st.stop()
-                    sorted_ids = sorted(final_scores.keys(), key=lambda x: final_scores[x], reverse=True)[:5]
-                    if not sorted_ids:
-                        st.warning("소프트필터를 만족하는 상위 공고가 없어요.")
-                        st.stop()
-
-                    df_all = load_all_excel_data("./all_raw.xlsx")
-                    top_df = df_all[df_all["공고id"].isin(sorted_ids)].copy()
-                    top_df["최종점수"] = top_df["공고id"].apply(lambda x: round(final_scores.get(str(x), 0.0), 4))
-                    top_df = top_df.sort_values("최종점수", ascending=False)
-
-                    st.success("🔎 맞춤형 공고 상위 5개를 보여드려요!")
-                    st.markdown("""
-                                <div style="height: 4px; background-color: #006400; margin-bottom: 20px;"></div>""",
-                                unsafe_allow_html=True
-                    )
-                    show_job_postings(top_df)
+############################
+# 제출 처리 (검색 -> 결과 저장 -> 추천 사유)
+############################
+######################################################
+# 추가: 추천 사유를 생성하는 함수 정의 (공고제목은 제외)
+######################################################
+def generate_recommendation_rationale(user_input_json, top_df, timing, index_version=None):
+    """
+    추천 사유를 토큰 단위로 생성하는 제너레이터
+    index_version: 공고별 설명 캐시의 색인 버전
+    timing: {"ttft": 첫 토큰까지의 초, "total": 전체 생성 초,
+             "prompt_tokens" / "raw_prompt_tokens": 보낸 / 원문 기준 프롬프트 토큰 수 (raw는 단일 프롬프트일 때만),
+             "posting_calls" / "posting_cache_hits": 공고별 생성 시 호출 / 캐시 적중 수}가 기록될 dict
+    """
+    soft_filter = user_input_json["soft_filter"]
+    if RATIONALE_PARALLEL:
+        # 공고별 요청을 동시에 보내고 Top 순서로 이어서 출력 (prompt_tokens는 실제 보낸 공고별 프롬프트 합)
+        # 단일 프롬프트는 보내지 않으므로 만들거나 토큰 수를 세지 않음
+        yield from generate_parallel(
+            get_rationale_runner(), soft_filter, top_df, timing,
+            cache=get_posting_rationale_cache() if RESULT_CACHE_ENABLED else None,
+            version=index_version, use_digest=RATIONALE_DIGEST
+        )
+        return
 
-            else:
-                # --------------------------------------------------
-                # 공고제목이 없는 경우 -> Case C, D
-                # --------------------------------------------------
-                if len(soft_filter_dict) == 0:
-                    # Case D: 소프트필터 전무
-                    job_ids = []
-                    for meta in filtered_docs["metadatas"]:
-                        j_id = meta["공고id"]
-                        if j_id not in job_ids:
-                            job_ids.append(j_id)
-                    top5 = job_ids[:5]
-
-                    df_all = load_all_excel_data("./all_raw.xlsx")
-                    filtered_df = df_all[df_all["공고id"].isin(top5)].copy()
-                    filtered_df["최종점수"] = 0.0
-                    show_job_postings(filtered_df)
-                else:
-                    # Case C: 공고제목은 없고, 소프트필터 존재
-                    final_scores = calc_soft_filter_scores(filtered_docs, soft_filter_dict)
-                    if not final_scores:
-                        st.warning("소프트필터 점수를 계산할 문서가 없어요.")
-                        st.stop()
-                    sorted_ids = sorted(final_scores.keys(), key=lambda x: final_scores[x], reverse=True)[:5]
-                    if not sorted_ids:
-                        st.warning("소프트필터 결과, 상위 공고가 없어요.")
-                        st.stop()
-
-                    df_all = load_all_excel_data("./all_raw.xlsx")
-                    top_df = df_all[df_all["공고id"].isin(sorted_ids)].copy()
-                    top_df["최종점수"] = top_df["공고id"].apply(lambda x: round(final_scores.get(str(x), 0.0), 4))
-                    top_df = top_df.sort_values("최종점수", ascending=False)
-
-                    st.success("🔎 맞춤형 공고 상위 5개를 보여드려요!")
-                    st.markdown("""
-                                <div style="height: 4px; background-color: #006400; margin-bottom: 20px;"></div>
-                                """, unsafe_allow_html=True)
-                    show_job_postings(top_df)
-
-            ######################################################
-            # 추가: 추천 사유를 생성하는 함수 정의 (공고제목은 제외)
-            ######################################################
-            def generate_recommendation_rationale(user_input_json, top_df):
-                provided_fields = [key for key in user_input_json["soft_filter"].keys()]
-            
-                # 프롬프트 초기 구성
-                prompt = "아래는 사용자가 입력한 소프트 필터 정보와 추천된 Top 5 공고의 주요 내용입니다.\n\n"
-            
-                # 사용자 입력 (소프트 필터)
-                prompt += "사용자 입력 (소프트 필터):\n"
-                for key in provided_fields:
-                    if key == "자격요건및우대사항":
-                        prompt += f"- 자격요건및우대사항 (자격요건 및 우대사항 모두 해당): {user_input_json['soft_filter'][key]['조건']}\n"
-                    else:
-                        prompt += f"- {key}: {user_input_json['soft_filter'][key]['조건']}\n"
-            
-                # 추천된 채용 공고 내용 - Top 순서대로
-                prompt += "\n추천된 채용 공고 내용:\n"
-                for i, (_, row) in enumerate(top_df.iterrows(), start=1):
-                    prompt += f"Top {i}: **{row['공고제목']}**\n"
-                    if "주요업무" in provided_fields:
-                        prompt += f"  - **주요업무:** {row['주요업무']}\n\n"
-                    if "자격요건및우대사항" in provided_fields:
-                        prompt += f"  - **자격요건:** {row.get('자격요건', '')}\n\n"
-                        prompt += f"  - **우대사항:** {row.get('우대사항', '')}\n\n"
-                    if "혜택및복지" in provided_fields:
-                        prompt += f"  - **혜택및복지:** {row['혜택및복지']}\n\n"
-                    prompt += "\n---\n\n"
-            
-                # 사용자가 입력한 필드만 설명하도록 요청
-                fields_explanation = []
-                if "주요업무" in provided_fields:
-                    fields_explanation.append("주요업무")
-                if "자격요건및우대사항" in provided_fields:
-                    fields_explanation.append("자격요건")
-                    fields_explanation.append("우대사항")
-                if "혜택및복지" in provided_fields:
-                    fields_explanation.append("혜택및복지")
-                fields_text = ", ".join(fields_explanation)
-            
-                prompt += (
-                    "위 내용을 기반으로, 각 추천 공고에 대해 사용자가 입력한 소프트 필터 항목 중 "
-                    f"[{fields_text}]에 해당하는 부분이 공고 내용에서 어떻게 나타나는지 아래 형식으로 설명해 주세요.\n\n"
-                    "형식 (마크다운 형식):\n"
-                    "🔷**Top 1: [공고제목]**\n\n"
-                )
-                if "주요업무" in provided_fields:
-                    prompt += " ▪️ **주요업무:** <설명>\n\n"
-                if "자격요건및우대사항" in provided_fields:
-                    prompt += " ▪️ **자격요건:** <설명>\n\n"
-                    prompt += " ▪️ **우대사항:** <설명>\n\n"
-                if "혜택및복지" in provided_fields:
-                    prompt += " ▪️ **혜택및복지:** <설명>\n\n"
-            
-                prompt += (
-                    "단, 사용자가 입력하지 않은 항목은 아예 설명에서 생략해 주세요. "
-                    "또한, 해당 항목이 공고 내용에서 명확하게 나타나지 않는 경우, '해당 항목과 관련된 내용이 명확하게 나타나지 않습니다.'라고 간단하게 언급해 주세요.\n\n"
-                    "**중요**: Top 1부터 Top 5까지를 절대로 생략하지 말고 전부 별도로 설명해 주세요. "
-                    "'이하 생략', '...' 등의 요약 표현 없이, 각 공고를 모두 구체적으로 작성해 주시기 바랍니다."
-                    "답변을 생성 시 '사용자가~'라는 표현 말고 '지원자님께서~'와 같이 높임 표현을 사용해야합니다. "
-                )
-            
+    prompt = build_rationale_prompt(soft_filter, top_df, use_digest=RATIONALE_DIGEST)
+    timing.update(prompt_token_stats(soft_filter, top_df, prompt))
+    # 첫 토큰까지의 시간(TTFT)과 전체 생성 시간을 timing에 기록
+    start_time = time.perf_counter()
+    try:
+        stream = get_openai_client().chat.completions.create(
+            model=RATIONALE_MODEL,
+            messages=[
+                {"role": "system", "content": RATIONALE_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.5,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if "ttft" not in timing:
+                    timing["ttft"] = time.perf_counter() - start_time
+                yield delta
+    except Exception as e:
+        timing["error"] = str(e)
+        yield f"{RATIONALE_ERROR_TEXT}: {e}"
+    finally:
+        timing["total"] = time.perf_counter() - start_time
+
+def run_search(trace):
+    """
+    입력 상태로 하드필터 -> 임베딩 -> 점수 계산 -> 공고 조회를 수행하고 결과 상태를 저장
+    반환: 추천 사유 생성에 필요한 값 dict (결과가 없으면 경고를 표시하고 None)
+    """
+    ##############################################################################
+    # A) 사용자 입력 구조화: 경력, 근무위치 => 하드필터
+    #    (주요업무, 자격요건및우대사항, 혜택및복지) => 소프트필터
+    #    (공고제목) => 별도 로직
+    ##############################################################################
+    hard_filter_dict = {
+        "경력": st.session_state.get("experience", 0),
+        "근무위치": st.session_state.get("selected_regions", [])
+    }
+
+    # 소프트필터(주요업무, 자격요건및우대사항, 혜택및복지)만 dict에 담음 (가중치 = 중요도 비율)
+    # 입력 위젯 값은 fragment 밖에서도 읽을 수 있도록 key로 session_state에 보관됨 (중요도는 내용이 있을 때만 표시)
+    soft_filter_dict = build_soft_filter_dict(
+        st.session_state.get("job_task") or "", st.session_state.get("job_task_importance"),
+        st.session_state.get("job_skills") or "", st.session_state.get("job_skills_importance"),
+        st.session_state.get("job_benefits") or "", st.session_state.get("job_benefits_importance")
+    )
+
+    user_input_json = {"soft_filter": soft_filter_dict}
+    job_title_input = (st.session_state.get("job_title") or "").strip()
+
+    ##############################################################################
+    # B) 질의 인코더, 임베딩 스냅샷, 하드필터 인덱스 로드 (BGE만 사용)
+    ##############################################################################
+    db_path = "./chroma_db_bge"
+    # 선택된 백엔드로 캐싱된 질의 인코더 (EMBED_BATCHING이면 다른 세션 요청과 묶어 인코딩)
+    dense_encode = get_dense_encode(ENCODER_BACKEND)
+
+    # 프로세스당 한 번만 로드되는 임베딩 스냅샷 (정규화 임베딩 + 컬럼형 메타데이터)
+    # 스냅샷과 하드필터 인덱스는 항상 같은 색인 버전의 쌍으로 받음
+    snapshot, hard_index, index_version = get_snapshot_refresher(
+        db_path, "job_postings_collection"
+    ).current_versioned()
+
+    ann_options = None
+    if ANN_ENABLED:
+        ann_options = AnnOptions(
+            get_chroma_collection(db_path, "job_postings_collection"),
+            top_n=ANN_TOP_N, min_jobs=ANN_MIN_JOBS, eval_rate=ANN_EVAL_RATE
+        )
+
+    ##############################################################################
+    # C) 하드필터 -> 임베딩 -> 점수 계산 (pipeline.recommend)
+    # - Case A: job_title만 있고 (job_task, job_skills, job_benefits)는 없음
+    # - Case B: job_title + (주요업무 or 자격요건 or 혜택) 중 하나 이상
+    # - Case C: job_title이 없고, 소프트필터(주요업무, 자격요건, 혜택) 있음
+    # - Case D: job_title이 없고, 소프트필터도 없음
+    ##############################################################################
+    # 같은 색인 버전에서 정규화한 검색 조건이 같으면 캐시된 결과 사용
+    result_cache = get_result_cache() if RESULT_CACHE_ENABLED else None
+    cache_key = profile_key(hard_filter_dict, soft_filter_dict, job_title_input, k=RESULT_TOP_K)
+    recommendation = result_cache.get(cache_key, index_version) if result_cache is not None else None
+    trace.tag(cache_hit=recommendation is not None)
+    if recommendation is None:
+        recommendation = recommend(
+            snapshot,
+            hard_index,
+            dense_encode,
+            hard_filter_dict,
+            soft_filter_dict,
+            job_title_input,
+            k=RESULT_TOP_K,
+            ann=ann_options,
+            sparse=get_sparse_options(db_path),
+            rerank=get_colbert_reranker(db_path),
+            timer=trace
+        )
+        if result_cache is not None:
+            result_cache.put(cache_key, index_version, recommendation)
+    trace.tag(
+        case=recommendation.case,
+        hard_jobs=recommendation.hard_jobs,
+        soft_filters=len(soft_filter_dict)
+    )
+
+    if recommendation.warning:
+        st.warning(recommendation.warning)
+        return None
+
+    # ======================================================
+    # D) 공고 저장소에 있는 상위 공고의 공고id / 점수를 순위 순서대로 조회
+    #    (카드 컬럼은 결과 패널에서 현재 페이지만 조회)
+    # ======================================================
+    with trace("join"):
+        top_df = fetch_postings(
+            recommendation.job_ids, recommendation.scores, columns=["공고id"],
+            rerank_scores=recommendation.rerank_scores
+        )
+        # 추천 사유는 첫 페이지 공고의 필드별 요약으로 생성
+        # (원문 컬럼은 토큰 수 비교용. 메모리 매핑이라 해당 행의 페이지만 읽힘)
+        rationale_df = fetch_postings(
+            recommendation.job_ids[:RESULT_PAGE_SIZE],
+            columns=["공고id", "공고제목", *DETAIL_FIELDS, *(digest_column(f) for f in DETAIL_FIELDS)]
+        )
+
+    if recommendation.case == "A" and len(top_df) == 0:
+        st.warning("공고제목 유사도 기반 추천 결과가 없어요.")
+        return None
+
+    # 결과 패널(results_panel)이 다시 그릴 상태 저장 (공고 행 대신 순위별 공고id / 점수와 캐시 키만 보관)
+    st.session_state["analysis_result"] = SessionResult.from_frame(
+        top_df, recommendation.case, cache_key, index_version
+    )
+    st.session_state["result_page"] = 0
+    return {
+        "user_input_json": user_input_json,
+        "soft_filter_dict": soft_filter_dict,
+        "recommendation": recommendation,
+        "rationale_df": rationale_df,
+        "dense_encode": dense_encode,
+        "result_cache": result_cache,
+        "cache_key": cache_key,
+        "index_version": index_version,
+    }
+
+def stream_rationale(analysis: dict, trace):
+    """
+    새 검색 결과의 추천 사유를 스트리밍으로 생성해 표시하고 상태에 저장 (제출한 실행에서만 호출)
+    analysis: run_search 반환값
+    """
+    user_input_json, soft_filter_dict = analysis["user_input_json"], analysis["soft_filter_dict"]
+    recommendation, rationale_df = analysis["recommendation"], analysis["rationale_df"]
+    dense_encode, result_cache = analysis["dense_encode"], analysis["result_cache"]
+    cache_key, index_version = analysis["cache_key"], analysis["index_version"]
+
+    ######################################################
+    # 추가: 로딩 메시지와 함께 추천 사유를 스트리밍으로 출력
+    ######################################################
+    loading_msg = st.empty()
+    loading_msg.markdown("#### ⏳공고 추천 이유를 알려드릴게요. 잠시만 기다려주세요️⌛")
+
+    def stream_with_placeholder(chunks):
+        # 첫 토큰이 도착하면 로딩 메시지를 지우고 본문을 이어서 출력
+        for i, chunk in enumerate(chunks):
+            if i == 0:
+                loading_msg.markdown("### 공고 추천 이유")
+            yield chunk
+
+    # rationale_df는 첫 페이지 공고의 원문 (D 단계에서 조회)
+    # 같은 검색 조건의 추천 사유가 캐시에 있으면 GPT를 호출하지 않음
+    rationale_timing = {}
+    rationale_start = time.perf_counter()
+    cached_rationale = (
+        result_cache.get_rationale(cache_key, index_version) if result_cache is not None else None
+    )
+    with trace("rationale"):
+        if cached_rationale is not None:
+            loading_msg.markdown("### 공고 추천 이유")
+            st.markdown(cached_rationale)
+            explanation = cached_rationale
+            rationale_timing["cached"] = True
+        elif RATIONALE_DEADLINE <= 0:
+            explanation = st.write_stream(
+                stream_with_placeholder(generate_recommendation_rationale(user_input_json, rationale_df, rationale_timing, index_version))
+            )
+        else:
+            # GPT 응답은 백그라운드 스레드에서 받고, 첫 토큰 기한을 넘기거나 실패하면 로컬 설명으로 대체
+            llm_stream = BackgroundStream(
+                generate_recommendation_rationale(user_input_json, rationale_df, rationale_timing, index_version)
+            )
+            fallback_text = None
+            if not llm_stream.wait_first(RATIONALE_DEADLINE / 2) or "error" in rationale_timing:
                 try:
-                    response = client.chat.completions.create(
-                        model="gpt-4o",
-                        messages=[
-                            {
-                                "role": "system",
-                                "content": (
-                                    "You are an assistant who explains job recommendation rationale based on user input "
-                                    "and job posting data in markdown format. Do not fabricate explanations if the user's input "
-                                    "is not clearly supported by the job posting content."
-                                )
-                            },
-                            {"role": "user", "content": prompt},
-                        ],
-                        temperature=0.5
+                    # 문장 인코딩은 남은 기한 안에서만 (넘기면 남은 필드는 검색 단계 유사도 + 요약으로 설명)
+                    fallback_text = explain_locally(
+                        soft_filter_dict, rationale_df, dense_encode, recommendation.field_scores,
+                        budget=max(0.0, RATIONALE_DEADLINE - (time.perf_counter() - rationale_start))
                     )
-                    explanation = response.choices[0].message.content
-                except Exception as e:
-                    explanation = f"추천 사유를 생성하는 데 오류가 발생했어요: {e}"
-            
-                return explanation
-            
-            ######################################################
-            # 추가: 로딩 메시지와 함께 추천 사유 생성 및 출력
-            ######################################################
-            loading_msg = st.empty()
-            loading_msg.markdown("#### ⏳공고 추천 이유를 알려드릴게요. 잠시만 기다려주세요️⌛")
-
-            # top_df는 각 케이스 분기(Case A/B/C/D)에서 최종적으로 정의됨
-            explanation = generate_recommendation_rationale(user_input_json, top_df)
-            if "latest_explanation" not in st.session_state:
-                st.session_state["latest_explanation"] = []
-            st.session_state["latest_explanation"] = explanation
-
-        # 결과 저장 후 상태 복원
-        st.session_state["analysis_result"] = top_df
+                except Exception:
+                    logger.exception("local rationale fallback failed")
+            remaining = RATIONALE_DEADLINE - (time.perf_counter() - rationale_start)
+            if fallback_text is None or (
+                llm_stream.wait_first(max(0.0, remaining)) and "error" not in rationale_timing
+            ):
+                explanation = st.write_stream(stream_with_placeholder(llm_stream))
+            else:
+                rationale_timing["fallback"] = True
+                explanation = fallback_text
+                if result_cache is None:
+                    # 늦은 응답을 저장할 곳이 없으므로 대체 설명만 표시
+                    loading_msg.markdown("### 공고 추천 이유")
+                    st.markdown(fallback_text)
+                else:
+                    # 실행은 기다리지 않고 끝냄. 대체 설명은 결과 캐시에 재표시용(대기 중)으로 저장하고
+                    # 응답 완료를 주기적으로 확인하는 영역(late_rationale_panel)으로 표시하며,
+                    # 늦게 완료된 GPT 응답은 백그라운드에서 같은 항목에 저장되어 대체 설명을 교체함
+                    # (영역을 먼저 그린 뒤 스레드를 시작해 이 실행 안에서 st.rerun()이 호출되지 않도록 함)
+                    result_cache.put_fallback(cache_key, index_version, fallback_text)
+                    loading_msg.empty()
+                    late_rationale_panel(divider=False)
+                    finish_late_rationale(llm_stream, rationale_timing, result_cache, cache_key, index_version)
+    if "ttft" in rationale_timing:
+        trace.observe("rationale_ttft", rationale_timing["ttft"])
+        if not rationale_timing.get("fallback"):
+            st.caption(f"⏱️ 첫 응답 {rationale_timing['ttft']:.1f}초 · 전체 생성 {rationale_timing.get('total', 0.0):.1f}초")
+    if isinstance(explanation, list):
+        explanation = "".join(str(part) for part in explanation)
+    # GPT 응답만 캐시 (실패 / 로컬 대체 설명은 제외. 늦게 온 GPT 응답은 finish_late_rationale에서 저장)
+    if (
+        result_cache is not None and cached_rationale is None
+        and "error" not in rationale_timing and not rationale_timing.get("fallback")
+    ):
+        result_cache.put_rationale(cache_key, index_version, explanation)
+    trace.tag(rationale_fallback=bool(rationale_timing.get("fallback")))
+    if "prompt_tokens" in rationale_timing:
+        trace.tag(
+            prompt_tokens=rationale_timing["prompt_tokens"],
+            raw_prompt_tokens=rationale_timing.get("raw_prompt_tokens"),
+            posting_calls=rationale_timing.get("posting_calls"),
+            posting_cache_hits=rationale_timing.get("posting_cache_hits")
+        )
+    logger.info(
+        "rationale ttft=%.3fs total=%.3fs prompt_tokens=%s raw_prompt_tokens=%s",
+        rationale_timing.get("ttft", float("nan")),
+        rationale_timing.get("total", float("nan")),
+        rationale_timing.get("prompt_tokens"),
+        rationale_timing.get("raw_prompt_tokens")
+    )
+
+def finish_late_rationale(llm_stream, rationale_timing, result_cache, cache_key, index_version):
+    """
+    대체 설명을 보여준 뒤 GPT 응답을 백그라운드 스레드에서 끝까지 받아
+    성공하면 결과 캐시에 대체 설명 대신 저장 (Streamlit API는 호출하지 않음)
+    끝나면(성공 / 실패) 결과 캐시 항목의 대기 표시를 내려 late_rationale_panel의 폴링을 멈춤
+    """
+    def _run():
+        late_text = None
+        try:
+            late_text = llm_stream.result()
+            if "error" in rationale_timing or not late_text:
+                late_text = None
+        finally:
+            result_cache.finish_fallback(cache_key, index_version, late_text)
+
+    threading.Thread(target=_run, name="rationale-late", daemon=True).start()
+
+def request_submit():
+    st.session_state["submitted"] = True
+
+############################
+# '맞춤형 채용 공고 추천' UI
+############################
+if st.session_state["selected_tab"] == "job_recommendation":
+    st.subheader("👍 지원자님의 요청 사항에 맞는 공고들을 추천해드려요.")
+    st.subheader("""
+    📌 **입력 시 안내사항**
+
+    입력하실 때 불확실하거나 모호한 부분이 있어도 걱정하지 마세요!  
+    해당 내용은 생략하셔도 괜찮으며, 제공해주신 정보만으로도 최적의 채용 공고를 추천해드릴게요.
+    """)
+
+    job_inputs()
+    location_picker()
+    preference_inputs()
+
+    for key, default in (("analysis_result", None), ("submitted", False)):
+        if key not in st.session_state:
+            st.session_state[key] = default
+
+    # 제출 버튼은 클릭 콜백에서 submitted만 켜고, 같은 실행에서 검색 -> 결과 -> 추천 사유를 처리
+    # 처리 중에는 비활성화 버튼을 보여주고 끝나면 같은 자리에 다시 활성 버튼 표시
+    submit_slot = st.empty()
+    analysis, trace = None, None
+    if st.session_state["submitted"]:
         st.session_state["submitted"] = False
-        st.rerun()
+        submit_slot.button(SUBMIT_LABEL, disabled=True, key="submit_running")
+        request_start = time.perf_counter()
+        trace = get_metrics().trace()
+        with st.spinner("검색 중입니다. 잠시만 기다려주세요.️"):
+            analysis = run_search(trace)
+        if analysis is None:
+            st.session_state["analysis_result"] = None
+            trace.finish(status="empty")
+
+    with trace("render") if analysis is not None else contextlib.nullcontext():
+        results_panel()
+
+    if analysis is not None:
+        st.markdown("---")
+        stream_rationale(analysis, trace)
+        # 요청 지연 기록 (프로세스 첫 요청과 이후 요청을 구분)
+        if warmup is not None:
+            warmup.record_request(time.perf_counter() - request_start)
+        trace.finish()
+    elif late_rationale_pending():
+        late_rationale_panel()
+    else:
+        rationale_panel()
 
-    # (C) 분석 결과 표시
-    if st.session_state["analysis_result"] is not None:
-        st.success("🔎 맞춤형 공고 상위 결과를 보여드릴게요!")
-        df_result = st.session_state["analysis_result"]
-
-        if df_result is not None and not df_result.empty:
-            # 가로 줄
-            st.markdown("""<div style="height: 4px; background-color: #006400; margin-bottom: 20px;"></div>""", unsafe_allow_html=True)
-
-            # DataFrame 순회하며 기존 디자인대로 출력
-            for i, (df_index, row) in enumerate(df_result.iterrows(), start=1):
-                st.markdown(f"### Top {i}: {row['공고제목']}")
-                st.markdown(f"**회사명:** {row['회사명']}")
-                display_partial_text("주요 업무", row.get("주요업무", ""))
-                display_partial_text("자격 요건", row.get("자격요건", ""))
-                display_partial_text("우대 사항", row.get("우대사항", ""))
-                display_partial_text("혜택 및 복지", row.get("혜택및복지", ""))
-                st.markdown(f"**근무 위치:** {row.get('근무위치','')}")
-
-                exp_val = row.get("경력",0)
-                exp_str = "신입" if int(exp_val) == 0 else f"{int(exp_val)}년 이상"
-                st.markdown(f"**경력:** {exp_str}")
-
-                st.markdown(f"**최종 점수:** {row.get('최종점수', '0.0')}")
-
-                url_val = row.get("공고상세url", "")
-                if pd.notna(url_val) and url_val:
-                    st.markdown(f"""
-                        <a href="{url_val}" target="_blank" style="
-                            text-decoration: underline;
-                            color: #006400;
-                            background-color: transparent;
-                            padding: 0;
-                            font-weight: bold;
-                        ">🔗 바로가기</a>
-                    """, unsafe_allow_html=True)
-
-                st.markdown("""
-    <div style="height: 2px; background-color: #006400; margin-bottom: 20px;"></div>
-""", unsafe_allow_html=True)
-                
-            st.markdown("---")
-            if st.session_state["latest_explanation"] is not None:
-                st.markdown("### 공고 추천 이유")
-                st.write(st.session_state["latest_explanation"])
+    submit_slot.button(SUBMIT_LABEL, on_click=request_submit, key="submit")
@@ -0,0 +1,449 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import re
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from hard_filter import ALL_REGIONS, HardFilterIndex, region_keys
+from locations import location_dict
+from pipeline import SOFT_FILTER_FIELDS, SparseOptions, build_soft_filter_dict, recommend
+from posting_store import CARD_COLUMNS, PostingStore, write_frame
+from snapshot import EmbeddingSnapshot
+from sparse_index import SPARSE_FIELD, SPARSE_MODES, SparseIndex
+from colbert_rerank import ColbertReranker, ColbertStore, ColbertWriter
+from text_format import DETAIL_FIELDS, add_display_columns, preview_column
+
+############################
+# 추천 파이프라인 벤치마크 (Case A~D)
+############################
+# Streamlit 세션 없이 하드필터 -> 임베딩 -> 점수 계산 -> 공고 조회 -> 렌더링 텍스트 구성 단계를
+# 합성 공고 코퍼스 위에서 반복 실행하고 단계별 p50/p95/p99와 최대 메모리를 출력한다.
+# 기본 인코더는 텍스트 해시 기반 stub 인코더라 BGE-M3 다운로드 없이 오프라인으로 실행된다.
+#
+# 사용 예:
+#   python benchmark.py --docs 10000 --requests 200
+#   python benchmark.py --docs 1000000 --dim 256 --requests 500 --json bench.json
+#   python benchmark.py --docs 100000 --encoder fp32     (실제 BGE-M3 사용)
+#   python benchmark.py --docs 100000 --sparse-mode hybrid  (자격요건및우대사항 sparse 채점)
+#   python benchmark.py --docs 20000 --dim 256 --colbert    (ColBERT 상위 N개 재순위)
+
+DOC_TYPES = ("공고제목",) + SOFT_FILTER_FIELDS
+STAGES = ("hard_filter", "embed", "score", "rerank", "join", "render")
+CASES = ("A", "B", "C", "D")
+
+SAMPLE_TITLES = ["데이터 분석가", "백엔드 개발자", "프론트엔드 개발자", "머신러닝 엔지니어", "마케터", "회계 담당자"]
+SAMPLE_TASKS = ["데이터 분석 및 시각화를 하고 싶어요.", "API 서버 개발", "광고 캠페인 운영", "모델 학습 및 배포"]
+SAMPLE_SKILLS = ["Python과 SQL을 잘해요.", "Java, Spring 경험", "React와 TypeScript", "엑셀과 회계 자격증"]
+SAMPLE_BENEFITS = ["유연근무가 가능했으면 좋겠어요.", "재택근무", "식대 지원", "교육비 지원"]
+
+
+class StubEncoder:
+    """
+    텍스트 해시로 시드를 정한 결정적 정규 분포 벡터를 반환하는 오프라인 인코더
+    (BGE-M3 출력과 같은 L2 정규화 벡터)
+    """
+
+    name = "stub"
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def encode(self, texts) -> np.ndarray:
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "little")
+            vec = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+            out[i] = vec / np.linalg.norm(vec)
+        return out
+
+    def encode_sparse(self, texts) -> list:
+        """단어 해시를 토큰 id로 쓰는 결정적 lexical weight (XLM-R 어휘 크기 범위)"""
+        out = []
+        for text in texts:
+            weights = {}
+            for word in re.findall(r"\w+", text):
+                digest = hashlib.md5(word.encode("utf-8")).digest()
+                token = int.from_bytes(digest[:4], "little") % 250002
+                weights[token] = max(weights.get(token, 0.0), 0.05 + digest[4] / 255 * 0.25)
+            out.append(weights)
+        return out
+
+    def encode_colbert(self, texts) -> list:
+        """단어별 stub 벡터 + 문장 전체 stub 벡터를 토큰 벡터로 사용"""
+        return [self.encode(re.findall(r"\w+", text) + [text]) for text in texts]
+
+
+SAMPLE_TEXTS = {
+    "공고제목": SAMPLE_TITLES,
+    "주요업무": SAMPLE_TASKS,
+    "자격요건및우대사항": SAMPLE_SKILLS,
+    "혜택및복지": SAMPLE_BENEFITS,
+}
+
+
+def make_synthetic_snapshot(n_docs: int, dim: int = 1024, seed: int = 0, **kwargs):
+    """
+    공고당 4개 type 문서(공고제목, 주요업무, 자격요건및우대사항, 혜택및복지)로 구성된 합성 스냅샷
+    각 문서 임베딩은 같은 type 예시 문장의 stub 벡터와 노이즈를 무작위 비율로 섞어 만들어
+    stub 인코더 질의와의 유사도가 고르게 분포하도록 함 (Case B의 0.7 threshold 통과 공고 포함)
+    반환: (EmbeddingSnapshot, 공고 메타데이터 DataFrame)
+    """
+    rng = np.random.default_rng(seed)
+    n_jobs = max(n_docs // len(DOC_TYPES), 1)
+    n_docs = n_jobs * len(DOC_TYPES)
+
+    regions = region_keys(location_dict)
+    jobs = pd.DataFrame({
+        "공고id": [f"J{i:07d}" for i in range(n_jobs)],
+        "공고제목": np.array(SAMPLE_TITLES, dtype=object)[rng.integers(0, len(SAMPLE_TITLES), n_jobs)],
+        "경력": rng.integers(0, 11, n_jobs),
+        "근무위치": np.array(regions, dtype=object)[rng.integers(0, len(regions), n_jobs)],
+    })
+
+    stub = StubEncoder(dim)
+    anchors = {t: stub.encode(texts) for t, texts in SAMPLE_TEXTS.items()}
+    title_code = {t: i for i, t in enumerate(SAMPLE_TITLES)}
+    embeddings = np.empty((n_docs, dim), dtype=np.float32)
+    skill_pick = np.zeros(n_jobs, dtype=np.int64)
+    chunk_jobs = 10000
+    for job_start in range(0, n_jobs, chunk_jobs):
+        job_end = min(job_start + chunk_jobs, n_jobs)
+        for t_idx, doc_type in enumerate(DOC_TYPES):
+            n = job_end - job_start
+            if doc_type == "공고제목":
+                pick = np.array([title_code[t] for t in jobs["공고제목"].iloc[job_start:job_end]])
+            else:
+                pick = rng.integers(0, len(SAMPLE_TEXTS[doc_type]), n)
+                if doc_type == SPARSE_FIELD:
+                    skill_pick[job_start:job_end] = pick
+            noise = rng.standard_normal((n, dim), dtype=np.float32)
+            noise /= np.linalg.norm(noise, axis=1, keepdims=True)
+            alpha = rng.uniform(0.2, 0.9, (n, 1)).astype(np.float32)
+            rows = np.arange(job_start, job_end) * len(DOC_TYPES) + t_idx
+            embeddings[rows] = alpha * anchors[doc_type][pick] + (1 - alpha) * noise
+
+    jobs["자격요건샘플"] = skill_pick
+    job_idx = np.repeat(np.arange(n_jobs), len(DOC_TYPES))
+    snapshot = EmbeddingSnapshot(
+        embeddings,
+        jobs["공고id"].to_numpy()[job_idx],
+        np.tile(np.array(DOC_TYPES, dtype=object), n_jobs),
+        jobs["경력"].to_numpy()[job_idx],
+        jobs["근무위치"].to_numpy()[job_idx],
+        **kwargs
+    )
+    return snapshot, jobs
+
+
+def make_synthetic_sparse_index(jobs: pd.DataFrame, seed: int = 0, noise_tokens: int = 12) -> SparseIndex:
+    """
+    공고별 자격요건및우대사항 예시 문장의 stub lexical weight에 무작위 토큰을 섞은 sparse 역색인
+    (make_synthetic_snapshot과 같은 예시 문장 배정 사용)
+    """
+    rng = np.random.default_rng(seed + 2)
+    sample_weights = StubEncoder().encode_sparse(SAMPLE_SKILLS)
+    n_jobs = len(jobs)
+    job_parts, token_parts, weight_parts = [], [], []
+    for s_idx, lw in enumerate(sample_weights):
+        members = np.flatnonzero(jobs["자격요건샘플"].to_numpy() == s_idx)
+        scale = rng.uniform(0.3, 1.0, len(members))
+        for token, w in lw.items():
+            job_parts.append(members)
+            token_parts.append(np.full(len(members), token))
+            weight_parts.append(w * scale)
+    job_parts.append(np.repeat(np.arange(n_jobs), noise_tokens))
+    token_parts.append(rng.integers(0, 250002, n_jobs * noise_tokens))
+    weight_parts.append(rng.uniform(0.02, 0.3, n_jobs * noise_tokens))
+    return SparseIndex.from_triplets(
+        jobs["공고id"].to_numpy(),
+        np.concatenate(job_parts), np.concatenate(token_parts), np.concatenate(weight_parts)
+    )
+
+
+def make_synthetic_colbert_store(snapshot, path: str, tokens_per_doc: int = 16, seed: int = 0) -> ColbertStore:
+    """
+    문서 임베딩 주변에 노이즈를 섞은 tokens_per_doc개의 토큰 벡터로 ColBERT 저장소 생성
+    """
+    rng = np.random.default_rng(seed + 3)
+    dim = snapshot.embeddings.shape[1]
+    writer = ColbertWriter(path, dim)
+    try:
+        for start in range(0, len(snapshot), 10000):
+            emb = np.asarray(snapshot.embeddings[start:start + 10000], dtype=np.float32)
+            noise = rng.standard_normal((len(emb), tokens_per_doc, dim), dtype=np.float32) / np.sqrt(dim)
+            tokens = emb[:, None, :] + rng.uniform(0.3, 1.5, (len(emb), tokens_per_doc, 1)) * noise
+            tokens /= np.linalg.norm(tokens, axis=2, keepdims=True)
+            for i, d_id in enumerate(snapshot.doc_ids[start:start + 10000]):
+                writer.add(d_id, tokens[i])
+    finally:
+        writer.close()
+    return ColbertStore(path)
+
+
+def _fake_text(rng, n_lines: int) -> str:
+    markers = ["- ", "1) ", "• ", "■ ", ""]
+    return "\n".join(
+        f"{markers[rng.integers(len(markers))]}합성 공고 문장 {rng.integers(1_000_000)} " * int(rng.integers(1, 4))
+        for _ in range(n_lines)
+    )
+
+
+def make_synthetic_store(jobs: pd.DataFrame, path: str, seed: int = 0) -> PostingStore:
+    """all_raw.xlsx와 같은 컬럼 구성의 합성 공고 테이블을 Arrow 파일로 저장 후 열기"""
+    rng = np.random.default_rng(seed)
+    n = len(jobs)
+    df = pd.DataFrame({
+        "공고id": jobs["공고id"],
+        "공고제목": jobs["공고제목"],
+        "회사명": [f"회사{i}" for i in range(n)],
+        "주요업무": [_fake_text(rng, int(rng.integers(3, 12))) for _ in range(n)],
+        "자격요건": [_fake_text(rng, int(rng.integers(3, 12))) for _ in range(n)],
+        "우대사항": [_fake_text(rng, int(rng.integers(2, 8))) for _ in range(n)],
+        "혜택및복지": [_fake_text(rng, int(rng.integers(2, 10))) for _ in range(n)],
+        "근무위치": jobs["근무위치"],
+        "경력": jobs["경력"],
+        "공고상세url": [f"https://example.com/jobs/{j}" for j in jobs["공고id"]],
+    })
+    write_frame(add_display_columns(df), path)
+    return PostingStore(path)
+
+
+def random_profile(rng, case: str) -> dict:
+    """
+    Case에 맞는 무작위 사용자 입력 (app.py 입력 폼과 동일한 항목)
+    """
+    sidos = list(location_dict.keys())
+    roll = rng.random()
+    if roll < 0.3:
+        regions = [ALL_REGIONS]
+    elif roll < 0.6:
+        regions = list(rng.choice(sidos, size=int(rng.integers(1, 3)), replace=False))
+    else:
+        sido = sidos[int(rng.integers(len(sidos)))]
+        districts = location_dict[sido] or [sido]
+        picked = rng.choice(districts, size=min(len(districts), int(rng.integers(1, 4))), replace=False)
+        regions = [sido if not location_dict[sido] else f"{sido} {d}" for d in picked]
+
+    profile = {
+        "job_title": SAMPLE_TITLES[int(rng.integers(len(SAMPLE_TITLES)))] if case in ("A", "B") else "",
+        "experience": int(rng.integers(0, 21)),
+        "regions": regions,
+        "job_task": "", "job_task_importance": None,
+        "job_skills": "", "job_skills_importance": None,
+        "job_benefits": "", "job_benefits_importance": None,
+    }
+    if case in ("B", "C"):
+        chosen = rng.choice(3, size=int(rng.integers(1, 4)), replace=False)
+        for i in chosen:
+            key, samples = [("job_task", SAMPLE_TASKS), ("job_skills", SAMPLE_SKILLS),
+                            ("job_benefits", SAMPLE_BENEFITS)][i]
+            profile[key] = samples[int(rng.integers(len(samples)))]
+            profile[f"{key}_importance"] = int(rng.integers(1, 6))
+    return profile
+
+
+def render_postings(df: pd.DataFrame) -> list:
+    """render_job_cards와 같은 마크다운 구성만 수행 (미리보기 컬럼 사용, 상세 보기는 펼치지 않음)"""
+    blocks = []
+    for idx, row in enumerate(df.to_dict("records"), start=1):
+        parts = [f"### Top {idx}: {row['공고제목']}", f"**회사명:** {row['회사명']}"]
+        for field, label in DETAIL_FIELDS.items():
+            preview = row.get(preview_column(field)) or ""
+            parts.append(f"**{label}:**\n{preview}" if preview else f"**{label}:** 내용이 게시되어 있지 않아요!")
+        parts.append(f"**최종 점수:** {row.get('최종점수', 0.0)}")
+        blocks.append("\n".join(parts))
+    return blocks
+
+
+class StageTimer:
+    """단계 이름별 소요 시간 기록 (pipeline.recommend의 timer 인자로 사용)"""
+
+    def __init__(self):
+        self.current = {}
+
+    @contextlib.contextmanager
+    def __call__(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[stage] = self.current.get(stage, 0.0) + time.perf_counter() - start
+
+
+def run_request(snapshot, hard_index, store, encoder, profile: dict, k: int = 5, sparse=None,
+                rerank=None, page_size: int = 5) -> dict:
+    """
+    한 번의 제출을 실행하고 {단계: 초, "total": 초, "case": ...} 반환
+    """
+    timer = StageTimer()
+    start = time.perf_counter()
+    soft_filter_dict = build_soft_filter_dict(
+        profile["job_task"], profile["job_task_importance"],
+        profile["job_skills"], profile["job_skills_importance"],
+        profile["job_benefits"], profile["job_benefits_importance"]
+    )
+    rec = recommend(
+        snapshot, hard_index, encoder.encode,
+        {"경력": profile["experience"], "근무위치": profile["regions"]},
+        soft_filter_dict, profile["job_title"].strip(), k=k, sparse=sparse, rerank=rerank, timer=timer
+    )
+    if not rec.warning:
+        with timer("join"):
+            df = store.get_rows(rec.job_ids, CARD_COLUMNS, unique=True)
+            scores = rec.scores or {}
+            df["최종점수"] = df["공고id"].map(lambda x: round(scores.get(str(x), 0.0), 4))
+        with timer("render"):
+            render_postings(df.head(page_size))
+    timings = dict(timer.current)
+    timings["total"] = time.perf_counter() - start
+    timings["case"] = rec.case
+    timings["hard_jobs"] = rec.hard_jobs
+    timings["empty"] = bool(rec.warning)
+    timings["reranked"] = rec.reranked
+    return timings
+
+
+def percentiles(values) -> dict:
+    if not values:
+        return {"n": 0, "p50": None, "p95": None, "p99": None}
+    arr = np.asarray(values) * 1000.0
+    return {
+        "n": len(arr),
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "p99": float(np.percentile(arr, 99)),
+    }
+
+
+def summarize(results: list) -> dict:
+    """Case별 / 전체 단계별 지연 분위수 (ms)"""
+    summary = {}
+    for case in CASES + ("all",):
+        rows = [r for r in results if case == "all" or r["case"] == case]
+        if not rows:
+            continue
+        summary[case] = {
+            stage: percentiles([r[stage] for r in rows if stage in r]) for stage in STAGES + ("total",)
+        }
+        summary[case]["empty_rate"] = float(np.mean([r["empty"] for r in rows]))
+        reranked = [r["reranked"] for r in rows if "rerank" in r]
+        summary[case]["rerank_applied_rate"] = float(np.mean(reranked)) if reranked else None
+    return summary
+
+
+def print_report(summary: dict, meta: dict):
+    print(f"docs={meta['docs']} jobs={meta['jobs']} dim={meta['dim']} encoder={meta['encoder']} "
+          f"requests={meta['requests']} quantization={meta['quantization'] or 'float32'} "
+          f"sparse_mode={meta['sparse_mode']} sparse_index={meta['sparse_index_mib']:.1f}MiB")
+    print(f"build={meta['build_seconds']:.1f}s snapshot={meta['snapshot_mib']:.1f}MiB "
+          f"peak_traced={meta['peak_traced_mib']:.1f}MiB max_rss={meta['max_rss_mib']:.1f}MiB")
+    header = f"{'case':<5}{'stage':<13}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for case, stages in summary.items():
+        for stage in STAGES + ("total",):
+            p = stages[stage]
+            if not p["n"]:
+                continue
+            print(f"{case:<5}{stage:<13}{p['n']:>6}{p['p50']:>10.2f}{p['p95']:>10.2f}{p['p99']:>10.2f}")
+        if stages.get("rerank_applied_rate") is not None:
+            print(f"{case:<5}{'rerank_rate':<13}{stages['rerank_applied_rate']:>16.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="추천 파이프라인 단계별 벤치마크 (합성 코퍼스)")
+    parser.add_argument("--docs", type=int, default=10000, help="문서 수 (공고 수 x 4)")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10, help="측정에서 제외할 초기 요청 수")
+    parser.add_argument("--encoder", default="stub", choices=("stub", "fp32", "int8", "onnx"))
+    parser.add_argument("--quantization", default="", choices=("", "int8", "float16"))
+    parser.add_argument("--sparse-mode", default="dense", choices=SPARSE_MODES)
+    parser.add_argument("--sparse-top-n", type=int, default=500)
+    parser.add_argument("--sparse-alpha", type=float, default=0.3)
+    parser.add_argument("--colbert", action="store_true", help="dense 상위 N개 ColBERT 재순위")
+    parser.add_argument("--colbert-top-n", type=int, default=50)
+    parser.add_argument("--colbert-budget-ms", type=float, default=150.0)
+    parser.add_argument("--top-k", type=int, default=5, help="추천 공고 수 (RESULT_TOP_K)")
+    parser.add_argument("--page-size", type=int, default=5, help="첫 페이지 카드 수 (RESULT_PAGE_SIZE)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    if args.encoder == "stub":
+        encoder = StubEncoder(args.dim)
+    else:
+        from FlagEmbedding import BGEM3FlagModel
+        from encoder import make_encoder
+        if args.dim != 1024:
+            parser.error("BGE-M3 인코더는 --dim 1024가 필요합니다.")
+        encoder = make_encoder(args.encoder, BGEM3FlagModel("BAAI/bge-m3", use_fp16=False, device="cpu"))
+
+    tracemalloc.start()
+    build_start = time.perf_counter()
+    snapshot_kwargs = {"quantization": args.quantization} if args.quantization else {}
+    snapshot, jobs = make_synthetic_snapshot(args.docs, args.dim, args.seed, **snapshot_kwargs)
+    hard_index = HardFilterIndex.from_snapshot(snapshot, location_dict)
+    tmp_dir = tempfile.mkdtemp(prefix="bench_")
+    store = make_synthetic_store(jobs, os.path.join(tmp_dir, "postings.arrow"), args.seed)
+    sparse = None
+    if args.sparse_mode != "dense":
+        # stub 인코더가 아니면 실제 BGE-M3 sparse head로 질의 가중치를 계산 (색인 토큰과는 무관한 합성 색인)
+        sparse = SparseOptions(
+            make_synthetic_sparse_index(jobs, args.seed), encoder.encode_sparse,
+            mode=args.sparse_mode, top_n=args.sparse_top_n, alpha=args.sparse_alpha
+        )
+    rerank = None
+    if args.colbert:
+        rerank = ColbertReranker(
+            make_synthetic_colbert_store(snapshot, os.path.join(tmp_dir, "colbert"), seed=args.seed),
+            encoder.encode_colbert, top_n=args.colbert_top_n, budget_ms=args.colbert_budget_ms
+        )
+    build_seconds = time.perf_counter() - build_start
+
+    rng = np.random.default_rng(args.seed + 1)
+    results = []
+    for i in range(args.warmup + args.requests):
+        profile = random_profile(rng, CASES[i % len(CASES)])
+        timings = run_request(
+            snapshot, hard_index, store, encoder, profile, k=args.top_k, sparse=sparse, rerank=rerank,
+            page_size=args.page_size
+        )
+        if i >= args.warmup:
+            results.append(timings)
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    meta = {
+        "docs": len(snapshot),
+        "jobs": len(jobs),
+        "dim": args.dim,
+        "encoder": encoder.name,
+        "requests": len(results),
+        "quantization": args.quantization,
+        "sparse_mode": args.sparse_mode,
+        "sparse_index_mib": sparse.index.nbytes / 2 ** 20 if sparse else 0.0,
+        "colbert_top_n": args.colbert_top_n if rerank else 0,
+        "build_seconds": build_seconds,
+        "snapshot_mib": snapshot.nbytes / 2 ** 20,
+        "peak_traced_mib": peak / 2 ** 20,
+        # Linux에서 ru_maxrss 단위는 KiB
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    summary = summarize(results)
+    print_report(summary, meta)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "summary": summary}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import logging
+import os
+import time
+
+import numpy as np
+
+############################
+# ColBERT(multi-vector) 2단계 재순위 (dense 상위 N개만)
+############################
+# BGE-M3의 ColBERT 토큰 벡터로 late interaction(MaxSim) 점수를 계산해
+# dense 가중합 점수 상위 top_n 공고만 다시 정렬한다. 전체 코퍼스에 대해서는 계산하지 않는다.
+# - 공고 측 토큰 벡터는 색인 시 float16으로 하나의 파일(vectors.f16)에 이어 쓰고 메모리 매핑으로 읽음
+#   (요청 시 후보 공고의 토큰 행만 페이지 인)
+# - index.npz: 문서 id -> 토큰 행 구간 [start, end)
+# - 요청마다 시간 예산(budget_ms)을 넘기면 dense 순서를 그대로 사용 (예상 질의 인코딩 비용이 예산을 넘으면 인코딩 전에 건너뜀)
+# - 재순위는 순서만 바꾸고 카드의 최종점수는 dense 점수 유지. MaxSim 점수는 별도(Recommendation.rerank_scores / 재순위점수 컬럼)
+#
+# 점수: 필드별 (질의 토큰마다 문서 토큰과의 최대 내적의 평균)을 키워드 평균 후 소프트필터 가중치로 합산
+# (Case A는 공고제목 필드 하나)
+
+logger = logging.getLogger(__name__)
+
+COLBERT_DIR_NAME = "colbert"
+VECTORS_NAME = "vectors.f16"
+INDEX_NAME = "index.npz"
+
+
+class ColbertStore:
+    """
+    메모리 매핑된 float16 토큰 벡터 저장소
+
+    doc_ids: 문서 id ("{공고id}-{type}-{행 번호}", snapshot.make_doc_id)
+    starts / ends: 문서별 토큰 행 구간
+    vectors: (전체 토큰 수, 차원) float16 memmap
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        index = np.load(os.path.join(path, INDEX_NAME), allow_pickle=False)
+        self.dim = int(index["dim"])
+        self.doc_ids = index["doc_ids"].astype(str)
+        self.starts = index["starts"]
+        self.ends = index["ends"]
+        self.row_of = {d: i for i, d in enumerate(self.doc_ids)}
+        n_tokens = os.path.getsize(os.path.join(path, VECTORS_NAME)) // (2 * self.dim)
+        self.vectors = np.memmap(
+            os.path.join(path, VECTORS_NAME), dtype=np.float16, mode="r", shape=(n_tokens, self.dim)
+        )
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    @property
+    def n_tokens(self) -> int:
+        return int((self.ends - self.starts).sum())
+
+    def segments(self, doc_ids):
+        """문서 id 목록 -> (구간 시작, 구간 끝) 배열 (없는 문서는 빈 구간)"""
+        rows = np.array([self.row_of.get(d, -1) for d in doc_ids], dtype=np.int64)
+        starts = np.where(rows >= 0, self.starts[np.maximum(rows, 0)], 0)
+        ends = np.where(rows >= 0, self.ends[np.maximum(rows, 0)], 0)
+        return starts, ends
+
+
+class ColbertWriter:
+    """
+    토큰 벡터를 vectors.f16 끝에 이어 쓰고 index.npz를 갱신
+    append=True면 기존 저장소에 추가 (갱신된 문서의 이전 구간은 파일에 남고 색인에서만 빠짐.
+    기존 행 오프셋은 바뀌지 않으므로 실행 중인 앱의 memmap / 색인은 그대로 유효)
+    append=False면 vectors.f16.tmp에 새로 쓰고 close()에서 index.npz와 함께 os.replace로 교체
+    (실행 중인 앱이 매핑한 파일을 제자리에서 자르지 않음)
+    """
+
+    def __init__(self, path: str, dim: int = 1024, append: bool = False):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.dim = dim
+        self.entries = {}
+        vectors_path = os.path.join(path, VECTORS_NAME)
+        if append and os.path.exists(os.path.join(path, INDEX_NAME)):
+            index = np.load(os.path.join(path, INDEX_NAME), allow_pickle=False)
+            self.dim = int(index["dim"])
+            self.entries = {
+                d: (int(s), int(e)) for d, s, e in zip(index["doc_ids"].astype(str), index["starts"], index["ends"])
+            }
+        else:
+            append = False
+        # 새로 쓰는 경우 임시 파일에 쓰고 close()에서 교체
+        self._tmp_vectors_path = None if append else vectors_path + ".tmp"
+        self._file = open(vectors_path if append else self._tmp_vectors_path, "ab" if append else "wb")
+        self.n_rows = self._file.seek(0, os.SEEK_END) // (2 * self.dim)
+
+    def add(self, doc_id: str, vecs):
+        vecs = np.ascontiguousarray(np.asarray(vecs, dtype=np.float16).reshape(-1, self.dim))
+        self._file.write(vecs.tobytes())
+        self.entries[doc_id] = (self.n_rows, self.n_rows + len(vecs))
+        self.n_rows += len(vecs)
+
+    def delete(self, doc_ids):
+        for d in doc_ids:
+            self.entries.pop(d, None)
+
+    def close(self):
+        self._file.close()
+        if self._tmp_vectors_path is not None:
+            os.replace(self._tmp_vectors_path, os.path.join(self.path, VECTORS_NAME))
+        doc_ids = list(self.entries)
+        tmp_path = os.path.join(self.path, INDEX_NAME + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                dim=np.int64(self.dim),
+                doc_ids=np.array(doc_ids, dtype=str),
+                starts=np.array([self.entries[d][0] for d in doc_ids], dtype=np.int64),
+                ends=np.array([self.entries[d][1] for d in doc_ids], dtype=np.int64),
+            )
+        os.replace(tmp_path, os.path.join(self.path, INDEX_NAME))
+
+
+def maxsim_scores(store: ColbertStore, query_vecs, doc_ids) -> np.ndarray:
+    """
+    질의 토큰 벡터 (Q x D)와 문서별 토큰 벡터의 MaxSim 점수 (문서 수,)
+    후보 문서의 토큰 행을 한 번에 모아 행렬곱 한 번 + 구간별 max로 계산. 없는 문서는 0
+    """
+    starts, ends = store.segments(doc_ids)
+    lengths = ends - starts
+    scores = np.zeros(len(doc_ids), dtype=np.float64)
+    present = np.flatnonzero(lengths > 0)
+    if len(present) == 0:
+        return scores
+    rows = np.concatenate([np.arange(starts[i], ends[i]) for i in present])
+    sims = np.asarray(query_vecs, dtype=np.float32) @ np.asarray(store.vectors[rows], dtype=np.float32).T
+    seg_starts = np.concatenate([[0], np.cumsum(lengths[present])[:-1]])
+    # (Q x 후보 토큰) -> 문서 구간별 최대값 -> 질의 토큰 평균
+    scores[present] = np.maximum.reduceat(sims, seg_starts, axis=1).mean(axis=0)
+    return scores
+
+
+class ColbertReranker:
+    """
+    store: ColbertStore
+    encode_colbert: 텍스트 목록 -> [(토큰 수, 차원) 벡터, ...] 함수
+    top_n: 재순위 대상 dense 상위 공고 수
+    budget_ms: 요청당 재순위 시간 예산 (질의 인코딩 포함). 초과 시 dense 순서 사용
+
+    질의 인코딩은 중간에 멈출 수 없으므로 인코딩 전에 예산을 확인한다.
+    측정한 텍스트당 인코딩 시간(지수 이동 평균)으로 예상한 인코딩 비용이 예산을 넘으면 인코딩하지 않고 dense 순서를 사용.
+    건너뛸 때마다 추정치를 ENCODE_COST_DECAY만큼 줄여 부하가 줄면 다시 인코딩해 측정한다.
+    """
+
+    ENCODE_COST_ALPHA = 0.2
+    ENCODE_COST_DECAY = 0.95
+
+    def __init__(self, store: ColbertStore, encode_colbert, top_n: int = 50, budget_ms: float = 150.0):
+        self.store = store
+        self.encode_colbert = encode_colbert
+        self.top_n = top_n
+        self.budget_ms = budget_ms
+        # 텍스트당 인코딩 시간(ms) 추정치 (첫 요청 전에는 None)
+        self.encode_ms_per_text = None
+
+    def _observe_encode(self, ms_per_text: float):
+        if self.encode_ms_per_text is None:
+            self.encode_ms_per_text = ms_per_text
+        else:
+            a = self.ENCODE_COST_ALPHA
+            self.encode_ms_per_text = (1 - a) * self.encode_ms_per_text + a * ms_per_text
+
+    def rerank(self, ranked, queries: dict, doc_ids: dict, k: int = 5):
+        """
+        ranked: dense 순서 [(공고id, 점수), ...] (top_n개)
+        queries: {type: (키워드 텍스트 목록, 가중치)}
+        doc_ids: {type: [ranked 순서의 문서 id 또는 None, ...]} dense 점수를 낸 문서
+                 (같은 공고id가 여러 행이어도 1차 채점과 같은 문서를 재순위, ScoringEngine.field_rows)
+        반환: (상위 k개 [(공고id, dense 점수), ...], 재순위 적용 여부, {공고id: MaxSim 점수} 또는 None)
+        순서만 MaxSim으로 바꾸고 점수는 dense 점수를 그대로 두어 카드의 최종점수 척도가 재순위 여부와 관계없이 같음
+        """
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000.0
+        texts = [t for field_texts, _ in queries.values() for t in field_texts]
+        estimate = self.encode_ms_per_text
+        if estimate is not None and estimate * len(texts) > self.budget_ms:
+            self.encode_ms_per_text = estimate * self.ENCODE_COST_DECAY
+            return self._fallback(ranked, k, "estimated encode cost %.0fms" % (estimate * len(texts)))
+
+        all_vecs = self.encode_colbert(texts)
+        self._observe_encode(1000.0 * (time.perf_counter() - start) / max(len(texts), 1))
+        if time.perf_counter() > deadline:
+            return self._fallback(ranked, k, "query encoding")
+
+        job_ids = [j_id for j_id, _ in ranked]
+        scores = np.zeros(len(job_ids), dtype=np.float64)
+        offset = 0
+        for doc_type, (field_texts, weight) in queries.items():
+            field = np.zeros(len(job_ids), dtype=np.float64)
+            for q_vecs in all_vecs[offset:offset + len(field_texts)]:
+                field += maxsim_scores(self.store, q_vecs, doc_ids[doc_type])
+            offset += len(field_texts)
+            scores += weight * field / max(len(field_texts), 1)
+            if time.perf_counter() > deadline:
+                return self._fallback(ranked, k, "maxsim scoring")
+
+        # 동점이면 dense 순서 유지
+        order = np.argsort(-scores, kind="stable")[:k]
+        return (
+            [ranked[i] for i in order],
+            True,
+            {job_ids[i]: float(scores[i]) for i in order},
+        )
+
+    def _fallback(self, ranked, k: int, reason: str):
+        logger.info("colbert rerank skipped (%s, budget %.0fms); using dense order", reason, self.budget_ms)
+        return list(ranked[:k]), False, None
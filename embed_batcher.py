@@ -0,0 +1,158 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+############################
+# 세션 공용 질의 임베딩 마이크로 배치
+############################
+# 여러 세션의 인코딩 요청을 큐에 모아 한 번의 encode 호출로 처리한다.
+# - 첫 요청이 들어오면 max_wait_ms 동안(또는 max_batch개 텍스트가 찰 때까지) 뒤따르는 요청을 더 모음
+# - 모은 텍스트는 중복을 제거해 한 번에 인코딩하고, 결과를 요청별로 잘라 Future로 돌려줌
+# - 모델 호출은 전용 스레드 하나에서만 일어나므로 세션 스레드끼리 모델을 두고 경합하지 않음
+# encode(texts)는 기존 인코딩 함수와 같은 형태라 pipeline.recommend의 encode 인자로 그대로 넘길 수 있다.
+#
+# 측정: python embed_batcher.py --threads 8 --requests 64
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    encode_fn: 텍스트 목록 -> 결과 배열/리스트 (행 i가 texts[i]의 결과)
+    max_batch: 한 번에 인코딩할 최대 텍스트 수 (요청 하나가 이보다 크면 그 요청만 단독 처리)
+    max_wait_ms: 첫 요청 이후 다음 요청을 기다리는 최대 시간
+    """
+
+    def __init__(self, encode_fn, max_batch: int = 32, max_wait_ms: float = 5.0, name: str = "embed-batcher"):
+        self.encode_fn = encode_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = {"batches": 0, "requests": 0, "texts": 0, "unique_texts": 0}
+        self._queue = queue.Queue()
+        # max_batch를 넘겨 다음 배치로 미룬 요청 (큐 뒤로 다시 넣지 않아 순서 유지)
+        self._carry = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, texts) -> Future:
+        """텍스트 목록 인코딩 요청. Future.result()는 encode_fn(texts)와 같은 형태"""
+        if self._closed:
+            raise RuntimeError("EmbeddingBatcher가 이미 종료되었습니다.")
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts):
+        """submit 후 결과를 기다림 (기존 encode 함수 대체용)"""
+        return self.submit(texts).result()
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first) -> list:
+        """first 이후 max_wait 동안 / max_batch개까지 요청을 더 모음"""
+        batch, n_texts = [first], len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_texts < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # 종료 신호는 현재 배치를 처리한 뒤 반영
+                self._queue.put(None)
+                break
+            if n_texts + len(item[0]) > self.max_batch:
+                self._carry = item
+                break
+            batch.append(item)
+            n_texts += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            if self._carry is not None:
+                first, self._carry = self._carry, None
+            else:
+                first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            batch = [(texts, future) for texts, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            # 같은 텍스트(여러 세션의 같은 질의)는 한 번만 인코딩
+            unique, position = [], {}
+            for texts, _ in batch:
+                for t in texts:
+                    if t not in position:
+                        position[t] = len(unique)
+                        unique.append(t)
+            try:
+                out = self.encode_fn(unique) if unique else []
+            except Exception as e:
+                logger.exception("embedding batch failed (%d texts)", len(unique))
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for texts, future in batch:
+                rows = [position[t] for t in texts]
+                if isinstance(out, np.ndarray):
+                    future.set_result(out[rows])
+                else:
+                    future.set_result([out[r] for r in rows])
+
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["texts"] += sum(len(texts) for texts, _ in batch)
+            self.stats["unique_texts"] += len(unique)
+
+
+if __name__ == "__main__":
+    # 직렬(세션마다 모델 직접 호출) vs 마이크로 배치 처리량 비교 (실제 BGE-M3 사용)
+    import argparse
+    from concurrent.futures import ThreadPoolExecutor
+
+    from encoder import ENCODER_BACKENDS, SAMPLE_QUERIES, make_encoder
+    from FlagEmbedding import BGEM3FlagModel
+
+    parser = argparse.ArgumentParser(description="질의 임베딩 마이크로 배치 처리량 측정")
+    parser.add_argument("--backend", default="fp32", choices=ENCODER_BACKENDS)
+    parser.add_argument("--threads", type=int, default=8, help="동시 세션 수")
+    parser.add_argument("--requests", type=int, default=64, help="세션 요청 수 (요청마다 텍스트 5개)")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    model = BGEM3FlagModel("BAAI/bge-m3", use_fp16=False, device="cpu")
+    encoder = make_encoder(args.backend, model)
+    encoder.encode(["warmup"])
+    rng = np.random.default_rng(0)
+    requests = [list(rng.choice(SAMPLE_QUERIES, size=4)) + [f"세션 {i}"] for i in range(args.requests)]
+    lock = threading.Lock()
+
+    def serial(texts):
+        # 기존 방식: 텍스트마다 encode([text]), 공유 모델은 잠금으로 직렬화
+        for t in texts:
+            with lock:
+                encoder.encode([t])
+
+    batcher = EmbeddingBatcher(encoder.encode, args.max_batch, args.max_wait_ms)
+    for name, fn in (("serial", serial), ("batched", batcher.encode)):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(fn, requests))
+        elapsed = time.perf_counter() - start
+        print(f"{name}: {args.requests / elapsed:.1f} req/s ({1000 * elapsed / args.requests:.1f} ms/req)")
+    print(f"batches={batcher.stats['batches']} texts={batcher.stats['texts']} unique={batcher.stats['unique_texts']}")
+    batcher.close()
@@ -0,0 +1,280 @@
+import argparse
+import copy
+import os
+
+import numpy as np
+import torch
+
+############################
+# BGE-M3 질의 인코더 백엔드 (CPU)
+############################
+# - fp32: 기존 BGEM3FlagModel.encode 경로 (기준 벡터)
+# - int8: Linear 레이어를 동적 int8 양자화한 PyTorch 모델
+# - onnx: ONNX로 내보낸 그래프를 onnxruntime으로 실행 (onnxruntime 필요)
+# int8 / onnx 백엔드는 질의를 한 번만 토크나이즈해 토큰 길이 버킷 단위로 묶고, 버킷 안에서는
+# 가장 긴 텍스트 길이까지만 패딩한다 (tokenizer.pad. 길이가 크게 다른 텍스트가 한 배치에 섞여
+# 짧은 질의가 긴 질의 길이 비용을 내지 않도록).
+# fp32 경로는 BGEM3FlagModel.encode가 이미 길이 정렬 + 배치별 동적 패딩을 하므로 그대로 한 번 호출한다.
+# dense 벡터는 BGE-M3와 동일하게 CLS 토큰 hidden state를 L2 정규화해 사용한다.
+# sparse(lexical) 가중치와 ColBERT 토큰 벡터는 백엔드와 관계없이 BGEM3FlagModel로 계산한다
+# (sparse_index.py, colbert_rerank.py 참고).
+
+ENCODER_BACKENDS = ("fp32", "int8", "onnx")
+LENGTH_BUCKETS = (32, 64, 128, 256, 512, 1024)
+DEFAULT_ONNX_PATH = "./bge_m3_onnx/model.onnx"
+
+
+def bucket_for(length: int, max_length: int = 1024) -> int:
+    """토큰 길이를 담을 수 있는 가장 작은 버킷 크기"""
+    for b in LENGTH_BUCKETS:
+        if length <= b:
+            return min(b, max_length)
+    return max_length
+
+
+class QueryEncoder:
+    """
+    질의 인코더 공통 로직 (길이 버킷 단위 배치)
+
+    bge_model: BGEM3FlagModel (토크나이저 및 가중치 공유)
+    tensor_type: 버킷 입력 텐서 형식 ("pt" | "np")
+    """
+
+    name = "base"
+    tensor_type = "pt"
+
+    def __init__(self, bge_model, max_length: int = 1024):
+        self.bge_model = bge_model
+        self.tokenizer = bge_model.tokenizer
+        self.max_length = max_length
+
+    def _buckets(self, input_ids):
+        """{버킷 크기: [텍스트 인덱스, ...]}"""
+        groups = {}
+        for i, ids in enumerate(input_ids):
+            groups.setdefault(bucket_for(len(ids), self.max_length), []).append(i)
+        return groups
+
+    def _encode_bucket(self, inputs) -> np.ndarray:
+        """버킷 안에서 가장 긴 텍스트 길이로 패딩한 입력 -> L2 정규화 CLS 벡터"""
+        raise NotImplementedError
+
+    def encode(self, texts) -> np.ndarray:
+        """
+        텍스트 목록 -> (len(texts), 1024) float32 dense 벡터
+        빈 문자열은 기존과 동일하게 공백 한 칸으로 대체
+        토크나이즈는 한 번만 하고, 그 결과로 버킷을 나눈 뒤 버킷별로 tokenizer.pad만 적용
+        """
+        texts = [t if t.strip() else " " for t in texts]
+        tokens = self.tokenizer(texts, truncation=True, max_length=self.max_length, add_special_tokens=True)
+        out = None
+        for idx in self._buckets(tokens["input_ids"]).values():
+            inputs = self.tokenizer.pad(
+                {
+                    "input_ids": [tokens["input_ids"][i] for i in idx],
+                    "attention_mask": [tokens["attention_mask"][i] for i in idx],
+                },
+                padding="longest",
+                return_tensors=self.tensor_type
+            )
+            vecs = self._encode_bucket(inputs)
+            if out is None:
+                out = np.zeros((len(texts), vecs.shape[1]), dtype=np.float32)
+            out[idx] = vecs
+        return out
+
+    def encode_sparse(self, texts) -> list:
+        """텍스트 목록 -> [{토큰 id: 가중치}, ...] (BGE-M3 lexical weights)"""
+        texts = [t if t.strip() else " " for t in texts]
+        out = self.bge_model.encode(
+            texts,
+            batch_size=len(texts),
+            max_length=self.max_length,
+            return_dense=False,
+            return_sparse=True,
+            return_colbert_vecs=False
+        )
+        return [{int(t): float(w) for t, w in lw.items()} for lw in out["lexical_weights"]]
+
+    def encode_colbert(self, texts) -> list:
+        """텍스트 목록 -> [(토큰 수, 1024) float32 ColBERT 벡터, ...]"""
+        texts = [t if t.strip() else " " for t in texts]
+        out = self.bge_model.encode(
+            texts,
+            batch_size=len(texts),
+            max_length=self.max_length,
+            return_dense=False,
+            return_sparse=False,
+            return_colbert_vecs=True
+        )
+        return [np.asarray(v, dtype=np.float32) for v in out["colbert_vecs"]]
+
+
+class FlagEncoder(QueryEncoder):
+    """
+    기존 fp32 BGEM3FlagModel.encode 경로 (비교 기준)
+    FlagModel이 길이 정렬 + 동적 패딩을 하므로 길이 버킷으로 나누지 않음 (버킷용 토크나이즈 생략)
+    """
+
+    name = "fp32"
+
+    def encode(self, texts) -> np.ndarray:
+        texts = [t if t.strip() else " " for t in texts]
+        out = self.bge_model.encode(
+            texts,
+            batch_size=len(texts),
+            max_length=self.max_length,
+            return_dense=True,
+            return_sparse=False,
+            return_colbert_vecs=False
+        )
+        return np.asarray(out["dense_vecs"], dtype=np.float32).reshape(len(texts), -1)
+
+
+class TorchInt8Encoder(QueryEncoder):
+    """
+    Linear 레이어를 동적 int8 양자화한 XLM-R 인코더
+    fp32 모델은 sparse / ColBERT 계산에 계속 쓰이므로 그대로 두고, 양자화할 사본을 만들 때
+    양자화 대상이 아닌 임베딩 모듈(250k x 1024 어휘 임베딩)은 복사하지 않고 원본과 공유한다.
+    사본의 Linear 레이어는 inplace 양자화로 교체되어 fp32 가중치 사본이 남지 않음
+    """
+
+    name = "int8"
+
+    def __init__(self, bge_model, max_length: int = 1024):
+        super().__init__(bge_model, max_length)
+        base = bge_model.model.model
+        embeddings = getattr(base, "embeddings", None)
+        shared = {id(embeddings): embeddings} if embeddings is not None else {}
+        self.model = torch.quantization.quantize_dynamic(
+            copy.deepcopy(base, shared), {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+        self.model.eval()
+
+    def _encode_bucket(self, inputs) -> np.ndarray:
+        with torch.inference_mode():
+            hidden = self.model(**inputs, return_dict=True).last_hidden_state[:, 0]
+            hidden = torch.nn.functional.normalize(hidden, dim=-1)
+        return hidden.float().numpy()
+
+
+class OnnxEncoder(QueryEncoder):
+    """
+    ONNX Runtime 인코더
+    onnx_path가 없으면 BGE-M3의 XLM-R 인코더를 동적 축(batch, sequence)으로 내보낸 뒤 사용
+    """
+
+    name = "onnx"
+    tensor_type = "np"
+
+    def __init__(self, bge_model, max_length: int = 1024, onnx_path: str = DEFAULT_ONNX_PATH):
+        super().__init__(bge_model, max_length)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("onnx 백엔드를 사용하려면 onnxruntime을 설치해주세요.") from e
+
+        if not os.path.exists(onnx_path):
+            export_onnx(bge_model, onnx_path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+    def _encode_bucket(self, inputs) -> np.ndarray:
+        hidden = self.session.run(
+            ["last_hidden_state"],
+            {
+                "input_ids": inputs["input_ids"].astype(np.int64),
+                "attention_mask": inputs["attention_mask"].astype(np.int64)
+            }
+        )[0][:, 0]
+        norms = np.linalg.norm(hidden, axis=1, keepdims=True)
+        return (hidden / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+
+def export_onnx(bge_model, onnx_path: str = DEFAULT_ONNX_PATH, opset: int = 14):
+    """BGE-M3의 XLM-R 인코더를 ONNX 그래프로 내보냄"""
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    base = bge_model.model.model
+    base.eval()
+    dummy = bge_model.tokenizer(["warmup"], return_tensors="pt")
+    with torch.inference_mode():
+        torch.onnx.export(
+            base,
+            (dummy["input_ids"], dummy["attention_mask"]),
+            onnx_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset
+        )
+
+
+def make_encoder(backend: str, bge_model, max_length: int = 1024, **kwargs) -> QueryEncoder:
+    """백엔드 이름으로 질의 인코더 생성"""
+    if backend == "fp32":
+        return FlagEncoder(bge_model, max_length)
+    if backend == "int8":
+        return TorchInt8Encoder(bge_model, max_length)
+    if backend == "onnx":
+        return OnnxEncoder(bge_model, max_length, **kwargs)
+    raise ValueError(f"지원하지 않는 인코더 백엔드입니다: {backend}")
+
+
+def validate_encoder(reference: QueryEncoder, candidate: QueryEncoder, texts, tolerance: float = 0.01) -> dict:
+    """
+    기준(fp32) 벡터와의 코사인 유사도를 비교
+    1 - cosine이 tolerance 이하이면 통과
+    """
+    ref = reference.encode(texts)
+    got = candidate.encode(texts)
+    cos = (ref * got).sum(axis=1) / (
+        np.linalg.norm(ref, axis=1) * np.linalg.norm(got, axis=1) + 1e-12
+    )
+    return {
+        "min_cosine": float(cos.min()),
+        "mean_cosine": float(cos.mean()),
+        "passed": bool((1.0 - cos.min()) <= tolerance),
+    }
+
+
+SAMPLE_QUERIES = [
+    "데이터 분석가",
+    "백엔드 개발자",
+    "저는 데이터 분석 및 시각화를 하고 싶어요.",
+    "Python과 SQL을 잘해요.",
+    "유연근무가 가능했으면 좋겠어요.",
+    "머신러닝 모델을 서비스에 배포하고 운영하는 업무를 하고 싶습니다. 대규모 트래픽 환경 경험이 있습니다.",
+]
+
+
+if __name__ == "__main__":
+    # 사용 예: python encoder.py --backend int8 --tolerance 0.01
+    import time
+    from FlagEmbedding import BGEM3FlagModel
+
+    parser = argparse.ArgumentParser(description="질의 인코더 백엔드 검증 (fp32 대비 코사인 허용 오차)")
+    parser.add_argument("--backend", default="int8", choices=ENCODER_BACKENDS)
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    parser.add_argument("--onnx-path", default=DEFAULT_ONNX_PATH)
+    args = parser.parse_args()
+
+    model = BGEM3FlagModel("BAAI/bge-m3", use_fp16=False, device="cpu")
+    reference = FlagEncoder(model)
+    kwargs = {"onnx_path": args.onnx_path} if args.backend == "onnx" else {}
+    candidate = make_encoder(args.backend, model, **kwargs)
+
+    for enc in (reference, candidate):
+        enc.encode(SAMPLE_QUERIES[:1])
+        start = time.perf_counter()
+        for q in SAMPLE_QUERIES:
+            enc.encode([q])
+        print(f"{enc.name}: {1000 * (time.perf_counter() - start) / len(SAMPLE_QUERIES):.1f} ms/query")
+
+    result = validate_encoder(reference, candidate, SAMPLE_QUERIES, args.tolerance)
+    print(f"min_cosine={result['min_cosine']:.5f} mean_cosine={result['mean_cosine']:.5f} "
+          f"passed={result['passed']} (tolerance={args.tolerance})")
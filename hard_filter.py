@@ -0,0 +1,109 @@
+import numpy as np
+
+############################
+# 정수 코드 기반 하드필터 인덱스 (근무위치, 경력)
+############################
+# location_dict와 스냅샷 메타데이터로부터 한 번만 구성
+# - 근무위치: "시도 시군구" 문자열 -> 정수 지역 코드, 시/도 및 시군구별 행 비트맵(packbits)
+# - 경력: 정렬된 경력 배열 + 정렬 순서 (경력 $lte 조회는 이진 탐색)
+# "전체" 또는 시/도 전체 선택도 비트맵 하나를 꺼내는 비용으로 처리된다.
+
+ALL_REGIONS = "전체"
+
+
+def region_keys(location_dict: dict) -> list:
+    """
+    location_dict를 "시도 시군구" 지역 키 목록으로 전개 (세종은 "세종" 단독)
+    """
+    keys = []
+    for sido, sigungu_list in location_dict.items():
+        if not sigungu_list:
+            keys.append(sido)
+        else:
+            keys.extend(f"{sido} {sg}" for sg in sigungu_list)
+    return keys
+
+
+class HardFilterIndex:
+    """
+    스냅샷 행 단위 하드필터 인덱스
+
+    location_dict: 시/도 -> 시군구 목록
+    locations: 행별 근무위치 문자열
+    experience: 행별 경력 값
+    """
+
+    def __init__(self, location_dict: dict, locations, experience):
+        self.n_rows = len(locations)
+
+        # (1) 지역 코드: location_dict에 없는 근무위치는 -1
+        self.region_names = region_keys(location_dict)
+        self.region_code = {name: code for code, name in enumerate(self.region_names)}
+        self.sido_regions = {
+            sido: [f"{sido} {sg}" for sg in sigungu_list] if sigungu_list else [sido]
+            for sido, sigungu_list in location_dict.items()
+        }
+        locations = np.asarray(locations, dtype=object)
+        self.row_region = np.full(self.n_rows, -1, dtype=np.int32)
+        if self.n_rows:
+            uniq, inverse = np.unique(locations.astype(str), return_inverse=True)
+            uniq_codes = np.array([self.region_code.get(u, -1) for u in uniq], dtype=np.int32)
+            self.row_region = uniq_codes[inverse].astype(np.int32)
+
+        # (2) 시군구별 / 시도별 / 전체 비트맵
+        self.bitmaps = {}
+        for code, name in enumerate(self.region_names):
+            self.bitmaps[name] = np.packbits(self.row_region == code)
+        empty = np.packbits(np.zeros(self.n_rows, dtype=bool))
+        for sido, sigungu_list in location_dict.items():
+            if sigungu_list:
+                self.bitmaps[sido] = np.bitwise_or.reduce(
+                    [self.bitmaps[f"{sido} {sg}"] for sg in sigungu_list] + [empty]
+                )
+        self.bitmaps[ALL_REGIONS] = np.packbits(self.row_region >= 0)
+        self._empty = empty
+
+        # (3) 경력: 정렬 배열 (NaN은 정렬 끝으로 가며 어떤 $lte 조건도 만족하지 않음)
+        experience = np.asarray(experience, dtype=np.float64)
+        self.exp_order = np.argsort(experience, kind="stable")
+        self.exp_sorted = experience[self.exp_order]
+
+    @classmethod
+    def from_snapshot(cls, snapshot, location_dict: dict):
+        return cls(location_dict, snapshot.locations, snapshot.experience)
+
+    def expand_regions(self, regions) -> list:
+        """지역 키 목록을 "시도 시군구" 문자열 목록으로 전개 (Chroma where 절 push-down 용)"""
+        out = []
+        for r in regions:
+            if r == ALL_REGIONS:
+                return list(self.region_names)
+            out.extend(self.sido_regions.get(r, [r]))
+        return out
+
+    def experience_mask(self, max_experience) -> np.ndarray:
+        """경력 <= max_experience 인 행 마스크 (이진 탐색)"""
+        pos = np.searchsorted(self.exp_sorted, float(max_experience), side="right")
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.exp_order[:pos]] = True
+        return mask
+
+    def location_bits(self, regions) -> np.ndarray:
+        """
+        지역 키 목록의 합집합 비트맵 (packbits)
+        regions: "전체", 시/도명, "시도 시군구", "세종" 혼합 가능
+        """
+        bits = [self.bitmaps[r] for r in regions if r in self.bitmaps]
+        if not bits:
+            return self._empty
+        return np.bitwise_or.reduce(bits + [self._empty])
+
+    def mask(self, max_experience, regions) -> np.ndarray:
+        """
+        하드필터 (경력 $lte, 근무위치 $in) 행 마스크
+        regions가 비어 있으면 근무위치 조건은 적용하지 않음
+        """
+        mask = self.experience_mask(max_experience)
+        if regions:
+            mask &= np.unpackbits(self.location_bits(regions), count=self.n_rows).astype(bool)
+        return mask
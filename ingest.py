@@ -0,0 +1,403 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from posting_store import DEFAULT_EXCEL_PATH
+from posting_digest import digest_column
+from colbert_rerank import COLBERT_DIR_NAME, ColbertWriter
+from snapshot import make_doc_id
+from sparse_index import SPARSE_FIELD, SPARSE_INDEX_NAME, SparseIndex
+from text_format import DETAIL_FIELDS, display_column, preview_column
+
+############################
+# 오프라인 색인: 공고 테이블 -> chroma_db_bge
+############################
+# all_raw.xlsx(또는 posting_store.py로 변환한 Arrow 파일)를 chunk_rows 행씩 스트리밍으로 읽어
+# 공고 하나당 4개 문서(공고제목, 주요업무, 자격요건및우대사항, 혜택및복지)를 만들고 BGE-M3 dense 벡터로 색인한다.
+# - 청크 내 문서를 길이 순으로 정렬해 batch_size 단위로 나눔 (배치 내 패딩 최소화)
+# - 배치는 프로세스 풀(워커마다 BGE 모델 1개, 코어를 워커 수로 나눠 torch 스레드 배정)에서 인코딩
+# - 메타데이터(공고id, type, 경력, 근무위치)는 app.py가 읽는 스키마 그대로 대량 upsert
+# - 청크마다 체크포인트(JSON)를 갱신해 중단 후 같은 명령으로 이어서 실행 (upsert라 청크 재실행은 안전)
+# - 문서 id는 기존 컬렉션과 같은 "{공고id}-{type}-{행 번호}" 형식 (예: 257955-공고제목-6, snapshot.make_doc_id)
+# - 문서 메타데이터에 텍스트 해시(hash)를 함께 저장해 증분 색인(reindex.py)의 비교 기준으로 사용
+# - 색인이 끝나면 db_path/deltas에 변경 목록(manifest)을 남겨 실행 중인 앱이 스냅샷을 갱신하도록 함
+# - --sparse: 자격요건및우대사항 문서의 BGE-M3 lexical weight로 sparse 역색인(sparse_index.py)도 생성
+# - --colbert: 모든 문서의 ColBERT 토큰 벡터를 float16 저장소(colbert_rerank.py)에 기록
+#
+# 사용 예: python ingest.py ./all_raw.arrow --workers 4 --batch-size 32
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "./chroma_db_bge"
+DEFAULT_COLLECTION = "job_postings_collection"
+CHECKPOINT_NAME = "ingest_checkpoint.json"
+DELTA_DIR = "deltas"
+
+# 문서 type -> 원본 컬럼 (자격요건및우대사항은 두 컬럼을 이어 붙임)
+DOC_TYPES = {
+    "공고제목": ("공고제목",),
+    "주요업무": ("주요업무",),
+    "자격요건및우대사항": ("자격요건", "우대사항"),
+    "혜택및복지": ("혜택및복지",),
+}
+
+
+def _text(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value).strip()
+
+
+def doc_id(job_id, doc_type: str, row: int) -> str:
+    """기존 컬렉션과 같은 "{공고id}-{type}-{행 번호}" 형식 (snapshot.make_doc_id)"""
+    return make_doc_id(job_id, doc_type, row)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def posting_documents(row: dict, row_no: int) -> list:
+    """
+    공고 한 행 -> [(문서 id, 텍스트, 메타데이터), ...]
+    row_no: 공고 테이블의 행 번호 (0부터, 문서 id에 사용)
+    내용이 비어 있는 필드는 문서를 만들지 않음. 메타데이터 hash는 텍스트 내용 해시
+    """
+    job_id = str(row["공고id"])
+    meta = {"공고id": job_id, "근무위치": _text(row.get("근무위치"))}
+    try:
+        meta["경력"] = int(float(row.get("경력")))
+    except (TypeError, ValueError):
+        pass  # 경력이 없으면 어떤 경력 조건도 만족하지 않도록 키를 생략
+
+    docs = []
+    for doc_type, columns in DOC_TYPES.items():
+        text = "\n".join(t for t in (_text(row.get(c)) for c in columns) if t)
+        if text:
+            docs.append((doc_id(job_id, doc_type, row_no), text, {**meta, "type": doc_type, "hash": content_hash(text)}))
+    return docs
+
+
+def chunk_documents(rows: list, first_row: int) -> list:
+    """청크의 행 목록 -> 문서 목록 (first_row: 청크 첫 행의 테이블 행 번호)"""
+    return [d for i, row in enumerate(rows) for d in posting_documents(row, first_row + i)]
+
+
+def iter_posting_chunks(path: str, chunk_rows: int = 2000):
+    """
+    공고 테이블을 chunk_rows 행씩 [행 dict, ...]로 스트리밍
+    - .arrow: 메모리 매핑 후 slice (전체를 파이썬 객체로 만들지 않음)
+    - .xlsx: openpyxl read_only 모드로 행 단위 읽기
+    """
+    if path.endswith(".arrow"):
+        import pyarrow as pa
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        # 화면 표시용 컬럼(들여쓰기 적용본 / 미리보기)과 프롬프트용 요약 컬럼은 색인에 쓰지 않으므로 읽지 않음
+        display_columns = {
+            c for f in DETAIL_FIELDS for c in (display_column(f), preview_column(f), digest_column(f))
+        }
+        table = table.select([c for c in table.column_names if c not in display_columns])
+        for start in range(0, table.num_rows, chunk_rows):
+            yield table.slice(start, chunk_rows).to_pylist()
+        return
+
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = [str(h) for h in next(rows)]
+        chunk = []
+        for values in rows:
+            chunk.append(dict(zip(header, values)))
+            if len(chunk) == chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        wb.close()
+
+
+def length_sorted_batches(docs: list, batch_size: int) -> list:
+    """텍스트 길이 순으로 정렬한 뒤 batch_size 단위로 분할"""
+    ordered = sorted(docs, key=lambda d: len(d[1]))
+    return [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+
+
+############################
+# 인코딩 워커 (프로세스마다 모델 1개)
+############################
+_worker_encoder = None
+
+
+def _init_worker(backend: str, max_length: int, torch_threads: int):
+    global _worker_encoder
+    import torch
+    from FlagEmbedding import BGEM3FlagModel
+    from encoder import make_encoder
+
+    torch.set_num_threads(torch_threads)
+    model = BGEM3FlagModel("BAAI/bge-m3", use_fp16=False, device="cpu")
+    _worker_encoder = make_encoder(backend, model, max_length=max_length)
+
+
+def _encode_batch(texts):
+    return _worker_encoder.encode(texts)
+
+
+def _encode_sparse_batch(texts):
+    return _worker_encoder.encode_sparse(texts)
+
+
+def _encode_colbert_batch(texts):
+    # 프로세스 간 전송량을 줄이기 위해 float16으로 반환
+    return [v.astype(np.float16) for v in _worker_encoder.encode_colbert(texts)]
+
+
+############################
+# 체크포인트
+############################
+def source_signature(path: str) -> dict:
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_checkpoint(path: str, signature: dict, chunk_rows: int) -> dict:
+    """같은 원본 / 같은 청크 크기의 체크포인트만 이어서 사용"""
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("source") == signature and state.get("chunk_rows") == chunk_rows:
+            return state
+        logger.warning("checkpoint %s does not match the source; starting over", path)
+    return {"source": signature, "chunk_rows": chunk_rows, "next_chunk": 0, "docs": 0, "seconds": 0.0}
+
+
+def save_checkpoint(path: str, state: dict):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+############################
+# 변경 목록(manifest): 실행 중인 앱의 스냅샷 갱신용
+############################
+# db_path/deltas/{version:08d}.json = {"version", "full", "upserted": [문서 id], "deleted": [문서 id]}
+# full=True는 전체 재색인 (앱은 스냅샷을 처음부터 다시 읽음)
+def latest_delta_version(db_path: str) -> int:
+    delta_dir = os.path.join(db_path, DELTA_DIR)
+    if not os.path.isdir(delta_dir):
+        return 0
+    versions = [int(name[:-5]) for name in os.listdir(delta_dir) if name.endswith(".json") and name[:-5].isdigit()]
+    return max(versions, default=0)
+
+
+def write_delta_manifest(db_path: str, upserted=(), deleted=(), full: bool = False, keep: int = 100) -> int:
+    """변경 목록을 다음 버전으로 기록하고 오래된 목록은 keep개만 남김. 새 버전 반환"""
+    delta_dir = os.path.join(db_path, DELTA_DIR)
+    os.makedirs(delta_dir, exist_ok=True)
+    version = latest_delta_version(db_path) + 1
+    save_checkpoint(os.path.join(delta_dir, f"{version:08d}.json"), {
+        "version": version,
+        "created_at": time.time(),
+        "full": full,
+        "upserted": list(upserted),
+        "deleted": list(deleted),
+    })
+    for name in sorted(os.listdir(delta_dir)):
+        if name.endswith(".json") and name[:-5].isdigit() and int(name[:-5]) <= version - keep:
+            os.remove(os.path.join(delta_dir, name))
+    return version
+
+
+def read_delta_manifests(db_path: str, since: int) -> list:
+    """since 이후 버전의 변경 목록 (버전 순). 중간 버전이 지워졌으면 None"""
+    latest = latest_delta_version(db_path)
+    manifests = []
+    for version in range(since + 1, latest + 1):
+        path = os.path.join(db_path, DELTA_DIR, f"{version:08d}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            manifests.append(json.load(f))
+    return manifests
+
+
+############################
+# 인코딩 + upsert 공통
+############################
+def open_collection(db_path: str, collection_name: str, upsert_batch: int = 5000):
+    """(client, collection, upsert 배치 크기) — 컬렉션이 없으면 cosine 공간으로 생성"""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=db_path)
+    collection = client.get_or_create_collection(collection_name, metadata={"hnsw:space": "cosine"})
+    max_batch = min(upsert_batch, getattr(client, "max_batch_size", upsert_batch) or upsert_batch)
+    return client, collection, max_batch
+
+
+def encoder_pool(workers: int, backend: str = "fp32", max_length: int = 1024) -> ProcessPoolExecutor:
+    """워커마다 BGE 모델을 하나씩 올린 인코딩 프로세스 풀 (코어를 워커 수로 나눠 torch 스레드 배정)"""
+    torch_threads = max(1, (os.cpu_count() or 1) // workers)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(backend, max_length, torch_threads)
+    )
+
+
+def encode_and_upsert(pool, collection, docs: list, batch_size: int, max_batch: int):
+    """문서를 길이 순 배치로 병렬 인코딩한 뒤 대량 upsert"""
+    batches = length_sorted_batches(docs, batch_size)
+    if not batches:
+        return
+    vectors = list(pool.map(_encode_batch, [[d[1] for d in b] for b in batches]))
+    upsert_documents(collection, [d for b in batches for d in b], np.vstack(vectors), max_batch)
+
+
+def encode_sparse(pool, docs: list, batch_size: int) -> dict:
+    """문서를 길이 순 배치로 병렬 인코딩해 {문서 id: {토큰 id: 가중치}} 반환"""
+    batches = length_sorted_batches(docs, batch_size)
+    weights = pool.map(_encode_sparse_batch, [[d[1] for d in b] for b in batches])
+    return {d[0]: lw for b, batch_weights in zip(batches, weights) for d, lw in zip(b, batch_weights)}
+
+
+def build_sparse_index(pool, source: str, out_path: str, batch_size: int = 32, chunk_rows: int = 2000):
+    """공고 테이블 전체의 자격요건및우대사항 문서로 sparse 역색인 생성 후 저장"""
+    doc_ids, job_ids, weights = [], [], []
+    for chunk_no, rows in enumerate(iter_posting_chunks(source, chunk_rows)):
+        docs = [d for d in chunk_documents(rows, chunk_no * chunk_rows) if d[2]["type"] == SPARSE_FIELD]
+        encoded = encode_sparse(pool, docs, batch_size)
+        for d in docs:
+            doc_ids.append(d[0])
+            job_ids.append(d[2]["공고id"])
+            weights.append(encoded[d[0]])
+    index = SparseIndex.from_weights(job_ids, weights, doc_ids)
+    index.save(out_path)
+    logger.info("sparse index: %d postings, %d tokens, %.1f MiB", len(index), len(index.tokens), index.nbytes / 2 ** 20)
+    return index
+
+
+def write_colbert(pool, writer: ColbertWriter, docs: list, batch_size: int):
+    """문서를 길이 순 배치로 병렬 인코딩해 ColBERT 토큰 벡터를 저장소에 추가"""
+    batches = length_sorted_batches(docs, batch_size)
+    for b, vecs in zip(batches, pool.map(_encode_colbert_batch, [[d[1] for d in b] for b in batches])):
+        for d, v in zip(b, vecs):
+            writer.add(d[0], v)
+
+
+def build_colbert_store(pool, source: str, out_dir: str, batch_size: int = 32, chunk_rows: int = 2000):
+    """공고 테이블 전체 문서의 ColBERT 토큰 벡터 저장소 생성"""
+    writer = ColbertWriter(out_dir)
+    try:
+        for chunk_no, rows in enumerate(iter_posting_chunks(source, chunk_rows)):
+            write_colbert(pool, writer, chunk_documents(rows, chunk_no * chunk_rows), batch_size)
+    finally:
+        writer.close()
+    logger.info("colbert store: %d docs, %d token rows", len(writer.entries), writer.n_rows)
+
+
+def upsert_documents(collection, docs: list, embeddings, max_batch: int):
+    """(문서 id, 텍스트, 메타데이터) 목록과 벡터를 max_batch 단위로 upsert"""
+    for start in range(0, len(docs), max_batch):
+        part = docs[start:start + max_batch]
+        collection.upsert(
+            ids=[d[0] for d in part],
+            documents=[d[1] for d in part],
+            metadatas=[d[2] for d in part],
+            embeddings=embeddings[start:start + len(part)].tolist()
+        )
+
+
+def ingest(source: str, db_path: str = DEFAULT_DB_PATH, collection_name: str = DEFAULT_COLLECTION,
+           workers: int = 1, batch_size: int = 32, chunk_rows: int = 2000, upsert_batch: int = 5000,
+           backend: str = "fp32", max_length: int = 1024, fresh: bool = False, sparse: bool = False,
+           colbert: bool = False) -> dict:
+    """
+    공고 테이블 전체를 색인. {"docs", "seconds", "docs_per_sec"} 반환
+    fresh: 기존 컬렉션과 체크포인트를 지우고 처음부터 다시 색인
+    sparse: dense 색인 후 자격요건및우대사항 sparse 역색인도 생성 (db_path/sparse_skills.npz)
+    colbert: dense 색인 후 ColBERT 토큰 벡터 저장소도 생성 (db_path/colbert)
+    """
+    client, collection, max_batch = open_collection(db_path, collection_name, upsert_batch)
+    checkpoint_path = os.path.join(db_path, CHECKPOINT_NAME)
+    if fresh:
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        client.delete_collection(collection_name)
+        _, collection, _ = open_collection(db_path, collection_name, upsert_batch)
+
+    state = load_checkpoint(checkpoint_path, source_signature(source), chunk_rows)
+    if state["next_chunk"]:
+        logger.info("resuming at chunk %d (%d docs already indexed)", state["next_chunk"], state["docs"])
+
+    with encoder_pool(workers, backend, max_length) as pool:
+        for chunk_no, rows in enumerate(iter_posting_chunks(source, chunk_rows)):
+            if chunk_no < state["next_chunk"]:
+                continue
+            chunk_start = time.perf_counter()
+            docs = chunk_documents(rows, chunk_no * chunk_rows)
+            encode_and_upsert(pool, collection, docs, batch_size, max_batch)
+
+            elapsed = time.perf_counter() - chunk_start
+            state["next_chunk"] = chunk_no + 1
+            state["docs"] += len(docs)
+            state["seconds"] += elapsed
+            save_checkpoint(checkpoint_path, state)
+            logger.info(
+                "chunk %d: %d postings, %d docs, %.1f docs/sec (total %d docs, %.1f docs/sec)",
+                chunk_no, len(rows), len(docs), len(docs) / elapsed if elapsed else 0.0,
+                state["docs"], state["docs"] / state["seconds"] if state["seconds"] else 0.0
+            )
+
+        if sparse:
+            sparse_start = time.perf_counter()
+            build_sparse_index(pool, source, os.path.join(db_path, SPARSE_INDEX_NAME), batch_size, chunk_rows)
+            logger.info("sparse index built in %.1fs", time.perf_counter() - sparse_start)
+        if colbert:
+            colbert_start = time.perf_counter()
+            build_colbert_store(pool, source, os.path.join(db_path, COLBERT_DIR_NAME), batch_size, chunk_rows)
+            logger.info("colbert store built in %.1fs", time.perf_counter() - colbert_start)
+
+    write_delta_manifest(db_path, full=True)
+    return {
+        "docs": state["docs"],
+        "seconds": state["seconds"],
+        "docs_per_sec": state["docs"] / state["seconds"] if state["seconds"] else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="공고 테이블 -> Chroma 컬렉션 병렬 색인 (체크포인트 재개 지원)")
+    parser.add_argument("source", nargs="?", default=DEFAULT_EXCEL_PATH, help=".xlsx 또는 .arrow 공고 테이블")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--chunk-rows", type=int, default=2000, help="체크포인트 단위 공고 행 수")
+    parser.add_argument("--upsert-batch", type=int, default=5000)
+    parser.add_argument("--backend", default="fp32", choices=("fp32", "int8", "onnx"))
+    parser.add_argument("--max-length", type=int, default=1024)
+    parser.add_argument("--fresh", action="store_true", help="기존 컬렉션/체크포인트 삭제 후 처음부터 색인")
+    parser.add_argument("--sparse", action="store_true", help="자격요건및우대사항 sparse 역색인도 생성")
+    parser.add_argument("--colbert", action="store_true", help="ColBERT 토큰 벡터 저장소도 생성 (재순위용)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    result = ingest(
+        args.source, args.db, args.collection,
+        workers=args.workers, batch_size=args.batch_size, chunk_rows=args.chunk_rows,
+        upsert_batch=args.upsert_batch, backend=args.backend, max_length=args.max_length, fresh=args.fresh,
+        sparse=args.sparse, colbert=args.colbert
+    )
+    print(f"{result['docs']} docs in {result['seconds']:.1f}s ({result['docs_per_sec']:.1f} docs/sec)")
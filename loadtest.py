@@ -0,0 +1,252 @@
+import argparse
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmark import CASES, percentiles, random_profile
+from hard_filter import ALL_REGIONS
+from locations import location_dict
+from openai_stub import StubOpenAIServer
+from rationale import FALLBACK_NOTICE, RATIONALE_ERROR_TEXT
+from session_result import state_bytes
+
+############################
+# 동시 사용자 부하 테스트 (실제 app.py 스크립트 헤드리스 실행)
+############################
+# benchmark.py는 Streamlit 없이 파이프라인 단계만 재므로, 여러 세션이 같은 get_bge_model /
+# Chroma 컬렉션 / 스냅샷을 공유할 때의 동작은 보이지 않는다.
+# 이 도구는 streamlit.testing.v1.AppTest로 app.py를 세션마다 헤드리스로 실행하고
+# 가상 사용자 N명(스레드)이 입력 폼을 채워 제출하는 과정을 반복한다.
+# - 입력: benchmark.random_profile 합성 입력 또는 --profiles JSONL (같은 키의 기록된 입력)
+# - 추천 사유: 로컬 OpenAI 호환 스텁 서버(openai_stub.py)로 대체 (OPENAI_BASE_URL)
+# - 동시 사용자 수 단계별로 처리량, 제출~결과 지연 p50/p95/p99, 오류율을 출력
+#
+# 모든 세션이 한 프로세스에서 실행되므로 cache_resource 자원(모델, 스냅샷, 결과 캐시)은 실제 서버처럼 공유된다.
+# 앱과 같은 디렉터리(chroma_db_bge, 공고 파일)가 있어야 한다.
+#
+# 사용 예:
+#   python loadtest.py --users 1,5,10,25,50 --sessions 4
+#   python loadtest.py --users 10 --profiles sessions.jsonl --ttft-ms 1500 --json load.json
+#   python loadtest.py --users 50 --no-result-cache --stub-error-rate 0.05
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+SUBMIT_LABEL = "🚀 답변 제출"
+SOFT_INPUTS = (("job_task", "업무"), ("job_skills", "스킬"), ("job_benefits", "혜택"))
+
+
+def load_profiles(path: str) -> list:
+    """기록된 입력 (한 줄에 random_profile과 같은 키의 JSON 하나)"""
+    profiles = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                profiles.append(json.loads(line))
+    return profiles
+
+
+def region_widgets(regions) -> tuple:
+    """
+    지역 키 목록 -> (시/도 multiselect 값, {시/도: 시/군/구 multiselect 값})
+    "전체" -> 시/도 "전체" / 시/도명 -> 시/군/구 "전체" / "시도 시군구" -> 해당 시/군/구 / 세종 -> 시/군/구 없음
+    """
+    if not regions or ALL_REGIONS in regions:
+        return ["전체"], {}
+    sidos, sigungu = [], {}
+    for region in regions:
+        sido, _, sg = region.partition(" ")
+        if sido not in sidos:
+            sidos.append(sido)
+        if not location_dict.get(sido):
+            continue
+        picked = sigungu.setdefault(sido, [])
+        if not sg:
+            sigungu[sido] = ["전체"]
+        elif picked != ["전체"] and sg not in picked:
+            picked.append(sg)
+    return sidos, sigungu
+
+
+def _by_label(widgets, text: str):
+    for w in widgets:
+        if text in w.label:
+            return w
+    raise LookupError(f"'{text}' 위젯을 찾을 수 없습니다.")
+
+
+def fill_form(at, profile: dict, timeout: float):
+    """입력 폼을 사용자 순서대로 채움 (on_change 콜백과 조건부 위젯이 반영되도록 단계별로 실행)"""
+    _by_label(at.text_input, "직무명").input(profile.get("job_title") or "")
+    _by_label(at.slider, "경력").set_value(int(profile.get("experience") or 0))
+
+    sidos, sigungu = region_widgets(profile.get("regions"))
+    at.multiselect(key="selected_sido_widget").set_value(sidos)
+    at.run(timeout=timeout)
+    for sido, values in sigungu.items():
+        at.multiselect(key=f"selected_sigungu_{sido}_widget").set_value(values)
+    if sigungu:
+        at.run(timeout=timeout)
+
+    for key, label in SOFT_INPUTS:
+        _by_label(at.text_area, label).input(profile.get(key) or "")
+    at.run(timeout=timeout)
+    for key, _ in SOFT_INPUTS:
+        if profile.get(key) and profile.get(f"{key}_importance"):
+            at.slider(key=f"{key}_importance").set_value(int(profile[f"{key}_importance"]))
+
+
+def run_session(profile: dict, timeout: float) -> dict:
+    """
+    새 세션 하나로 앱을 열고 입력 후 제출
+    status: ok / empty (추천 결과 없음 경고) / error (스크립트 예외 또는 시간 초과)
+    latency: 제출 클릭 ~ 결과 렌더링 완료 (초)
+    state_bytes: 제출 후 세션에 남은 검색 결과 상태 크기 (session_result.state_bytes)
+    rationale_error: GPT 추천 사유 대신 오류 문구 / 로컬 대체 설명이 표시되었는지
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.secrets["OPENAI_API_KEY"] = "stub"
+    result = {"status": "ok", "latency": None, "rationale_error": False, "state_bytes": None, "error": None}
+    try:
+        at.run()
+        fill_form(at, profile, timeout)
+        start = time.perf_counter()
+        _by_label(at.button, SUBMIT_LABEL).click().run()
+        result["latency"] = time.perf_counter() - start
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+        return result
+
+    if at.exception:
+        result.update(status="error", error=at.exception[0].value)
+    elif at.session_state["analysis_result"] is None:
+        result["status"] = "empty"
+    else:
+        result["state_bytes"] = state_bytes(at.session_state["analysis_result"])
+    # 추천 사유는 세션이 아니라 결과 캐시에 있으므로 화면에 그려진 내용으로 판단
+    # (오류 문구 또는 로컬 대체 설명이 보이면 GPT 응답을 제때 보여주지 못한 것)
+    rendered = " ".join(str(m.value) for m in at.markdown)
+    result["rationale_error"] = RATIONALE_ERROR_TEXT in rendered or FALLBACK_NOTICE in rendered
+    return result
+
+
+def run_level(profiles, users: int, sessions_per_user: int, timeout: float) -> tuple:
+    """가상 사용자 users명이 각각 sessions_per_user번 제출. 반환: (세션 결과 목록, 경과 시간)"""
+    lock = threading.Lock()
+
+    def next_profile():
+        with lock:
+            return next(profiles)
+
+    def user_loop(_):
+        return [run_session(next_profile(), timeout) for _ in range(sessions_per_user)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(users) as pool:
+        results = [r for rs in pool.map(user_loop, range(users)) for r in rs]
+    return results, time.perf_counter() - start
+
+
+def summarize_level(users: int, results: list, elapsed: float, llm_requests: int) -> dict:
+    n = len(results)
+    count = {s: sum(r["status"] == s for r in results) for s in ("ok", "empty", "error")}
+    errors = {}
+    for r in results:
+        if r["error"]:
+            errors[r["error"]] = errors.get(r["error"], 0) + 1
+    state_sizes = [r["state_bytes"] for r in results if r["state_bytes"] is not None]
+    return {
+        "users": users,
+        "sessions": n,
+        "elapsed_s": elapsed,
+        "throughput": n / elapsed if elapsed else 0.0,
+        "latency": percentiles([r["latency"] for r in results if r["status"] != "error"]),
+        "error_rate": count["error"] / n if n else 0.0,
+        "empty_rate": count["empty"] / n if n else 0.0,
+        "rationale_error_rate": sum(r["rationale_error"] for r in results) / n if n else 0.0,
+        "llm_requests": llm_requests,
+        "state_kib": float(np.mean(state_sizes)) / 1024 if state_sizes else 0.0,
+        "errors": errors,
+    }
+
+
+def print_report(levels: list, meta: dict):
+    print(f"sessions/user={meta['sessions']} stub ttft={meta['ttft_ms']:.0f}ms tokens={meta['n_tokens']} "
+          f"error_rate={meta['stub_error_rate']} result_cache={'on' if meta['result_cache'] else 'off'}")
+    header = (f"{'users':>6}{'n':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"{'err%':>7}{'empty%':>8}{'llm_err%':>9}{'llm':>6}{'state KiB':>11}")
+    print(header)
+    print("-" * len(header))
+    for lv in levels:
+        p = lv["latency"]
+        fmt = (lambda v: f"{v:>10.0f}") if p["n"] else (lambda v: f"{'-':>10}")
+        print(f"{lv['users']:>6}{lv['sessions']:>6}{lv['throughput']:>9.2f}"
+              f"{fmt(p['p50'])}{fmt(p['p95'])}{fmt(p['p99'])}"
+              f"{100 * lv['error_rate']:>7.1f}{100 * lv['empty_rate']:>8.1f}"
+              f"{100 * lv['rationale_error_rate']:>9.1f}{lv['llm_requests']:>6}{lv['state_kib']:>11.1f}")
+    for lv in levels:
+        for message, n in lv["errors"].items():
+            print(f"[users={lv['users']}] {n}x {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 사용자 부하 테스트 (app.py 헤드리스 실행 + OpenAI 스텁)")
+    parser.add_argument("--users", default="1,5,10,25,50", help="동시 사용자 수 단계 (쉼표 구분)")
+    parser.add_argument("--sessions", type=int, default=4, help="단계마다 사용자당 제출 수")
+    parser.add_argument("--warmup", type=int, default=1, help="측정 전 단일 사용자 제출 수 (모델/스냅샷 로드)")
+    parser.add_argument("--profiles", default="", help="기록된 입력 JSONL (없으면 합성 입력)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120.0, help="스크립트 실행 1회 제한 시간 (초)")
+    parser.add_argument("--ttft-ms", type=float, default=800.0, help="스텁 첫 토큰 지연")
+    parser.add_argument("--tokens", type=int, default=200, help="스텁 응답 토큰 수")
+    parser.add_argument("--token-interval-ms", type=float, default=20.0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0, help="스텁이 500으로 응답할 비율")
+    parser.add_argument("--no-result-cache", action="store_true", help="검색 조건 결과 캐시 끄기 (RESULT_CACHE_ENABLED=0)")
+    parser.add_argument("--json", default="", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.profiles:
+        recorded = load_profiles(args.profiles)
+        profiles = itertools.cycle(recorded)
+    else:
+        rng = np.random.default_rng(args.seed)
+        profiles = (random_profile(rng, CASES[i % len(CASES)]) for i in itertools.count())
+
+    # app.py의 상대 경로(chroma_db_bge 등)와 환경 설정은 import 시점에 읽히므로 세션 생성 전에 지정
+    os.chdir(os.path.dirname(APP_PATH))
+    if args.no_result_cache:
+        os.environ["RESULT_CACHE_ENABLED"] = "0"
+
+    stub = StubOpenAIServer(
+        ttft_ms=args.ttft_ms, n_tokens=args.tokens,
+        token_interval_ms=args.token_interval_ms, error_rate=args.stub_error_rate
+    )
+    levels = []
+    with stub:
+        os.environ["OPENAI_BASE_URL"] = stub.base_url
+        if args.warmup:
+            run_level(profiles, 1, args.warmup, args.timeout)
+        for users in (int(u) for u in args.users.split(",") if u.strip()):
+            before = stub.requests
+            results, elapsed = run_level(profiles, users, args.sessions, args.timeout)
+            levels.append(summarize_level(users, results, elapsed, stub.requests - before))
+
+    meta = {
+        "sessions": args.sessions, "ttft_ms": args.ttft_ms, "n_tokens": args.tokens,
+        "stub_error_rate": args.stub_error_rate, "result_cache": not args.no_result_cache,
+        "profiles": args.profiles or "synthetic",
+    }
+    print_report(levels, meta)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "levels": levels}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
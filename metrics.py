@@ -0,0 +1,211 @@
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+############################
+# 단계별 지연 계측 + 메트릭 내보내기
+############################
+# 제출 한 건을 RequestTrace로 감싸 단계(hard_filter, embed, score, join, render, rationale ...)별
+# 소요 시간을 기록하고, Case(A~D) / 하드필터 통과 공고 수 구간 / 소프트필터 개수로 태깅한다.
+# 집계 결과는 두 가지로 내보낸다.
+# - Prometheus 텍스트 형식 히스토그램 (METRICS_PORT의 /metrics)
+# - 요청 단위 rolling JSONL 파일 (METRICS_JSONL_PATH, 크기 초과 시 .1로 교체)
+
+logger = logging.getLogger(__name__)
+
+# 초 단위 히스토그램 버킷
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 하드필터 통과 공고 수 구간 (Prometheus 라벨 카디널리티 제한용)
+CARDINALITY_BUCKETS = ((0, "0"), (100, "1-100"), (1000, "101-1k"), (10000, "1k-10k"), (100000, "10k-100k"))
+
+
+def cardinality_bucket(n: int) -> str:
+    for upper, label in CARDINALITY_BUCKETS:
+        if n <= upper:
+            return label
+    return "100k+"
+
+
+class Histogram:
+    """누적 버킷 히스토그램"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """
+    프로세스 단위 메트릭 저장소
+
+    jsonl_path: 요청 단위 JSONL 경로 (None이면 기록하지 않음)
+    jsonl_max_bytes: 이 크기를 넘으면 jsonl_path.1로 교체 후 새 파일 시작
+    """
+
+    def __init__(self, namespace: str = "servicedemo", jsonl_path=None, jsonl_max_bytes: int = 50 * 2 ** 20):
+        self.namespace = namespace
+        self.jsonl_path = jsonl_path
+        self.jsonl_max_bytes = jsonl_max_bytes
+        self.stage_histograms = {}
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._collectors = []
+
+    def add_collector(self, collect):
+        """
+        /metrics에 덧붙일 외부 메트릭 등록
+        collect: namespace -> Prometheus 텍스트 줄 목록 (예: ResultCache.prometheus_lines)
+        """
+        self._collectors.append(collect)
+
+    def trace(self) -> "RequestTrace":
+        return RequestTrace(self)
+
+    def record(self, trace: "RequestTrace"):
+        labels = trace.labels()
+        with self._lock:
+            for stage, seconds in trace.stages.items():
+                key = (stage,) + labels
+                if key not in self.stage_histograms:
+                    self.stage_histograms[key] = Histogram()
+                self.stage_histograms[key].observe(seconds)
+            count_key = labels + (trace.status,)
+            self.request_counts[count_key] = self.request_counts.get(count_key, 0) + 1
+            if self.jsonl_path:
+                self._write_jsonl(trace.to_dict())
+
+    def _write_jsonl(self, row: dict):
+        try:
+            if os.path.exists(self.jsonl_path) and os.path.getsize(self.jsonl_path) > self.jsonl_max_bytes:
+                os.replace(self.jsonl_path, self.jsonl_path + ".1")
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning("metrics jsonl write failed: %s", e)
+
+    def render_prometheus(self) -> str:
+        """Prometheus 텍스트 노출 형식"""
+        ns = self.namespace
+        lines = [
+            f"# HELP {ns}_stage_seconds Per-stage latency of a recommendation request.",
+            f"# TYPE {ns}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for (stage, case, soft_filters, hard_jobs), hist in sorted(self.stage_histograms.items()):
+                base = f'stage="{stage}",case="{case}",soft_filters="{soft_filters}",hard_jobs="{hard_jobs}"'
+                for upper, count in zip(hist.buckets, hist.counts):
+                    lines.append(f'{ns}_stage_seconds_bucket{{{base},le="{upper}"}} {count}')
+                lines.append(f'{ns}_stage_seconds_bucket{{{base},le="+Inf"}} {hist.total}')
+                lines.append(f"{ns}_stage_seconds_sum{{{base}}} {hist.sum:.6f}")
+                lines.append(f"{ns}_stage_seconds_count{{{base}}} {hist.total}")
+            lines.append(f"# HELP {ns}_requests_total Recommendation requests by outcome.")
+            lines.append(f"# TYPE {ns}_requests_total counter")
+            for (case, soft_filters, hard_jobs, status), count in sorted(self.request_counts.items()):
+                lines.append(
+                    f'{ns}_requests_total{{case="{case}",soft_filters="{soft_filters}",'
+                    f'hard_jobs="{hard_jobs}",status="{status}"}} {count}'
+                )
+        for collect in self._collectors:
+            lines.extend(collect(ns))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "0.0.0.0"):
+        """
+        /metrics 엔드포인트를 데몬 스레드로 제공 (프로세스당 한 번)
+        같은 호스트의 다른 프로세스가 포트를 이미 사용 중이면 경고만 남기고 엔드포인트 없이 계속 (반환: 제공 여부)
+        """
+        if self._server is not None:
+            return True
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logger.warning("metrics endpoint disabled: cannot bind %s:%d (%s)", host, port, e)
+            return False
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logger.info("metrics endpoint on :%d/metrics", port)
+        return True
+
+
+class RequestTrace:
+    """
+    제출 한 건의 단계별 시간 기록
+    trace(stage)는 context manager로 pipeline.recommend의 timer 인자와 호환
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.tags = {"case": "-", "soft_filters": 0, "hard_jobs": 0}
+        self.status = "ok"
+        self._finished = False
+
+    @contextlib.contextmanager
+    def __call__(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def tag(self, **tags):
+        self.tags.update(tags)
+
+    def labels(self) -> tuple:
+        return (
+            str(self.tags["case"]),
+            str(self.tags["soft_filters"]),
+            cardinality_bucket(int(self.tags["hard_jobs"])),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": time.time(),
+            "status": self.status,
+            **self.tags,
+            "stages": {k: round(v, 6) for k, v in self.stages.items()},
+        }
+
+    def finish(self, status: str = None):
+        """전체 시간(total)을 더해 레지스트리에 기록 (중복 호출 무시)"""
+        if self._finished:
+            return
+        self._finished = True
+        if status:
+            self.status = status
+        self.stages["total"] = time.perf_counter() - self.start
+        self.registry.record(self)
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+############################
+# 로컬 OpenAI 호환 스텁 서버 (부하 테스트용)
+############################
+# POST /v1/chat/completions 만 흉내 낸다.
+# - stream=true: ttft_ms 뒤 첫 토큰, 이후 token_interval_ms 간격으로 n_tokens개 SSE 청크 후 [DONE]
+# - stream=false: 같은 시간만큼 기다린 뒤 완성 응답 한 번
+# - error_rate: 이 비율의 요청은 500 응답 (오류 처리 경로 확인용)
+# OPENAI_BASE_URL=http://127.0.0.1:{port}/v1 로 지정하면 openai 클라이언트가 실제 API 대신 이 서버를 호출한다.
+# 유료 호출 없이 추천 사유 단계의 지연을 재현하기 위한 것으로, 응답 내용은 의미 없는 고정 문장이다.
+
+
+class StubOpenAIServer:
+    """
+    ttft_ms: 첫 토큰까지 지연
+    n_tokens / token_interval_ms: 스트리밍 토큰 수 / 간격
+    error_rate: 500 오류로 응답할 요청 비율 (0~1, 요청 순번으로 결정)
+    """
+
+    def __init__(self, port: int = 0, ttft_ms: float = 800.0, n_tokens: int = 200,
+                 token_interval_ms: float = 20.0, error_rate: float = 0.0, host: str = "127.0.0.1"):
+        self.ttft = ttft_ms / 1000.0
+        self.n_tokens = n_tokens
+        self.token_interval = token_interval_ms / 1000.0
+        self.error_rate = error_rate
+        self.requests = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="openai-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_request(self, body: dict) -> bool:
+        """요청 수를 세고 이 요청을 오류로 응답할지 반환"""
+        with self._lock:
+            self.requests += 1
+            n = self.requests
+            self.prompt_chars += sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        if self.error_rate <= 0:
+            return False
+        # 요청 순번 기준으로 고르게 분산 (예: 0.1이면 10건 중 1건)
+        return int(n * self.error_rate) != int((n - 1) * self.error_rate)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+                    return
+                if stub._next_request(body):
+                    self._send_json(500, {"error": {"message": "stub error", "type": "server_error"}})
+                    return
+
+                model = body.get("model", "stub")
+                if not body.get("stream"):
+                    time.sleep(stub.ttft + stub.token_interval * stub.n_tokens)
+                    self._send_json(200, {
+                        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                        "model": model,
+                        "choices": [{
+                            "index": 0, "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": "스텁 응답 " * stub.n_tokens},
+                        }],
+                        "usage": {"prompt_tokens": 0, "completion_tokens": stub.n_tokens, "total_tokens": stub.n_tokens},
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                time.sleep(stub.ttft)
+                try:
+                    for i in range(stub.n_tokens):
+                        chunk = {
+                            "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                            "model": model,
+                            "choices": [{"index": 0, "delta": {"content": "스텁 "}, "finish_reason": None}],
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                        if i + 1 < stub.n_tokens:
+                            time.sleep(stub.token_interval)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                self.close_connection = True
+
+        return Handler
@@ -0,0 +1,263 @@
+import contextlib
+
+import numpy as np
+
+from ann import ann_candidate_mask, log_recall
+from scoring import TITLE_TYPE
+from sparse_index import SPARSE_FIELD, sparse_prune_mask
+
+############################
+# 추천 파이프라인 (하드필터 -> 임베딩 -> 점수 계산)
+############################
+# app.py의 제출 흐름에서 Streamlit과 무관한 부분만 분리한 모듈.
+# 벤치마크 / 부하 테스트 등에서도 동일한 로직을 그대로 실행할 수 있다.
+#
+# - Case A: 공고제목만 있고 소프트필터(주요업무, 자격요건및우대사항, 혜택및복지)는 없음
+# - Case B: 공고제목 + 소프트필터 1개 이상 (공고제목 유사도 0.7 threshold 통과 공고만 채점)
+# - Case C: 공고제목 없이 소프트필터만 있음
+# - Case D: 공고제목도 소프트필터도 없음 (하드필터 통과 순서대로)
+
+TITLE_THRESHOLD = 0.7
+SOFT_FILTER_FIELDS = ("주요업무", "자격요건및우대사항", "혜택및복지")
+
+
+def build_soft_filter_dict(job_task="", job_task_importance=None, job_skills="", job_skills_importance=None,
+                           job_benefits="", job_benefits_importance=None) -> dict:
+    """
+    사용자 입력과 중요도로 소프트필터 dict 구성
+    {"주요업무": {"가중치": 0.xx, "조건": [텍스트]}, ...} (가중치 = 중요도 / 중요도 합)
+    """
+    soft_filters = []
+    for col_name, text, importance in (
+        ("주요업무", job_task, job_task_importance),
+        ("자격요건및우대사항", job_skills, job_skills_importance),
+        ("혜택및복지", job_benefits, job_benefits_importance),
+    ):
+        if text and text.strip() and importance is not None:
+            soft_filters.append((col_name, [text.strip()], importance))
+
+    total_importance = sum([f[2] for f in soft_filters])
+    soft_filter_dict = {}
+    if total_importance > 0:
+        for col_name, kw_list, imp in soft_filters:
+            soft_filter_dict[col_name] = {
+                "가중치": round(imp / total_importance, 4),
+                "조건": kw_list
+            }
+    return soft_filter_dict
+
+
+def classify_case(job_title_input: str, soft_filter_dict: dict) -> str:
+    """입력 조합에 따른 Case (A/B/C/D)"""
+    if job_title_input:
+        return "B" if soft_filter_dict else "A"
+    return "C" if soft_filter_dict else "D"
+
+
+class Recommendation:
+    """
+    파이프라인 결과
+
+    case: "A" | "B" | "C" | "D"
+    ranked: [(공고id, 점수), ...] 순위 순서 (Case D는 점수 0.0)
+    scores: {공고id: 점수} (Case D는 None)
+    warning: 결과가 없을 때 사용자에게 보여줄 메시지 (정상이면 None)
+    reranked: ColBERT 재순위가 시간 예산 안에 적용되었으면 True
+    field_scores: {공고id: {소프트필터 필드: 유사도}} 최종 상위 공고의 필드별 dense 유사도 (Case B/C, 그 외 None)
+    rerank_scores: {공고id: ColBERT MaxSim 점수} 재순위가 적용된 경우만 (ranked / scores는 dense 점수 유지)
+    """
+
+    def __init__(self, case, ranked=None, scored=True, warning=None, hard_rows=0, hard_jobs=0,
+                 reranked=False, field_scores=None, rerank_scores=None):
+        self.case = case
+        self.ranked = ranked or []
+        self.scores = dict(self.ranked) if scored else None
+        self.warning = warning
+        self.hard_rows = hard_rows
+        self.hard_jobs = hard_jobs
+        self.reranked = reranked
+        self.field_scores = field_scores
+        self.rerank_scores = rerank_scores
+
+    @property
+    def job_ids(self) -> list:
+        return [j_id for j_id, _ in self.ranked]
+
+
+class AnnOptions:
+    """
+    Case B/C 근사 후보 생성 설정 (ann.py 참고)
+    collection: HNSW 인덱스를 가진 Chroma 컬렉션
+    """
+
+    def __init__(self, collection, top_n: int = 200, min_jobs: int = 2000, eval_rate: float = 0.0):
+        self.collection = collection
+        self.top_n = top_n
+        self.min_jobs = min_jobs
+        self.eval_rate = eval_rate
+
+
+class SparseOptions:
+    """
+    자격요건및우대사항 sparse(lexical) 채점 설정 (sparse_index.py 참고)
+    index: SparseIndex
+    encode_sparse: 텍스트 목록 -> [{토큰 id: 가중치}, ...] 함수
+    mode: "dense" | "sparse" | "hybrid"
+    top_n: hybrid에서 dense 채점할 sparse 상위 공고 수
+    alpha: hybrid에서 자격요건및우대사항 필드 점수에 더할 sparse 점수 비율
+    """
+
+    def __init__(self, index, encode_sparse, mode: str = "hybrid", top_n: int = 500, alpha: float = 0.3):
+        self.index = index
+        self.encode_sparse = encode_sparse
+        self.mode = mode
+        self.top_n = top_n
+        self.alpha = alpha
+
+
+def _no_timer(stage):
+    return contextlib.nullcontext()
+
+
+def recommend(snapshot, hard_index, encode, hard_filter_dict: dict, soft_filter_dict: dict,
+              job_title_input: str, k: int = 5, ann=None, sparse=None, rerank=None,
+              timer=None) -> Recommendation:
+    """
+    하드필터 -> 임베딩 -> 점수 계산 -> 상위 k개 선택
+
+    snapshot: EmbeddingSnapshot
+    hard_index: HardFilterIndex
+    encode: 텍스트 목록 -> (n, dim) 벡터 함수 (공고제목과 소프트필터 키워드를 한 번에 호출)
+    hard_filter_dict: {"경력": int, "근무위치": [지역 키, ...]}
+    soft_filter_dict: build_soft_filter_dict 결과
+    ann: AnnOptions (None이면 전수 채점)
+    sparse: SparseOptions (None이거나 mode="dense"면 dense 점수만 사용)
+    rerank: ColbertReranker (None이면 dense 순서 그대로). Case A~C의 dense 상위 top_n개만 재순위
+    timer: 단계 이름을 받아 context manager를 반환하는 함수 (단계별 시간 측정용)
+    """
+    timer = timer or _no_timer
+    case = classify_case(job_title_input, soft_filter_dict)
+
+    # C) 하드필터 (경력, 근무위치) -> 정수 코드 인덱스로 스냅샷 행 마스크 계산
+    with timer("hard_filter"):
+        hard_exp = float(hard_filter_dict["경력"])
+        hard_locs = hard_filter_dict["근무위치"]
+        hard_mask = hard_index.mask(hard_exp, hard_locs)
+        engine = snapshot.filtered_engine(hard_mask)
+    hard_rows, hard_jobs = int(hard_mask.sum()), int(engine.job_mask.sum())
+
+    # {소프트필터 필드: [질의 벡터, ...]} (임베딩 단계에서 채움)
+    keyword_embeddings = {}
+
+    def result(ranked=None, scored=True, warning=None, reranked=False, rerank_scores=None):
+        field_scores = None
+        if ranked and case in ("B", "C") and keyword_embeddings:
+            # 추천 사유 대체 설명용 필드별 유사도 (상위 k개 공고의 행만 다시 계산)
+            field_scores = engine.field_similarities(keyword_embeddings, [j_id for j_id, _ in ranked])
+        return Recommendation(
+            case, ranked, scored, warning, hard_rows, hard_jobs, reranked, field_scores, rerank_scores
+        )
+
+    if hard_rows == 0:
+        return result(warning="경력 및 근무위치 조건을 만족하는 공고가 없어요.")
+
+    use_sparse = sparse is not None and sparse.mode != "dense" and SPARSE_FIELD in soft_filter_dict
+
+    # 질의 임베딩 (공고제목 + 소프트필터 키워드를 한 번의 encode 호출로)
+    with timer("embed"):
+        dense_fields = [
+            (col_type, info["조건"]) for col_type, info in soft_filter_dict.items()
+            # sparse 모드에서는 자격요건및우대사항 dense 임베딩 불필요
+            if not (use_sparse and sparse.mode == "sparse" and col_type == SPARSE_FIELD)
+        ]
+        texts = ([job_title_input] if job_title_input else []) + [t for _, conds in dense_fields for t in conds]
+        vecs = encode(texts) if texts else []
+        title_vec = vecs[0] if job_title_input else None
+        pos = 1 if job_title_input else 0
+        for col_type, conds in dense_fields:
+            keyword_embeddings[col_type] = list(vecs[pos:pos + len(conds)])
+            pos += len(conds)
+        sparse_queries = sparse.encode_sparse(soft_filter_dict[SPARSE_FIELD]["조건"]) if use_sparse else None
+    weights = {col_type: info["가중치"] for col_type, info in soft_filter_dict.items()}
+
+    def soft_scores(target_mask):
+        if not use_sparse:
+            return dense_scores(target_mask)
+        # 자격요건및우대사항 sparse 점수 (hybrid는 sparse 상위 top_n 공고로 후보 축소)
+        lex = sparse.index.job_scores(sparse_queries, engine)
+        if sparse.mode == "hybrid":
+            pruned = sparse_prune_mask(lex, target_mask, sparse.top_n)
+            if pruned.sum() >= k:
+                target_mask = pruned
+        if keyword_embeddings:
+            scores, score_mask = dense_scores(target_mask)
+        else:
+            scores, score_mask = np.zeros(engine.n_jobs, dtype=np.float64), target_mask
+        scale = 1.0 if sparse.mode == "sparse" else sparse.alpha
+        return scores + weights[SPARSE_FIELD] * scale * lex, score_mask
+
+    def dense_scores(target_mask):
+        # (선택) HNSW 근사 후보 생성 -> 후보 공고만 정확히 재채점
+        if ann is not None and target_mask.sum() > ann.min_jobs:
+            candidate_mask = target_mask & ann_candidate_mask(
+                ann.collection, engine, keyword_embeddings, hard_exp,
+                hard_index.expand_regions(hard_locs), n_results=ann.top_n
+            )
+            if candidate_mask.sum() >= k:
+                scores = engine.soft_filter_scores(keyword_embeddings, weights, candidate_mask)
+                if np.random.random() < ann.eval_rate:
+                    log_recall(
+                        engine,
+                        engine.soft_filter_scores(keyword_embeddings, weights, target_mask),
+                        engine.rank(scores, k=k, job_mask=candidate_mask),
+                        job_mask=target_mask, k=k, n_results=ann.top_n,
+                        n_candidates=int(candidate_mask.sum())
+                    )
+                return scores, candidate_mask
+        return engine.soft_filter_scores(keyword_embeddings, weights, target_mask), target_mask
+
+    # 재순위를 쓰면 dense 상위 top_n개를 뽑아 두고 재순위 단계에서 k개로 줄임
+    n_ranked = max(k, rerank.top_n) if rerank is not None else k
+
+    with timer("score"):
+        if case == "A":
+            ranked = engine.rank(engine.title_scores(title_vec), k=n_ranked)
+            if not ranked:
+                return result(warning="공고제목 임베딩을 계산했지만, 해당 타입 문서가 없습니다.")
+            rerank_queries = {TITLE_TYPE: ([job_title_input], 1.0)}
+
+        elif case == "B":
+            pass_mask = engine.title_pass_mask(title_vec, TITLE_THRESHOLD)
+            if not pass_mask.any():
+                return result(warning="직무 조건의 threshold를 만족하는 공고가 없습니다.")
+            scores, score_mask = soft_scores(engine.job_mask & pass_mask)
+            ranked = engine.rank(scores, k=n_ranked, job_mask=score_mask)
+            if not ranked:
+                return result(warning="소프트필터를 만족하는 상위 공고가 없어요.")
+
+        elif case == "C":
+            scores, score_mask = soft_scores(engine.job_mask)
+            ranked = engine.rank(scores, k=n_ranked, job_mask=score_mask)
+            if not ranked:
+                return result(warning="소프트필터 결과, 상위 공고가 없어요.")
+
+        else:
+            # Case D: 하드필터 통과 순서대로 상위 k개
+            return result([(j_id, 0.0) for j_id in engine.active_job_ids()[:k]], scored=False)
+
+    if rerank is None:
+        return result(ranked)
+
+    # ColBERT MaxSim 재순위 (시간 예산 초과 시 dense 순서)
+    if case != "A":
+        rerank_queries = {
+            col_type: (info["조건"], weights[col_type]) for col_type, info in soft_filter_dict.items()
+        }
+    with timer("rerank"):
+        ranked_ids = [j_id for j_id, _ in ranked]
+        doc_ids = {}
+        for doc_type in rerank_queries:
+            rows = engine.field_rows(ranked_ids, doc_type)
+            doc_ids[doc_type] = [snapshot.doc_ids[r] if r >= 0 else None for r in rows]
+        ranked, reranked, rerank_scores = rerank.rerank(ranked, rerank_queries, doc_ids, k)
+    return result(ranked, reranked=reranked, rerank_scores=rerank_scores)
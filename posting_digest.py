@@ -0,0 +1,122 @@
+import argparse
+import re
+import time
+
+import pandas as pd
+
+from text_format import DETAIL_FIELDS, INDENTATION_MARKERS
+
+############################
+# 공고 필드별 요약(digest) 사전 계산 (공고 저장소 변환 시 1회)
+############################
+# 추천 사유 프롬프트에 주요업무 / 자격요건 / 우대사항 / 혜택및복지 원문을 그대로 넣으면
+# 공고가 길수록 프롬프트 토큰, 비용, GPT 응답 지연이 함께 늘어난다.
+# 공고 저장소 변환(posting_store.convert_excel) 때 필드마다 짧은 추출 요약을 만들어 {필드}_요약 컬럼으로 저장하고,
+# 추천 사유 프롬프트(rationale.py)는 원문 대신 이 컬럼을 사용한다.
+#
+# 요약 방식 (결정적, 외부 호출 없음):
+# - 줄 / 글머리 기호 단위로 항목을 나누고 앞쪽 기호·번호를 제거
+# - "[담당업무]", "자격요건:" 같은 소제목 줄, 너무 짧은 줄, 중복 항목은 제외
+# - 항목은 ITEM_CHARS자, 필드 전체는 DIGEST_ITEMS개 / DIGEST_CHARS자까지만 남김
+#
+# 기존 Arrow 파일에 요약 컬럼만 추가: python posting_digest.py ./all_raw.arrow
+
+DIGEST_ITEMS = 6
+DIGEST_CHARS = 320
+ITEM_CHARS = 80
+MIN_ITEM_CHARS = 2
+ITEM_SEPARATOR = " / "
+
+_WHITESPACE = re.compile(r"\s+")
+# 줄 앞의 글머리 기호 / 번호 (예: "1)", "2.", "(3)", "[4]", "-", "•")
+# 번호형 기호는 정규식으로, 여는 괄호 / 따옴표는 소제목·인용문일 수 있어 제외
+_SYMBOL_MARKERS = sorted(
+    {m.strip() for m in INDENTATION_MARKERS if not re.search(r"\d", m)} - {"[", "【", "“", "‘"}, key=len, reverse=True
+)
+_LEADING_MARKER = re.compile(
+    r"^(?:\(?\[?\d{1,2}[\)\]]|\d{1,2}\.(?=\s)|" + "|".join(re.escape(m) for m in _SYMBOL_MARKERS) + r")\s*"
+)
+# 한 줄 안에 이어 쓴 글머리 기호 (예: "Python • SQL • Spark")
+_INLINE_BULLET = re.compile(r"\s+[•·▪■●○▶ㆍ]\s+")
+# 줄 전체가 소제목인 경우 (예: "[담당업무]", "<자격요건>", "【우대사항】", "자격요건 :")
+_HEADING = re.compile(r"^(?:\[[^\]]{1,20}\]|<[^>]{1,20}>|【[^】]{1,20}】|[^\s:]{1,12}\s*:)$")
+
+
+def digest_column(field: str) -> str:
+    """프롬프트용 요약 컬럼명"""
+    return f"{field}_요약"
+
+
+def split_items(text: str) -> list:
+    """원문 -> 기호·번호를 뗀 항목 목록 (소제목 / 중복 제외, 항목은 ITEM_CHARS자까지)"""
+    items, seen = [], set()
+    for line in str(text).splitlines():
+        for part in _INLINE_BULLET.split(line):
+            item = part.strip()
+            if _HEADING.match(item):
+                continue
+            # 기호가 겹친 경우(예: "- 1) ...")까지 제거
+            for _ in range(2):
+                item = _LEADING_MARKER.sub("", item).strip()
+            item = _WHITESPACE.sub(" ", item).strip(" -:;,")
+            if len(item) < MIN_ITEM_CHARS or _HEADING.match(item):
+                continue
+            key = item.casefold()
+            if key in seen:
+                continue
+            seen.add(key)
+            items.append(item if len(item) <= ITEM_CHARS else item[:ITEM_CHARS].rstrip() + "…")
+    return items
+
+
+def digest_text(text, max_items: int = DIGEST_ITEMS, max_chars: int = DIGEST_CHARS) -> str:
+    """
+    필드 원문 -> 추출 요약 (결측치 / 빈 문자열은 빈 문자열)
+    앞쪽 항목부터 max_items개, 합쳐서 max_chars자를 넘지 않는 범위까지 " / "로 이어 붙임
+    """
+    if text is None or (not isinstance(text, str) and pd.isna(text)) or not text:
+        return ""
+    out, length = [], 0
+    for item in split_items(text)[:max_items]:
+        added = len(item) + (len(ITEM_SEPARATOR) if out else 0)
+        if out and length + added > max_chars:
+            break
+        out.append(item)
+        length += added
+    return ITEM_SEPARATOR.join(out)
+
+
+def add_digest_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """DETAIL_FIELDS별 요약(_요약) 컬럼 추가"""
+    df = df.copy()
+    for field in DETAIL_FIELDS:
+        if field in df.columns:
+            df[digest_column(field)] = df[field].map(digest_text)
+    return df
+
+
+def has_digest_columns(columns) -> bool:
+    return all(digest_column(f) in columns for f in DETAIL_FIELDS)
+
+
+if __name__ == "__main__":
+    from posting_store import PostingStore, write_frame
+
+    parser = argparse.ArgumentParser(description="공고 저장소(Arrow)에 필드별 요약 컬럼 추가")
+    parser.add_argument("store_path", nargs="?", default="./all_raw.arrow")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = PostingStore(args.store_path)
+    df = store.table.to_pandas()
+    store.close()
+    df = add_digest_columns(df.drop(columns=[digest_column(f) for f in DETAIL_FIELDS], errors="ignore"))
+    write_frame(df, args.store_path)
+
+    for field in DETAIL_FIELDS:
+        if field not in df.columns:
+            continue
+        raw = df[field].fillna("").astype(str).str.len().sum()
+        digest = df[digest_column(field)].str.len().sum()
+        print(f"{field}: {raw} -> {digest} chars ({100 * digest / max(raw, 1):.0f}%)")
+    print(f"{len(df)} rows -> {args.store_path} ({time.perf_counter() - start:.1f}s)")
@@ -0,0 +1,176 @@
+import argparse
+import contextlib
+import os
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from text_format import (
+    DETAIL_FIELDS, add_display_columns, display_column, format_display, has_display_columns,
+    preview_column
+)
+from posting_digest import add_digest_columns, has_digest_columns
+
+############################
+# 컬럼형 / 메모리 매핑 공고 저장소
+############################
+# all_raw.xlsx를 오프라인에서 Arrow IPC 파일(비압축)로 한 번 변환해 두고,
+# 프로세스에서는 pa.memory_map으로 열어 복사 없이 사용한다.
+# 공고id -> 행 오프셋 인덱스로 상위 k개 공고를 O(k)로 조회하며,
+# 주요업무/자격요건 같은 긴 텍스트 컬럼은 실제로 요청된 행/컬럼의 페이지만 읽힌다.
+# 변환 시 화면 표시용 텍스트(들여쓰기 적용본 / 미리보기)도 컬럼으로 한 번 계산해 둔다. (text_format.py)
+# 추천 사유 프롬프트용 필드별 요약(_요약)도 같은 단계에서 계산한다. (posting_digest.py)
+#
+# 변환: python posting_store.py ./all_raw.xlsx ./all_raw.arrow
+
+DEFAULT_EXCEL_PATH = "./all_raw.xlsx"
+DEFAULT_STORE_PATH = "./all_raw.arrow"
+
+# 결과 카드에 필요한 컬럼 (긴 텍스트는 미리보기 컬럼만, 전체 텍스트는 get_details로 조회)
+CARD_COLUMNS = ["공고id", "공고제목", "회사명", "근무위치", "경력", "공고상세url"] + [
+    preview_column(field) for field in DETAIL_FIELDS
+]
+
+
+def _normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Arrow 변환 전 컬럼 타입 정리
+    - 공고id는 문자열 (기존 load_all_excel_data와 동일)
+    - 타입이 섞인 object 컬럼은 결측치를 제외하고 문자열로 통일
+    """
+    df = df.copy()
+    df["공고id"] = df["공고id"].astype(str)
+    for col in df.columns:
+        if col != "공고id" and df[col].dtype == object:
+            df[col] = df[col].map(lambda v: v if pd.isna(v) else str(v))
+    return df
+
+
+def convert_excel(xlsx_path: str = DEFAULT_EXCEL_PATH, out_path: str = DEFAULT_STORE_PATH) -> int:
+    """
+    엑셀 공고 파일을 Arrow IPC 파일로 변환. 변환된 행 수 반환
+    """
+    df = add_digest_columns(add_display_columns(_normalize_frame(pd.read_excel(xlsx_path))))
+    write_frame(df, out_path)
+    return len(df)
+
+
+def write_frame(df: pd.DataFrame, out_path: str = DEFAULT_STORE_PATH):
+    """
+    DataFrame을 단일 청크 Arrow IPC 파일로 저장 (임시 파일에 쓴 뒤 교체)
+    임시 파일은 변환마다 고유한 이름이라 여러 프로세스가 동시에 변환해도 서로의 파일을 덮어쓰지 않음
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(out_path)), prefix=os.path.basename(out_path) + ".", suffix=".tmp"
+    )
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, out_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+class PostingStore:
+    """
+    메모리 매핑된 Arrow 공고 테이블 + 공고id -> 행 오프셋 인덱스
+    """
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._source = pa.memory_map(path, "r")
+        self.table = pa.ipc.open_file(self._source).read_all()
+
+        self.row_index = {}
+        for offset, j_id in enumerate(self.table.column("공고id").to_pylist()):
+            self.row_index.setdefault(j_id, []).append(offset)
+
+    @classmethod
+    def open(cls, path: str = DEFAULT_STORE_PATH, xlsx_path: str = DEFAULT_EXCEL_PATH):
+        """
+        Arrow 파일이 없거나 엑셀보다 오래된 경우 한 번 변환한 뒤 연다
+        표시용 / 요약 컬럼이 없는 이전 형식의 Arrow 파일도 엑셀이 있으면 다시 변환
+        """
+        if not os.path.exists(path) or (
+            os.path.exists(xlsx_path) and os.path.getmtime(xlsx_path) > os.path.getmtime(path)
+        ):
+            convert_excel(xlsx_path, path)
+        store = cls(path)
+        columns = store.columns
+        if not (has_display_columns(columns) and has_digest_columns(columns)) and os.path.exists(xlsx_path):
+            store.close()
+            convert_excel(xlsx_path, path)
+            store = cls(path)
+        return store
+
+    def close(self):
+        self.table = None
+        self._source.close()
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def columns(self) -> list:
+        return self.table.column_names
+
+    def offsets(self, job_ids, unique: bool = False) -> list:
+        """
+        공고id 순서대로 행 오프셋 목록 (없는 공고id는 제외)
+        unique: 공고id당 첫 행만 (원본 테이블에 같은 공고id가 여러 행 있을 수 있음. get_value / get_details와 같은 행)
+        """
+        out = []
+        for j_id in job_ids:
+            offsets = self.row_index.get(str(j_id), [])
+            out.extend(offsets[:1] if unique else offsets)
+        return out
+
+    def get_rows(self, job_ids, columns=None, unique: bool = False) -> pd.DataFrame:
+        """
+        공고id 목록에 해당하는 행을 요청 순서대로 DataFrame으로 반환
+        columns: 읽을 컬럼 목록 (None이면 전체)
+        unique: 공고id당 한 행만 (결과 카드용)
+        """
+        table = self.table if columns is None else self.table.select(
+            [c for c in columns if c in self.table.column_names]
+        )
+        offsets = self.offsets(job_ids, unique)
+        return table.take(pa.array(offsets, type=pa.int64())).to_pandas()
+
+    def get_details(self, job_id) -> dict:
+        """
+        상세 보기용 전체 텍스트 {필드: 들여쓰기 적용 텍스트} (단일 공고의 해당 컬럼 페이지만 읽음)
+        표시용 컬럼이 없으면 원문 컬럼을 읽어 그 자리에서 들여쓰기 적용
+        """
+        out = {}
+        for field in DETAIL_FIELDS:
+            if display_column(field) in self.table.column_names:
+                out[field] = self.get_value(job_id, display_column(field)) or ""
+            else:
+                out[field] = format_display(self.get_value(job_id, field))
+        return out
+
+    def get_value(self, job_id, column: str):
+        """단일 공고의 단일 컬럼 값 (없으면 None)"""
+        offsets = self.row_index.get(str(job_id))
+        if not offsets or column not in self.table.column_names:
+            return None
+        return self.table.column(column)[offsets[0]].as_py()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="all_raw.xlsx -> Arrow IPC 공고 저장소 변환")
+    parser.add_argument("xlsx_path", nargs="?", default=DEFAULT_EXCEL_PATH)
+    parser.add_argument("out_path", nargs="?", default=DEFAULT_STORE_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    n_rows = convert_excel(args.xlsx_path, args.out_path)
+    print(f"{n_rows} rows -> {args.out_path} ({time.perf_counter() - start:.1f}s)")
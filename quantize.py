@@ -0,0 +1,146 @@
+import argparse
+
+import numpy as np
+
+############################
+# 임베딩 양자화 (int8 / float16) + 정밀 재채점 보조
+############################
+# 정규화된 float32 공고 임베딩을
+# - int8: 벡터별 스케일(max|x| / 127)로 양자화
+# - float16: 단순 반정밀도 변환
+# 으로 보관해 1차 채점 메모리를 줄인다. 양자화 점수의 오차 상한(error_bound)을 함께 제공하여
+# threshold 판정이나 상위 후보 재채점 시 full-precision 벡터로 정확히 다시 계산할 행을 고를 수 있다.
+
+QUANTIZATION_MODES = ("int8", "float16")
+
+
+class QuantizedMatrix:
+    """
+    양자화된 임베딩 행렬
+
+    mode: "int8" 또는 "float16"
+    codes: (행 수, 차원) int8 또는 float16
+    scales: int8일 때 행별 float32 스케일 (float16이면 None)
+    """
+
+    def __init__(self, mode: str, codes, scales=None):
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"지원하지 않는 양자화 방식입니다: {mode}")
+        self.mode = mode
+        self.codes = codes
+        self.scales = scales
+        self.codes.flags.writeable = False
+        if self.scales is not None:
+            self.scales.flags.writeable = False
+
+    @classmethod
+    def from_float32(cls, mat, mode: str = "int8"):
+        mat = np.asarray(mat, dtype=np.float32)
+        if mode == "float16":
+            return cls(mode, np.ascontiguousarray(mat.astype(np.float16)))
+        if mode != "int8":
+            raise ValueError(f"지원하지 않는 양자화 방식입니다: {mode}")
+        max_abs = np.abs(mat).max(axis=1) if len(mat) else np.zeros(0, dtype=np.float32)
+        scales = np.where(max_abs == 0, 1.0, max_abs / 127.0).astype(np.float32)
+        codes = np.clip(np.rint(mat / scales[:, None]), -127, 127).astype(np.int8)
+        return cls(mode, np.ascontiguousarray(codes), scales)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def row_dot(self, rows, q) -> np.ndarray:
+        """
+        양자화 행렬의 rows 행과 질의 행렬 q (K x D)의 근사 내적 (len(rows) x K)
+        """
+        q = np.asarray(q, dtype=np.float32)
+        sub = self.codes[rows].astype(np.float32)
+        out = sub @ q.T
+        if self.scales is not None:
+            out *= self.scales[rows][:, None]
+        return out
+
+    def error_bound(self, rows, q) -> np.ndarray:
+        """
+        row_dot 근사 내적의 절대 오차 상한 (len(rows) x K)
+        int8: 성분당 오차 <= scale / 2, float16: 성분당 상대 오차 <= 2^-11
+        """
+        q_l1 = np.abs(np.asarray(q, dtype=np.float32)).sum(axis=1)
+        if self.scales is not None:
+            per_row = self.scales[rows] / 2.0
+        else:
+            per_row = np.abs(self.codes[rows]).max(axis=1).astype(np.float32) * 2.0 ** -11
+        return per_row[:, None] * q_l1[None, :]
+
+    def dequantize(self, rows=None) -> np.ndarray:
+        codes = self.codes if rows is None else self.codes[rows]
+        out = codes.astype(np.float32)
+        if self.scales is not None:
+            out *= (self.scales if rows is None else self.scales[rows])[:, None]
+        return out
+
+
+def ranking_agreement(reference_engine, quantized_engine, queries, k: int = 5) -> dict:
+    """
+    float32 엔진과 양자화 엔진의 상위 k개 순위 일치도
+    queries: [{필드명: [질의 벡터, ...]}, ...]
+    반환: overlap@k 평균, 순위까지 완전히 일치한 비율
+    """
+    overlaps, exact_matches = [], []
+    for query_vectors in queries:
+        weights = {f: 1.0 / len(query_vectors) for f in query_vectors}
+        ref = [j for j, _ in reference_engine.rank(reference_engine.soft_filter_scores(query_vectors, weights), k)]
+        got = [j for j, _ in quantized_engine.rank(quantized_engine.soft_filter_scores(query_vectors, weights), k)]
+        overlaps.append(len(set(ref) & set(got)) / max(len(ref), 1))
+        exact_matches.append(ref == got)
+    return {
+        "overlap_at_k": float(np.mean(overlaps)) if overlaps else 1.0,
+        "exact_order": float(np.mean(exact_matches)) if exact_matches else 1.0,
+    }
+
+
+if __name__ == "__main__":
+    # 사용 예: python quantize.py --db ./chroma_db_bge --mode int8 --queries 200
+    # 저장된 공고 임베딩을 의사 질의로 사용하므로 BGE 모델 없이 실행 가능
+    import chromadb
+    from scoring import ScoringEngine
+    from snapshot import EmbeddingSnapshot
+
+    parser = argparse.ArgumentParser(description="양자화 임베딩 메모리 / 순위 일치도 리포트")
+    parser.add_argument("--db", default="./chroma_db_bge")
+    parser.add_argument("--collection", default="job_postings_collection")
+    parser.add_argument("--mode", default="int8", choices=QUANTIZATION_MODES)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rescore-k", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    collection = chromadb.PersistentClient(path=args.db).get_collection(args.collection)
+    snapshot = EmbeddingSnapshot.from_collection(collection)
+    quantized = QuantizedMatrix.from_float32(snapshot.embeddings, args.mode)
+    q_engine = ScoringEngine(
+        snapshot.embeddings, snapshot.job_ids, snapshot.types,
+        normalized=True, quantized=quantized, rescore_k=args.rescore_k
+    )
+
+    rng = np.random.default_rng(args.seed)
+    fields = [t for t in np.unique(snapshot.types.astype(str)) if t != "공고제목"]
+    queries = []
+    for _ in range(args.queries):
+        n_fields = rng.integers(1, len(fields) + 1)
+        chosen = rng.choice(fields, size=n_fields, replace=False)
+        queries.append({f: [snapshot.embeddings[rng.integers(len(snapshot))]] for f in chosen})
+
+    agreement = ranking_agreement(snapshot.engine, q_engine, queries)
+    f32_bytes = snapshot.embeddings.nbytes
+    print(f"float32: {f32_bytes / 2**20:.1f} MiB, {args.mode}: {quantized.nbytes / 2**20:.1f} MiB "
+          f"(saved {100 * (1 - quantized.nbytes / max(f32_bytes, 1)):.1f}%)")
+    print(f"overlap@5={agreement['overlap_at_k']:.4f} exact_order={agreement['exact_order']:.4f} "
+          f"(rescore_k={args.rescore_k}, queries={len(queries)})")
@@ -0,0 +1,499 @@
+import asyncio
+import logging
+import math
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from posting_digest import digest_column, digest_text, split_items
+from result_cache import posting_rationale_key
+from scoring import normalize_rows
+
+############################
+# 추천 사유 프롬프트 구성
+############################
+# 공고 내용은 공고 저장소의 필드별 요약 컬럼(posting_digest.py)을 사용하고,
+# 요약 컬럼이 없는(이전 형식) 저장소이거나 use_digest=False면 원문 컬럼을 사용한다.
+# 사용자가 입력한 소프트필터 항목의 필드만 프롬프트에 넣는다.
+#
+# 첫 토큰 기한을 넘기면 보여줄 로컬 대체 설명(explain_locally)도 이 모듈에 있다.
+#
+# count_tokens: tiktoken이 설치되어 있으면 gpt-4o 토크나이저(o200k_base)로,
+# 없으면 문자 수 기반 근사치로 프롬프트 토큰 수를 센다. (요약 전/후 비교 로그용)
+
+logger = logging.getLogger(__name__)
+
+RATIONALE_MODEL = "gpt-4o"
+RATIONALE_SYSTEM_PROMPT = (
+    "You are an assistant who explains job recommendation rationale based on user input "
+    "and job posting data in markdown format. Do not fabricate explanations if the user's input "
+    "is not clearly supported by the job posting content."
+)
+# GPT 호출 실패 시 추천 사유 자리에 표시하는 문구 (뒤에 예외 메시지)
+RATIONALE_ERROR_TEXT = "추천 사유를 생성하는 데 오류가 발생했어요"
+
+# 소프트필터 항목 -> 공고 필드
+SOFT_FILTER_POSTING_FIELDS = {
+    "주요업무": ("주요업무",),
+    "자격요건및우대사항": ("자격요건", "우대사항"),
+    "혜택및복지": ("혜택및복지",),
+}
+
+# tiktoken이 없을 때 근사치: 한글은 대략 1~2자, 영문은 4자 정도가 토큰 1개
+_CHARS_PER_TOKEN = 2.0
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """프롬프트 토큰 수 (tiktoken이 없으면 근사치)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return math.ceil(len(text) / _CHARS_PER_TOKEN)
+
+
+def _value(row, field: str, use_digest: bool) -> str:
+    if use_digest and digest_column(field) in row:
+        value = row[digest_column(field)]
+    else:
+        value = row.get(field, "")
+    return "" if value is None or (not isinstance(value, str) and pd.isna(value)) else value
+
+
+def _user_input_text(soft_filter: dict) -> str:
+    text = "사용자 입력 (소프트 필터):\n"
+    for key in soft_filter:
+        if key == "자격요건및우대사항":
+            text += f"- 자격요건및우대사항 (자격요건 및 우대사항 모두 해당): {soft_filter[key]['조건']}\n"
+        else:
+            text += f"- {key}: {soft_filter[key]['조건']}\n"
+    return text
+
+
+def _explained_fields(soft_filter: dict) -> list:
+    """설명할 공고 필드 (사용자가 입력한 항목의 필드만, 고정 순서)"""
+    fields = []
+    for key, posting_fields in SOFT_FILTER_POSTING_FIELDS.items():
+        if key in soft_filter:
+            fields.extend(posting_fields)
+    return fields
+
+
+def _posting_text(row: dict, soft_filter: dict, use_digest: bool) -> str:
+    return "".join(
+        f"  - **{field}:** {_value(row, field, use_digest)}\n\n" for field in _explained_fields(soft_filter)
+    )
+
+
+def _format_text(fields: list) -> str:
+    return "".join(f" ▪️ **{field}:** <설명>\n\n" for field in fields)
+
+
+_NOT_CLEAR_RULE = (
+    "단, 사용자가 입력하지 않은 항목은 아예 설명에서 생략해 주세요. "
+    "또한, 해당 항목이 공고 내용에서 명확하게 나타나지 않는 경우, '해당 항목과 관련된 내용이 명확하게 나타나지 않습니다.'라고 간단하게 언급해 주세요.\n\n"
+)
+_HONORIFIC_RULE = "답변을 생성 시 '사용자가~'라는 표현 말고 '지원자님께서~'와 같이 높임 표현을 사용해야합니다. "
+
+
+def build_rationale_prompt(soft_filter: dict, top_df: pd.DataFrame, use_digest: bool = True) -> str:
+    """
+    추천 사유 user 프롬프트 (Top 1~N 공고를 한 번에 설명)
+    soft_filter: user_input_json["soft_filter"] ({항목: {"조건": ..., "가중치": ...}})
+    top_df: 공고id, 공고제목 + 원문 필드 및/또는 요약(_요약) 컬럼
+    """
+    fields = _explained_fields(soft_filter)
+
+    # 프롬프트 초기 구성 + 사용자 입력 (소프트 필터)
+    prompt = f"아래는 사용자가 입력한 소프트 필터 정보와 추천된 Top {len(top_df)} 공고의 주요 내용입니다.\n\n"
+    prompt += _user_input_text(soft_filter)
+
+    # 추천된 채용 공고 내용 - Top 순서대로 (입력한 항목의 필드만)
+    prompt += "\n추천된 채용 공고 내용:\n"
+    for i, row in enumerate(top_df.to_dict("records"), start=1):
+        prompt += f"Top {i}: **{row['공고제목']}**\n"
+        prompt += _posting_text(row, soft_filter, use_digest)
+        prompt += "\n---\n\n"
+
+    # 사용자가 입력한 필드만 설명하도록 요청
+    prompt += (
+        "위 내용을 기반으로, 각 추천 공고에 대해 사용자가 입력한 소프트 필터 항목 중 "
+        f"[{', '.join(fields)}]에 해당하는 부분이 공고 내용에서 어떻게 나타나는지 아래 형식으로 설명해 주세요.\n\n"
+        "형식 (마크다운 형식):\n"
+        "🔷**Top 1: [공고제목]**\n\n"
+    )
+    prompt += _format_text(fields)
+    prompt += (
+        _NOT_CLEAR_RULE
+        + f"**중요**: Top 1부터 Top {len(top_df)}까지를 절대로 생략하지 말고 전부 별도로 설명해 주세요. "
+        "'이하 생략', '...' 등의 요약 표현 없이, 각 공고를 모두 구체적으로 작성해 주시기 바랍니다."
+        + _HONORIFIC_RULE
+    )
+    return prompt
+
+
+def build_posting_prompt(soft_filter: dict, row: dict, use_digest: bool = True) -> str:
+    """
+    공고 1건의 추천 사유 user 프롬프트 (공고별 병렬 생성용)
+    공고 제목 줄(🔷**Top i: ...**)은 순위를 아는 호출 측에서 붙이므로 항목 줄만 요청
+    """
+    fields = _explained_fields(soft_filter)
+    prompt = "아래는 사용자가 입력한 소프트 필터 정보와 추천된 채용 공고 1건의 주요 내용입니다.\n\n"
+    prompt += _user_input_text(soft_filter)
+    prompt += f"\n추천된 채용 공고 내용:\n**{row['공고제목']}**\n"
+    prompt += _posting_text(row, soft_filter, use_digest)
+    prompt += (
+        "\n위 내용을 기반으로, 사용자가 입력한 소프트 필터 항목 중 "
+        f"[{', '.join(fields)}]에 해당하는 부분이 공고 내용에서 어떻게 나타나는지 아래 형식으로 설명해 주세요. "
+        "공고 제목 줄은 쓰지 말고 항목 줄만 작성해 주세요.\n\n"
+        "형식 (마크다운 형식):\n"
+    )
+    prompt += _format_text(fields)
+    prompt += _NOT_CLEAR_RULE + _HONORIFIC_RULE
+    return prompt
+
+
+def prompt_token_stats(soft_filter: dict, top_df: pd.DataFrame, prompt: str) -> dict:
+    """
+    보낼 프롬프트와 원문 기준 프롬프트의 토큰 수 비교
+    반환: {"prompt_tokens", "raw_prompt_tokens"} (원문 컬럼이 없으면 raw_prompt_tokens는 None)
+    """
+    stats = {"prompt_tokens": count_tokens(prompt) + count_tokens(RATIONALE_SYSTEM_PROMPT), "raw_prompt_tokens": None}
+    raw_fields = [f for fields in SOFT_FILTER_POSTING_FIELDS.values() for f in fields]
+    if all(f in top_df.columns for f in raw_fields):
+        raw_prompt = build_rationale_prompt(soft_filter, top_df, use_digest=False)
+        stats["raw_prompt_tokens"] = count_tokens(raw_prompt) + count_tokens(RATIONALE_SYSTEM_PROMPT)
+    return stats
+
+
+############################
+# 추천 사유 시간 제한 + 로컬 대체 설명
+############################
+# GPT 첫 토큰이 기한(RATIONALE_DEADLINE) 안에 오지 않거나 호출이 실패하면
+# 검색 단계에서 계산한 필드별 유사도(Recommendation.field_scores)와
+# 공고 필드의 문장 단위 임베딩 유사도로 고른 가장 관련 있는 문장을 이용해 같은 Top 1~N 마크다운 형식의 설명을 만든다.
+# 문장 인코딩은 Top 1부터 배치 단위로 하고 남은 기한(budget)을 넘길 것 같으면 중단하며,
+# 인코딩하지 못한 공고 필드는 검색 단계의 필드별 유사도와 필드 요약으로 설명한다 (질의 인코더 호출 없음).
+# GPT 응답은 백그라운드 스레드에서 계속 받으며(스크립트 실행은 기다리지 않음), 늦게라도 완료되면
+# 결과 캐시 / 세션 결과에 저장하고, 화면의 추천 사유 영역이 주기적으로 확인해 대체 설명 대신 표시한다.
+
+FALLBACK_NOTICE = "_응답이 지연되어 공고 내용과의 유사도를 기준으로 먼저 정리해 드렸어요. 상세한 설명은 준비되는 대로 이 자리에 보여 드릴게요._"
+# 공고 필드당 비교할 최대 문장(항목) 수
+FALLBACK_MAX_SENTENCES = 8
+# 한 번에 인코딩할 공고 문장 수 상한 (CPU 질의 인코더로도 기한 안에 끝나도록).
+# (공고, 필드) 쌍이 많으면 필드당 문장 수를 앞쪽 항목부터 줄임 (최소 1개)
+FALLBACK_MAX_ENCODE = 40
+# 시간 예산을 확인하는 인코딩 배치 크기 (문장 수)
+FALLBACK_ENCODE_BATCH = 8
+# 가장 관련 있는 문장의 유사도가 이보다 낮으면 "명확하게 나타나지 않음"으로 표시
+FALLBACK_MIN_SIMILARITY = 0.4
+NOT_FOUND_TEXT = "해당 항목과 관련된 내용이 명확하게 나타나지 않습니다."
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# 소프트필터 항목 -> 대체 설명 문구에 쓸 이름
+_FIELD_SUBJECT = {
+    "주요업무": "원하시는 업무 조건",
+    "자격요건및우대사항": "보유하신 스킬 및 툴 조건",
+    "혜택및복지": "원하시는 혜택 및 복지 조건",
+}
+
+
+def split_sentences(text, max_sentences: int = FALLBACK_MAX_SENTENCES) -> list:
+    """공고 필드 원문 -> 문장(항목) 목록 (글머리 항목을 다시 문장 끝 기준으로 나눔)"""
+    if text is None or (not isinstance(text, str) and pd.isna(text)) or not text:
+        return []
+    out = []
+    for item in split_items(text):
+        out.extend(s for s in _SENTENCE_END.split(item) if s)
+        if len(out) >= max_sentences:
+            break
+    return out[:max_sentences]
+
+
+def encode_within_budget(encode, texts: list, budget: float = None, first: int = 0,
+                         batch_size: int = FALLBACK_ENCODE_BATCH) -> np.ndarray:
+    """
+    texts를 앞에서부터 batch_size개씩 인코딩하다가, 다음 배치가 budget초 안에 끝나지 않을 것 같으면 중단
+    (다음 배치 시간은 지금까지의 배치당 평균 시간으로 추정)
+    first: 예산과 관계없이 첫 배치에 함께 인코딩할 앞쪽 텍스트 수 (사용자 조건)
+    반환: 인코딩한 앞쪽 텍스트의 정규화 벡터 (n_encoded, dim)
+    """
+    start_time = time.perf_counter()
+    chunks, done = [], 0
+    while done < len(texts):
+        if chunks and budget is not None:
+            elapsed = time.perf_counter() - start_time
+            if elapsed + elapsed / len(chunks) > budget:
+                break
+        stop = min(len(texts), max(first, done) + batch_size)
+        chunks.append(normalize_rows(np.asarray(encode(texts[done:stop]), dtype=np.float32)))
+        done = stop
+    return np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+
+
+def _field_summary(row: dict, field: str) -> str:
+    """필드 요약 (요약 컬럼이 없으면 원문에서 추출)"""
+    summary = _value(row, digest_column(field), use_digest=False)
+    return summary or digest_text(row.get(field))
+
+
+def explain_locally(soft_filter: dict, top_df: pd.DataFrame, encode, field_scores=None, budget: float = None) -> str:
+    """
+    GPT 없이 만드는 결정적 추천 사유 (GPT 응답과 같은 형식)
+    soft_filter: user_input_json["soft_filter"]
+    top_df: 공고id, 공고제목 + 원문 필드 컬럼 (요약 컬럼이 있으면 인코딩하지 못한 필드 설명에 사용)
+    encode: 텍스트 목록 -> (n, dim) 벡터 함수 (질의 인코더, 사용자 조건과 공고 문장을 Top 순서대로 배치 인코딩)
+    field_scores: Recommendation.field_scores ({공고id: {필드: 유사도}}, 없으면 문장 유사도 최댓값 사용)
+    budget: 문장 인코딩 시간 예산 (초, None이면 제한 없음). 넘기면 남은 필드는 field_scores와 요약으로 설명
+    """
+    rows = top_df.to_dict("records")
+    keys = [key for key in SOFT_FILTER_POSTING_FIELDS if key in soft_filter]
+    n_fields = len(rows) * sum(len(SOFT_FILTER_POSTING_FIELDS[key]) for key in keys)
+    per_field = min(FALLBACK_MAX_SENTENCES, max(1, FALLBACK_MAX_ENCODE // max(n_fields, 1)))
+
+    # 사용자 조건 다음에 (공고, 공고 필드)별 문장 목록을 Top 순서대로 이어 붙여 인코딩
+    texts, query_pos, sentence_pos = [], {}, {}
+    for key in keys:
+        query_pos[key] = (len(texts), len(texts) + len(soft_filter[key]["조건"]))
+        texts.extend(soft_filter[key]["조건"])
+    n_queries = len(texts)
+    for i, row in enumerate(rows):
+        for key in keys:
+            for field in SOFT_FILTER_POSTING_FIELDS[key]:
+                sentences = split_sentences(row.get(field), per_field)
+                sentence_pos[(i, field)] = (sentences, len(texts))
+                texts.extend(sentences)
+    vecs = encode_within_budget(encode, texts, budget, first=n_queries) if texts else None
+    n_encoded = 0 if vecs is None else len(vecs)
+
+    def best_sentence(i, key, field):
+        """(가장 관련 있는 문장, 유사도). 인코딩하지 못한 필드는 (None, None)"""
+        sentences, start = sentence_pos[(i, field)]
+        if not sentences:
+            return None, 0.0
+        stop = min(start + len(sentences), n_encoded)
+        if stop <= start:
+            return None, None
+        q_start, q_end = query_pos[key]
+        sims = (vecs[start:stop] @ vecs[q_start:q_end].T).mean(axis=1)
+        best = int(np.argmax(sims))
+        return sentences[best], float(sims[best])
+
+    blocks = [FALLBACK_NOTICE]
+    for i, row in enumerate(rows):
+        lines = [f"🔷**Top {i + 1}: {row['공고제목']}**"]
+        for key in keys:
+            score = (field_scores or {}).get(str(row.get("공고id")), {}).get(key)
+            for field in SOFT_FILTER_POSTING_FIELDS[key]:
+                sentence, sim = best_sentence(i, key, field)
+                if sim is None:
+                    # 시간 예산 안에 인코딩하지 못한 필드: 검색 단계 유사도 + 필드 요약
+                    summary = _field_summary(row, field)
+                    if score is None or score < FALLBACK_MIN_SIMILARITY or not summary:
+                        lines.append(f" ▪️ **{field}:** {NOT_FOUND_TEXT}")
+                    else:
+                        lines.append(
+                            f" ▪️ **{field}:** 지원자님께서 {_FIELD_SUBJECT[key]}과의 유사도는 {score:.2f}이며, "
+                            f"공고의 해당 내용은 \"{summary}\"입니다."
+                        )
+                    continue
+                if sentence is None or sim < FALLBACK_MIN_SIMILARITY:
+                    lines.append(f" ▪️ **{field}:** {NOT_FOUND_TEXT}")
+                    continue
+                field_sim = sim if score is None else score
+                lines.append(
+                    f" ▪️ **{field}:** 지원자님께서 {_FIELD_SUBJECT[key]}과의 유사도는 {field_sim:.2f}이며, "
+                    f"공고에서 가장 관련 있는 내용은 \"{sentence}\"입니다."
+                )
+        blocks.append("\n\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+_STREAM_END = object()
+
+
+class BackgroundStream:
+    """
+    토큰 제너레이터를 백그라운드 스레드에서 소비해 큐로 전달
+    wait_first(timeout)로 첫 토큰 기한을 확인하고, 반복(iter)으로 도착한 토큰을 이어서 받음
+    result()는 생성이 끝날 때까지 기다린 뒤 전체 텍스트 반환
+    """
+
+    def __init__(self, chunks, name: str = "rationale-stream"):
+        self._queue = queue.Queue()
+        self._first = threading.Event()
+        self._done = threading.Event()
+        self._parts = []
+        self._thread = threading.Thread(target=self._run, args=(chunks,), name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self, chunks):
+        try:
+            for chunk in chunks:
+                self._parts.append(chunk)
+                self._queue.put(chunk)
+                self._first.set()
+        finally:
+            self._queue.put(_STREAM_END)
+            self._first.set()
+            self._done.set()
+
+    def wait_first(self, timeout: float) -> bool:
+        """timeout초 안에 첫 토큰(또는 생성 종료)이 도착했으면 True"""
+        return self._first.wait(timeout)
+
+    def __iter__(self):
+        while True:
+            chunk = self._queue.get()
+            if chunk is _STREAM_END:
+                return
+            yield chunk
+
+    def result(self, timeout: float = None) -> str:
+        self._done.wait(timeout)
+        return "".join(str(part) for part in self._parts)
+
+
+############################
+# 공고별 병렬 추천 사유 생성
+############################
+# Top N 공고를 한 프롬프트로 설명하면 전체 지연이 긴 답변 하나를 순서대로 생성하는 시간과 같고,
+# 같은 공고가 다른 사용자의 상위 결과에 나와도 재사용할 수 없다.
+# (공고, 사용자 소프트필터 조건)별 요청으로 나눠 AsyncOpenAI 클라이언트로 동시에 보내고(프로세스 전체 동시 호출 수 제한),
+# 결과는 Top 순위 순서로 이어 붙여 스트리밍한다. Top 1은 도착하는 대로 바로 보이고, 나머지는 그동안 미리 생성된다.
+# 공고별 설명은 posting_rationale_key로 캐시해 같은 공고 + 비슷한 입력의 다음 질의는 해당 호출을 건너뛴다.
+
+_CHUNK_END = object()
+
+
+class AsyncRationaleRunner:
+    """
+    전용 이벤트 루프 스레드에서 AsyncOpenAI 호출을 실행 (프로세스 공유)
+
+    make_client: 이벤트 루프 안에서 호출되어 AsyncOpenAI 클라이언트를 반환하는 함수
+    max_concurrency: 프로세스 전체 동시 GPT 호출 수 상한
+    """
+
+    def __init__(self, make_client, max_concurrency: int = 8, model: str = RATIONALE_MODEL,
+                 temperature: float = 0.5):
+        self.model = model
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="rationale-loop", daemon=True)
+        self._thread.start()
+
+        async def setup():
+            return make_client(), asyncio.Semaphore(max_concurrency)
+
+        self.client, self._semaphore = asyncio.run_coroutine_threadsafe(setup(), self.loop).result()
+
+    def submit(self, prompt: str) -> queue.Queue:
+        """
+        공고 1건 설명 요청. 반환한 큐로 토큰(str)이 도착 순서대로 들어오고,
+        실패하면 예외 객체, 마지막에 종료 표시가 들어옴
+        """
+        out = queue.Queue()
+        asyncio.run_coroutine_threadsafe(self._explain(prompt, out), self.loop)
+        return out
+
+    async def _explain(self, prompt: str, out: queue.Queue):
+        try:
+            async with self._semaphore:
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": RATIONALE_SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt},
+                    ],
+                    temperature=self.temperature,
+                    stream=True
+                )
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        out.put(delta)
+        except Exception as e:
+            out.put(e)
+        finally:
+            out.put(_CHUNK_END)
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+def generate_parallel(runner: AsyncRationaleRunner, soft_filter: dict, top_df: pd.DataFrame, timing: dict,
+                      cache=None, version=None, use_digest: bool = True):
+    """
+    공고별 추천 사유를 동시에 요청하고 Top 순위 순서로 토큰을 내보내는 제너레이터
+    cache: 공고별 설명 캐시 (result_cache.ResultCache, None이면 사용 안 함)
+    version: 캐시 색인 버전
+    timing: {"ttft", "total", "prompt_tokens", "posting_calls", "posting_cache_hits", "error"}가 기록될 dict
+    """
+    start_time = time.perf_counter()
+    rows = top_df.to_dict("records")
+    options = {"model": runner.model, "digest": use_digest}
+
+    # 캐시에 없는 공고만 먼저 모두 요청 (순서대로 소비하는 동안 나머지가 동시에 생성됨)
+    jobs, prompt_tokens = [], 0
+    for row in rows:
+        key = posting_rationale_key(row["공고id"], soft_filter, **options)
+        cached = cache.get(key, version) if cache is not None else None
+        if cached is not None:
+            jobs.append((row, key, cached, None))
+            continue
+        prompt = build_posting_prompt(soft_filter, row, use_digest)
+        prompt_tokens += count_tokens(prompt) + count_tokens(RATIONALE_SYSTEM_PROMPT)
+        jobs.append((row, key, None, runner.submit(prompt)))
+    timing["prompt_tokens"] = prompt_tokens
+    timing["posting_calls"] = sum(out is not None for *_, out in jobs)
+    timing["posting_cache_hits"] = len(jobs) - timing["posting_calls"]
+
+    def emit(header, text):
+        # 제목 줄은 그 공고의 첫 내용과 함께 내보냄 (첫 청크가 실제 응답 도착 시점이 되도록)
+        if "ttft" not in timing:
+            timing["ttft"] = time.perf_counter() - start_time
+        return header + text
+
+    try:
+        for rank, (row, key, cached, out) in enumerate(jobs, start=1):
+            header = ("" if rank == 1 else "\n\n") + f"🔷**Top {rank}: {row['공고제목']}**\n\n"
+            if cached is not None:
+                yield emit(header, cached)
+                continue
+            parts = []
+            while True:
+                item = out.get()
+                if item is _CHUNK_END:
+                    break
+                if isinstance(item, Exception):
+                    logger.warning("posting rationale failed (공고id=%s): %s", row["공고id"], item)
+                    timing["error"] = str(item)
+                    parts = None
+                    yield emit(header, f"{RATIONALE_ERROR_TEXT}: {item}")
+                    header = ""
+                    continue
+                parts.append(item)
+                yield emit(header, item)
+                header = ""
+            if header:
+                # 빈 응답이어도 제목 줄은 표시
+                yield emit(header, "")
+            if parts and cache is not None:
+                cache.put(key, version, "".join(parts))
+    finally:
+        timing["total"] = time.perf_counter() - start_time
@@ -0,0 +1,314 @@
+import argparse
+import logging
+import os
+import threading
+import time
+
+from colbert_rerank import COLBERT_DIR_NAME, INDEX_NAME as COLBERT_INDEX_NAME, ColbertWriter
+from ingest import (
+    DEFAULT_COLLECTION, DEFAULT_DB_PATH, build_sparse_index, chunk_documents, encode_and_upsert, encode_sparse,
+    encoder_pool, iter_posting_chunks, latest_delta_version, open_collection, read_delta_manifests,
+    write_colbert, write_delta_manifest
+)
+from posting_store import DEFAULT_EXCEL_PATH
+from snapshot import EmbeddingSnapshot, split_doc_id
+from sparse_index import SPARSE_FIELD, SPARSE_INDEX_NAME, SparseIndex
+
+############################
+# 증분 색인 (공고id, type별 텍스트 해시 비교)
+############################
+# 매일 바뀌는 공고는 일부이므로 전체 재색인 대신
+# - 컬렉션의 기존 문서 id / 해시 / 메타데이터를 임베딩 없이 읽고
+# - 새 공고 테이블을 청크 단위로 읽어 문서별 해시와 비교
+#   - 새 문서 / 해시가 바뀐 문서만 다시 인코딩 (ingest.py와 같은 길이 정렬 + 프로세스 풀)
+#   - 텍스트는 같고 경력/근무위치만 바뀐 문서는 메타데이터만 update
+#   - 테이블에서 사라진 문서(공고 삭제, 필드가 비워진 경우)는 delete
+# - 변경 목록(manifest)을 남겨 실행 중인 앱의 SnapshotRefresher가 바뀐 행만 스냅샷에 반영
+# - sparse 역색인(sparse_skills.npz)이 있으면 바뀐 자격요건및우대사항 문서만 다시 계산해 문서 id 단위로 반영
+# - ColBERT 저장소(colbert/)가 있으면 바뀐 문서의 토큰 벡터만 파일 끝에 추가하고 색인을 교체
+# 해시가 메타데이터에 저장되는 시점이 임베딩 upsert와 같으므로 중단 후 다시 실행하면 남은 변경분만 처리된다.
+# (해시가 없는 기존 컬렉션은 첫 실행에서 한 번 전체 재인코딩되며, 문서 id는 그대로 유지되어 upsert로 덮어씀)
+#
+# 문서 id("{공고id}-{type}-{행 번호}")의 행 번호는 처음 색인할 때의 테이블 행 번호이므로
+# 공고 추가 / 삭제로 행이 밀려도 같은 id가 유지되도록 (공고id, type)으로 기존 id를 찾아 재사용한다.
+# 같은 공고id가 여러 행에 있으면 기존 id를 행 번호 순서대로 배정하고, 기존 문서가 없을 때만 새 행 번호로 id를 만든다.
+#
+# 사용 예: python reindex.py ./all_raw.arrow --workers 4
+
+logger = logging.getLogger(__name__)
+
+# 재인코딩 대상이 이만큼 모이면 인코딩/upsert (메모리 상한)
+ENCODE_FLUSH_DOCS = 5000
+METADATA_FIELDS = ("공고id", "type", "경력", "근무위치")
+
+
+def existing_documents(collection, batch_size: int = 5000) -> dict:
+    """{문서 id: 메타데이터} (임베딩은 읽지 않음)"""
+    out = {}
+    offset = 0
+    while True:
+        batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        if len(batch["ids"]) == 0:
+            break
+        out.update(zip(batch["ids"], batch["metadatas"]))
+        offset += len(batch["ids"])
+    return out
+
+
+def documents_by_key(existing: dict) -> dict:
+    """{(공고id, type): [기존 문서 id, ...]} (행 번호 순, 메타데이터가 없으면 문서 id에서 추출)"""
+    by_key = {}
+    for d_id, meta in existing.items():
+        job_id, doc_type, row = split_doc_id(d_id)
+        meta = meta or {}
+        key = (str(meta.get("공고id", job_id)), meta.get("type", doc_type))
+        by_key.setdefault(key, []).append((int(row) if row.isdigit() else 0, d_id))
+    return {key: [d_id for _, d_id in sorted(ids)] for key, ids in by_key.items()}
+
+
+def reuse_existing_id(doc, by_key: dict):
+    """새 문서를 같은 (공고id, type)의 기존 문서 id로 바꿈 (남은 기존 문서가 없으면 그대로)"""
+    d_id, text, meta = doc
+    ids = by_key.get((meta["공고id"], meta["type"]))
+    if not ids:
+        return doc
+    return ids.pop(0), text, meta
+
+
+def classify_document(doc, existing: dict) -> str:
+    """'new' | 'changed' | 'metadata' | 'unchanged'"""
+    d_id, _, meta = doc
+    old = existing.get(d_id)
+    if old is None:
+        return "new"
+    if old.get("hash") != meta["hash"]:
+        return "changed"
+    if any(old.get(f) != meta.get(f) for f in METADATA_FIELDS):
+        return "metadata"
+    return "unchanged"
+
+
+def reindex(source: str, db_path: str = DEFAULT_DB_PATH, collection_name: str = DEFAULT_COLLECTION,
+            workers: int = 1, batch_size: int = 32, chunk_rows: int = 2000, upsert_batch: int = 5000,
+            backend: str = "fp32", max_length: int = 1024) -> dict:
+    """
+    공고 테이블과 컬렉션의 차이만 반영. 분류별 문서 수와 소요 시간 반환
+    """
+    start = time.perf_counter()
+    _, collection, max_batch = open_collection(db_path, collection_name, upsert_batch)
+    existing = existing_documents(collection)
+    by_key = documents_by_key(existing)
+    logger.info("existing documents: %d (%.1fs)", len(existing), time.perf_counter() - start)
+
+    sparse_path = os.path.join(db_path, SPARSE_INDEX_NAME)
+    sparse_pending = [] if os.path.exists(sparse_path) else None
+    colbert_path = os.path.join(db_path, COLBERT_DIR_NAME)
+    colbert_pending = [] if os.path.exists(os.path.join(colbert_path, COLBERT_INDEX_NAME)) else None
+
+    counts = {"new": 0, "changed": 0, "metadata": 0, "unchanged": 0, "deleted": 0}
+    seen, upserted, pending = set(), [], []
+    pool = None
+    try:
+        def get_pool():
+            nonlocal pool
+            if pool is None:
+                # 바뀐 문서가 있을 때만 모델을 올림
+                pool = encoder_pool(workers, backend, max_length)
+            return pool
+
+        def flush():
+            if not pending:
+                return
+            encode_and_upsert(get_pool(), collection, pending, batch_size, max_batch)
+            pending.clear()
+
+        for chunk_no, rows in enumerate(iter_posting_chunks(source, chunk_rows)):
+            metadata_only = []
+            for doc in chunk_documents(rows, chunk_no * chunk_rows):
+                doc = reuse_existing_id(doc, by_key)
+                seen.add(doc[0])
+                kind = classify_document(doc, existing)
+                counts[kind] += 1
+                if kind in ("new", "changed"):
+                    pending.append(doc)
+                    upserted.append(doc[0])
+                    if sparse_pending is not None and doc[2]["type"] == SPARSE_FIELD:
+                        sparse_pending.append(doc)
+                    if colbert_pending is not None:
+                        colbert_pending.append(doc)
+                elif kind == "metadata":
+                    metadata_only.append(doc)
+                    upserted.append(doc[0])
+            for i in range(0, len(metadata_only), max_batch):
+                part = metadata_only[i:i + max_batch]
+                collection.update(ids=[d[0] for d in part], metadatas=[d[2] for d in part])
+            if len(pending) >= ENCODE_FLUSH_DOCS:
+                flush()
+        flush()
+
+        deleted = [d_id for d_id in existing if d_id not in seen]
+        if sparse_pending is not None:
+            deleted_docs = [d_id for d_id in deleted if existing[d_id].get("type") == SPARSE_FIELD]
+            index = SparseIndex.load(sparse_path)
+            if index.doc_ids is None:
+                # 문서 id 없이 만든 이전 형식은 문서 단위로 교체할 수 없으므로 한 번 전체 재생성
+                build_sparse_index(get_pool(), source, sparse_path, batch_size, chunk_rows)
+            elif sparse_pending or deleted_docs:
+                weights = encode_sparse(get_pool(), sparse_pending, batch_size) if sparse_pending else {}
+                index.apply_delta(
+                    [d[0] for d in sparse_pending], [d[2]["공고id"] for d in sparse_pending],
+                    [weights[d[0]] for d in sparse_pending], deleted_docs
+                ).save(sparse_path)
+            counts["sparse"] = len(sparse_pending) + len(deleted_docs)
+        if colbert_pending is not None and (colbert_pending or deleted):
+            writer = ColbertWriter(colbert_path, append=True)
+            try:
+                if colbert_pending:
+                    write_colbert(get_pool(), writer, colbert_pending, batch_size)
+                writer.delete(deleted)
+            finally:
+                writer.close()
+            counts["colbert"] = len(colbert_pending)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for i in range(0, len(deleted), max_batch):
+        collection.delete(ids=deleted[i:i + max_batch])
+    counts["deleted"] = len(deleted)
+
+    if upserted or deleted:
+        counts["version"] = write_delta_manifest(db_path, upserted, deleted)
+    counts["seconds"] = time.perf_counter() - start
+    return counts
+
+
+############################
+# 실행 중인 앱의 스냅샷 갱신
+############################
+class SnapshotRefresher:
+    """
+    EmbeddingSnapshot + 파생 인덱스(하드필터 인덱스 등)를 보관하고,
+    새 변경 목록이 생기면 바뀐 문서만 컬렉션에서 읽어 apply_delta로 교체한다.
+    갱신(증분 반영 / full=True 변경 목록의 전체 재조회)은 백그라운드 스레드에서 만들고 완성된 쌍만 한 번에 교체하므로
+    변경을 처음 발견한 요청도 기다리지 않고 이전 버전으로 응답한다.
+
+    build_index: 스냅샷 -> 파생 인덱스 함수
+    check_interval: 변경 목록 디렉터리 확인 최소 간격(초)
+    shared: SharedSnapshotStore (None이면 프로세스 단독 스냅샷).
+            지정하면 호스트에서 한 프로세스만 스냅샷을 만들어 발행하고 모든 프로세스가 메모리 매핑으로 attach
+    snapshot_kwargs: EmbeddingSnapshot.from_collection 인자 (quantization 등)
+    """
+
+    def __init__(self, collection, db_path: str, build_index, check_interval: float = 5.0, shared=None,
+                 **snapshot_kwargs):
+        self.collection = collection
+        self.db_path = db_path
+        self.build_index = build_index
+        self.check_interval = check_interval
+        self.shared = shared
+        self.snapshot_kwargs = snapshot_kwargs
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        # 스냅샷을 읽기 전에 버전을 기록해 읽는 도중 생긴 변경도 다음 확인 때 반영
+        self.version = latest_delta_version(db_path)
+        self._install(self._load_full, self.version)
+
+    def _load_full(self):
+        return EmbeddingSnapshot.from_collection(self.collection, **self.snapshot_kwargs)
+
+    def _install(self, build, version: int):
+        """build()로 만든 (공유 모드면 발행본을 attach한) 스냅샷과 파생 인덱스로 교체"""
+        if self.shared is not None:
+            snapshot, version = self.shared.get_or_publish(version, build)
+        else:
+            snapshot = build()
+        self._state = (snapshot, self.build_index(snapshot), version)
+        self.version = version
+
+    def current(self):
+        """(snapshot, index) — 항상 같은 버전의 쌍을 반환"""
+        return self.current_versioned()[:2]
+
+    def current_versioned(self):
+        """(snapshot, index, 색인 버전) — 결과 캐시 무효화 등 버전이 함께 필요할 때 사용"""
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            # 이미 갱신 중이면 잠금을 얻지 못하므로 스레드를 새로 띄우지 않음
+            if latest_delta_version(self.db_path) > self.version and self._lock.acquire(blocking=False):
+                threading.Thread(target=self._refresh_in_background, name="snapshot-refresh", daemon=True).start()
+        return self._state
+
+    def _refresh_in_background(self):
+        """refresh()를 실행하고 잠금 해제 (current_versioned에서 잠금을 잡은 뒤 호출)"""
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("snapshot refresh failed; keeping version %d", self.version)
+        finally:
+            self._lock.release()
+
+    def refresh(self):
+        """최신 변경 목록까지 반영한 스냅샷 / 인덱스를 만들어 교체 (호출한 스레드에서 동기 실행)"""
+        latest = latest_delta_version(self.db_path)
+        if latest <= self.version:
+            return
+        start = time.perf_counter()
+        self._install(lambda: self._build_delta(latest), latest)
+        logger.info("snapshot updated to version %d (%.2fs)", self.version, time.perf_counter() - start)
+
+    def _build_delta(self, latest: int):
+        """현재 스냅샷에 self.version 이후 변경 목록을 반영한 새 스냅샷 (전체 재색인이나 누락이 있으면 전체 재조회)"""
+        start = time.perf_counter()
+        manifests = read_delta_manifests(self.db_path, self.version)
+        if manifests is None or any(m.get("full") for m in manifests):
+            logger.info("full snapshot reload for version %d", latest)
+            return self._load_full()
+
+        upserted, deleted = set(), set()
+        for m in manifests:
+            upserted.difference_update(m["deleted"])
+            deleted.update(m["deleted"])
+            deleted.difference_update(m["upserted"])
+            upserted.update(m["upserted"])
+
+        ids, embeddings, metadatas = [], [], []
+        pending = sorted(upserted)
+        for i in range(0, len(pending), 5000):
+            batch = self.collection.get(ids=pending[i:i + 5000], include=["embeddings", "metadatas"])
+            ids.extend(batch["ids"])
+            embeddings.extend(batch["embeddings"])
+            metadatas.extend(batch["metadatas"])
+
+        snapshot = self._state[0].apply_delta(ids, embeddings, metadatas, deleted)
+        logger.info(
+            "snapshot delta for version %d: %d upserted, %d deleted (%.2fs)",
+            latest, len(ids), len(deleted), time.perf_counter() - start
+        )
+        return snapshot
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="공고 테이블 변경분만 Chroma 컬렉션에 반영 (증분 색인)")
+    parser.add_argument("source", nargs="?", default=DEFAULT_EXCEL_PATH, help=".xlsx 또는 .arrow 공고 테이블")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--chunk-rows", type=int, default=2000)
+    parser.add_argument("--upsert-batch", type=int, default=5000)
+    parser.add_argument("--backend", default="fp32", choices=("fp32", "int8", "onnx"))
+    parser.add_argument("--max-length", type=int, default=1024)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    result = reindex(
+        args.source, args.db, args.collection,
+        workers=args.workers, batch_size=args.batch_size, chunk_rows=args.chunk_rows,
+        upsert_batch=args.upsert_batch, backend=args.backend, max_length=args.max_length
+    )
+    print(
+        f"new={result['new']} changed={result['changed']} metadata={result['metadata']} "
+        f"deleted={result['deleted']} unchanged={result['unchanged']} ({result['seconds']:.1f}s)"
+    )
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+############################
+# 검색 조건 단위 결과 / 추천 사유 캐시
+############################
+# 같은 직무명 / 경력 / "전체" 지역 / 흔한 기술 키워드처럼 거의 같은 조건의 제출이 많으므로
+# 정규화한 (hard_filter_dict, soft_filter_dict, job_title_input)을 키로
+# - 추천 결과 (pipeline.Recommendation: 순위별 공고id / 점수)
+# - 생성된 추천 사유 텍스트 (GPT 호출 결과)
+# 를 프로세스 안의 모든 세션이 공유한다.
+# 세션에는 cache_key / 색인 버전만 두고 추천 사유는 이 캐시에서만 조회한다 (session_result.py).
+# GPT 응답이 기한을 넘겨 보여준 로컬 대체 설명도 늦은 응답이 올 때까지 같은 항목에 재표시용으로 두되,
+# get_rationale 적중으로는 반환하지 않는다 (다른 세션의 같은 조건 제출은 GPT 응답만 재사용).
+#
+# - LRU: max_entries를 넘으면 가장 오래 사용하지 않은 항목부터 제거
+# - TTL: 저장 후 ttl_seconds가 지나면 만료
+# - 색인 버전: 항목마다 저장 시점의 색인 버전을 기록하고, 조회 시 버전이 다르면 무효화
+#   (reindex.py 변경 목록 버전. 스냅샷이 새 버전으로 교체되면 이전 결과는 자동으로 쓰이지 않음)
+#
+# 정규화: 유니코드 NFKC, 연속 공백 축약, 대소문자 통일, 근무위치는 정렬 / 중복 제거
+#
+# 공고별 추천 사유(rationale.generate_parallel)도 같은 캐시 클래스에 (공고id, 소프트필터 조건) 키로 저장한다.
+# 설명은 입력한 항목과 조건 문장에만 의존하므로 가중치 / 경력 / 근무위치가 달라도 재사용된다.
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", str(text or ""))).strip().casefold()
+
+
+def profile_key(hard_filter_dict: dict, soft_filter_dict: dict, job_title_input: str, **options) -> str:
+    """
+    검색 조건 캐시 키 (정규화한 조건의 blake2b 해시)
+    options: 결과에 영향을 주는 추가 설정 (예: k)
+    """
+    profile = {
+        "경력": int(hard_filter_dict.get("경력", 0)),
+        "근무위치": sorted({normalize_text(r) for r in hard_filter_dict.get("근무위치", [])}),
+        "공고제목": normalize_text(job_title_input),
+        "소프트필터": {
+            col_type: {
+                "조건": [normalize_text(t) for t in info["조건"]],
+                "가중치": round(float(info["가중치"]), 4),
+            }
+            for col_type, info in sorted(soft_filter_dict.items())
+        },
+        "options": options,
+    }
+    encoded = json.dumps(profile, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def posting_rationale_key(job_id, soft_filter_dict: dict, **options) -> str:
+    """
+    공고별 추천 사유 캐시 키 (공고id + 정규화한 소프트필터 조건의 blake2b 해시)
+    options: 설명에 영향을 주는 추가 설정 (예: model, digest)
+    """
+    profile = {
+        "공고id": str(job_id),
+        "소프트필터": {
+            col_type: [normalize_text(t) for t in info["조건"]]
+            for col_type, info in sorted(soft_filter_dict.items())
+        },
+        "options": options,
+    }
+    encoded = json.dumps(profile, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU + TTL + 색인 버전 캐시
+
+    max_entries: 최대 항목 수
+    ttl_seconds: 항목 유효 시간 (초)
+    name: Prometheus 메트릭 이름 접두어
+    llm_values: 저장하는 값 자체가 GPT 응답이면 True (get 적중도 절약한 LLM 호출로 집계)
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0, name: str = "result_cache",
+                 llm_values: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.llm_values = llm_values
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "lookups": 0, "hits": 0, "misses": 0,
+            "expired": 0, "invalidated": 0, "evicted": 0,
+            "rationale_hits": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _live_entry(self, key: str, version):
+        """유효한 항목 (만료 / 버전 불일치 항목은 제거 후 None). lock 안에서 호출"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry["version"] != version:
+            del self._entries[key]
+            self.stats["invalidated"] += 1
+            return None
+        if entry["expires_at"] <= time.monotonic():
+            del self._entries[key]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get(self, key: str, version):
+        """캐시된 추천 결과 (없으면 None)"""
+        with self._lock:
+            self.stats["lookups"] += 1
+            entry = self._live_entry(key, version)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            return entry["result"]
+
+    def put(self, key: str, version, result):
+        """추천 결과 저장 (같은 키의 기존 항목과 추천 사유는 교체)"""
+        with self._lock:
+            self._entries[key] = {
+                "version": version,
+                "expires_at": time.monotonic() + self.ttl_seconds,
+                "result": result,
+                "rationale": None,
+                "fallback": None,
+                "pending": False,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+
+    def get_rationale(self, key: str, version):
+        """캐시된 추천 사유 (없으면 None). 적중하면 GPT 호출 1회 절약으로 집계"""
+        with self._lock:
+            entry = self._live_entry(key, version)
+            if entry is None or entry["rationale"] is None:
+                return None
+            self.stats["rationale_hits"] += 1
+            return entry["rationale"]
+
+    def _peek_entry(self, key: str, version):
+        """
+        재표시용 항목 조회 (없으면 None). lock 안에서 호출
+        읽기 전용: 버전 불일치 / 만료 항목도 제거하지 않고, LRU 순서와 통계도 바꾸지 않음
+        (재색인 후 이전 버전 결과를 가진 세션이 새 버전 항목을 지우지 않도록)
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry["version"] != version or entry["expires_at"] <= time.monotonic():
+            return None
+        return entry
+
+    def peek_rationale(self, key: str, version):
+        """저장된 추천 사유 재표시용 조회 (GPT 응답, 없으면 대체 설명, 둘 다 없으면 None. 읽기 전용)"""
+        with self._lock:
+            entry = self._peek_entry(key, version)
+            if entry is None:
+                return None
+            return entry["rationale"] if entry["rationale"] is not None else entry["fallback"]
+
+    def rationale_pending(self, key: str, version) -> bool:
+        """대체 설명을 저장한 뒤 늦은 GPT 응답을 기다리는 중인지 (읽기 전용)"""
+        with self._lock:
+            entry = self._peek_entry(key, version)
+            return entry is not None and entry["pending"]
+
+    def put_rationale(self, key: str, version, rationale: str):
+        """추천 결과가 캐시에 있을 때만 추천 사유 저장"""
+        with self._lock:
+            entry = self._live_entry(key, version)
+            if entry is not None:
+                entry["rationale"] = rationale
+
+    def put_fallback(self, key: str, version, text: str):
+        """
+        로컬 대체 설명 저장 (추천 결과가 캐시에 있을 때만, finish_fallback까지 대기 중으로 표시)
+        재표시(peek_rationale)에만 쓰이고 get_rationale로는 반환하지 않음
+        """
+        with self._lock:
+            entry = self._live_entry(key, version)
+            if entry is not None:
+                entry["fallback"] = text
+                entry["pending"] = True
+
+    def finish_fallback(self, key: str, version, rationale: str = None):
+        """늦은 GPT 응답이 끝나면 대기 해제 (rationale이 있으면 추천 사유로 저장, 실패면 None)"""
+        with self._lock:
+            entry = self._live_entry(key, version)
+            if entry is None:
+                return
+            entry["pending"] = False
+            if rationale is not None:
+                entry["rationale"] = rationale
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats["lookups"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def snapshot_stats(self) -> dict:
+        """통계 + 적중률 + 절약한 LLM 호출 수"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        stats["hit_rate"] = self.hit_rate
+        stats["llm_calls_saved"] = stats["rationale_hits"] + (stats["hits"] if self.llm_values else 0)
+        return stats
+
+    def prometheus_lines(self, namespace: str = "servicedemo") -> list:
+        """MetricsRegistry.add_collector용 Prometheus 텍스트 줄"""
+        stats = self.snapshot_stats()
+        ns, name = namespace, self.name
+        return [
+            f"# HELP {ns}_{name}_lookups_total Cache lookups by outcome.",
+            f"# TYPE {ns}_{name}_lookups_total counter",
+            f'{ns}_{name}_lookups_total{{result="hit"}} {stats["hits"]}',
+            f'{ns}_{name}_lookups_total{{result="miss"}} {stats["misses"]}',
+            f"# HELP {ns}_{name}_removed_total Cache entries removed by reason.",
+            f"# TYPE {ns}_{name}_removed_total counter",
+            f'{ns}_{name}_removed_total{{reason="lru"}} {stats["evicted"]}',
+            f'{ns}_{name}_removed_total{{reason="ttl"}} {stats["expired"]}',
+            f'{ns}_{name}_removed_total{{reason="index_version"}} {stats["invalidated"]}',
+            f"# HELP {ns}_{name}_entries Cache entries.",
+            f"# TYPE {ns}_{name}_entries gauge",
+            f"{ns}_{name}_entries {stats['entries']}",
+            f"# HELP {ns}_{name}_llm_calls_saved_total Rationale LLM calls served from the cache.",
+            f"# TYPE {ns}_{name}_llm_calls_saved_total counter",
+            f"{ns}_{name}_llm_calls_saved_total {stats['llm_calls_saved']}",
+        ]
@@ -0,0 +1,281 @@
+import copy
+
+import numpy as np
+
+############################
+# 벡터화된 소프트필터 / 공고제목 점수 계산 엔진
+############################
+# 문서(행) 단위 임베딩 행렬을 미리 정규화해두고,
+# 공고id x 필드 유사도를 한 번의 행렬곱으로 계산한 뒤 가중치를 같은 패스에서 적용한다.
+# 점수가 없는 필드(문서가 없는 필드)는 0으로 마스킹되어 기존 calc_soft_filter_scores와 동일한 결과를 낸다.
+
+TITLE_TYPE = "공고제목"
+
+
+def normalize_rows(mat) -> np.ndarray:
+    """
+    각 행을 L2 정규화한 contiguous float32 행렬을 반환
+    norm이 0인 행은 0 벡터로 남겨 코사인 유사도 0.0이 되도록 함 (기존 cosine_similarity와 동일)
+    """
+    mat = np.ascontiguousarray(np.asarray(mat, dtype=np.float32))
+    if mat.ndim == 1:
+        mat = mat.reshape(1, -1)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    safe = np.where(norms == 0, 1.0, norms).astype(np.float32)
+    out = mat / safe
+    out[norms[:, 0] == 0] = 0.0
+    return out
+
+
+def factorize_first_seen(values):
+    """
+    값들을 최초 등장 순서 기준 정수 코드로 변환
+    (uniques, codes) 반환. 동점일 때 기존 dict 삽입 순서와 동일한 순위를 유지하기 위해 사용
+    """
+    values = np.asarray(values, dtype=object)
+    if len(values) == 0:
+        return np.array([], dtype=object), np.array([], dtype=np.int64)
+    uniq, first_idx, inverse = np.unique(values.astype(str), return_index=True, return_inverse=True)
+    order = np.argsort(first_idx, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return values[first_idx[order]], rank[inverse].astype(np.int64)
+
+
+def top_k(scores: np.ndarray, k: int = 5, candidates=None, order=None) -> np.ndarray:
+    """
+    점수 배열에서 상위 k개의 인덱스를 부분 선택(argpartition)으로 반환
+    동점은 order 값(기본: 인덱스)이 작은 쪽(먼저 등장한 공고)이 앞에 오도록 정렬
+    candidates: 후보 인덱스 배열 (None이면 전체)
+    """
+    if candidates is None:
+        candidates = np.arange(len(scores))
+    candidates = np.asarray(candidates, dtype=np.int64)
+    if len(candidates) == 0 or k <= 0:
+        return np.array([], dtype=np.int64)
+
+    cand_scores = scores[candidates]
+    if len(candidates) > k:
+        part = np.argpartition(-cand_scores, k - 1)[:k]
+        # 경계값과 동점인 후보까지 포함해 순서를 결정해야 기존 stable sort 결과와 일치
+        kth = cand_scores[part].min()
+        part = np.union1d(part, np.flatnonzero(cand_scores == kth))
+        candidates, cand_scores = candidates[part], cand_scores[part]
+
+    tie_key = candidates if order is None else order[candidates]
+    return candidates[np.lexsort((tie_key, -cand_scores))[:k]]
+
+
+class ScoringEngine:
+    """
+    하드필터를 통과한 문서들의 임베딩을 한 번 정규화해 보관하고
+    공고제목 / 소프트필터 점수를 배치 행렬 연산으로 계산
+
+    embeddings: (문서 수, 차원) 임베딩 (full-precision, 메모리 매핑 배열도 가능)
+    job_ids: 문서별 공고id
+    types: 문서별 type (공고제목, 주요업무, 자격요건및우대사항, 혜택및복지)
+    quantized: 1차 채점용 QuantizedMatrix (None이면 full-precision으로만 채점)
+    rescore_k: 양자화 1차 채점 후 full-precision으로 재채점할 상위 공고 수
+    """
+
+    def __init__(self, embeddings, job_ids, types, normalized: bool = False, quantized=None,
+                 rescore_k: int = 300):
+        self.embeddings = (
+            np.ascontiguousarray(embeddings, dtype=np.float32) if normalized else normalize_rows(embeddings)
+        )
+        self.quantized = quantized
+        self.rescore_k = rescore_k
+        # 고정폭 문자열 배열(메모리 매핑된 공유 스냅샷)은 object 배열로 복사하지 않음
+        types = np.asarray(types)
+        self.types = types if types.dtype.kind == "U" else types.astype(object)
+        self.job_ids, self.job_codes = factorize_first_seen(job_ids)
+        self.job_ids = self.job_ids.astype(str)
+        self.job_index = {j_id: i for i, j_id in enumerate(self.job_ids)}
+        # 점수 계산 대상 행 (None이면 전체). with_rows로 하드필터 결과를 반영
+        self.rows = None
+        self.job_mask = np.ones(len(self.job_ids), dtype=bool)
+        self.job_order = np.arange(len(self.job_ids))
+
+    def with_rows(self, row_mask) -> "ScoringEngine":
+        """
+        임베딩/메타데이터 배열을 복사하지 않고 대상 행만 제한한 엔진을 반환
+        row_mask: 하드필터를 통과한 행의 bool 마스크
+        """
+        engine = copy.copy(self)
+        engine.rows = np.flatnonzero(row_mask)
+        engine.job_mask = np.zeros(len(self.job_ids), dtype=bool)
+        # 동점 순서는 대상 행 안에서의 최초 등장 순서를 따름
+        jobs, first = np.unique(self.job_codes[engine.rows], return_index=True)
+        engine.job_mask[jobs] = True
+        engine.job_order = np.full(len(self.job_ids), len(self.job_codes), dtype=np.int64)
+        engine.job_order[jobs] = engine.rows[first]
+        return engine
+
+    def _rows_of(self, row_mask) -> np.ndarray:
+        if self.rows is not None:
+            return self.rows[row_mask[self.rows]]
+        return np.flatnonzero(row_mask)
+
+    def job_mask_for(self, job_ids) -> np.ndarray:
+        """공고id 목록을 공고 bool 마스크로 변환 (없는 공고id는 무시)"""
+        mask = np.zeros(self.n_jobs, dtype=bool)
+        idx = [self.job_index[j] for j in map(str, job_ids) if j in self.job_index]
+        mask[idx] = True
+        return mask
+
+    def active_job_ids(self, job_mask=None) -> list:
+        """대상 행에 포함된 공고id (최초 등장 순서). job_mask로 추가 제한 가능"""
+        jobs = np.flatnonzero(self.job_mask if job_mask is None else self.job_mask & job_mask)
+        return list(self.job_ids[jobs[np.argsort(self.job_order[jobs], kind="stable")]])
+
+    @classmethod
+    def from_chroma(cls, docs):
+        """collection.get(include=["embeddings", "metadatas"]) 결과로부터 엔진 생성"""
+        metas = docs["metadatas"]
+        return cls(
+            docs["embeddings"],
+            [m["공고id"] for m in metas],
+            [m["type"] for m in metas],
+        )
+
+    @property
+    def n_jobs(self) -> int:
+        return len(self.job_ids)
+
+    def _row_dot(self, rows, q, exact: bool = True) -> np.ndarray:
+        """rows 행 임베딩과 질의 행렬 q (K x D)의 내적. exact=False면 양자화 행렬 사용"""
+        if not exact and self.quantized is not None:
+            return self.quantized.row_dot(rows, q)
+        return np.asarray(self.embeddings[rows], dtype=np.float32) @ q.T
+
+    def _field_matrix(self, query_vectors: dict, job_mask=None, exact: bool = True) -> np.ndarray:
+        """
+        공고 x 필드 raw 유사도 행렬 (없는 필드는 0)
+        query_vectors: {필드명: [질의 벡터, ...]} - 필드별 키워드 유사도는 평균
+        """
+        fields = list(query_vectors.keys())
+        field_sims = np.zeros((self.n_jobs, len(fields)), dtype=np.float32)
+
+        # 질의 벡터를 하나로 쌓고, 키워드 평균을 위한 (K x 필드) 평균 행렬 구성
+        q_blocks, avg_cols = [], []
+        for f_idx, f in enumerate(fields):
+            vecs = query_vectors[f]
+            if len(vecs) == 0:
+                continue
+            q_blocks.append(normalize_rows(np.vstack(vecs)))
+            col = np.zeros((len(vecs), len(fields)), dtype=np.float32)
+            col[:, f_idx] = 1.0 / len(vecs)
+            avg_cols.append(col)
+        if not q_blocks:
+            return field_sims
+
+        type_code = np.full(len(self.types), -1, dtype=np.int64)
+        for f_idx, f in enumerate(fields):
+            if len(query_vectors[f]) > 0:
+                type_code[self.types == f] = f_idx
+        row_mask = type_code >= 0
+        if job_mask is not None:
+            row_mask &= job_mask[self.job_codes]
+        rows = self._rows_of(row_mask)
+        if len(rows) == 0:
+            return field_sims
+
+        q = np.vstack(q_blocks)
+        avg = np.vstack(avg_cols)
+        # (R x D) @ (D x K) @ (K x F) -> 각 행에서 자기 type 열만 선택
+        per_row = self._row_dot(rows, q, exact) @ avg
+        vals = per_row[np.arange(len(rows)), type_code[rows]]
+        field_sims[self.job_codes[rows], type_code[rows]] = vals
+        return field_sims
+
+    def soft_filter_scores(self, query_vectors: dict, weights: dict, job_mask=None) -> np.ndarray:
+        """
+        소프트필터 가중합 점수 (공고 단위)
+        weights: {필드명: 가중치}
+        job_mask: 점수 계산 대상 공고 bool 마스크 (None이면 전체)
+        """
+        fields = list(query_vectors.keys())
+        w = np.array([weights[f] for f in fields], dtype=np.float64)
+        if self.quantized is None:
+            return self._field_matrix(query_vectors, job_mask).astype(np.float64) @ w
+
+        # 1차: 양자화 점수로 상위 rescore_k개 공고 선택 -> 2차: full-precision 재채점
+        approx = self._field_matrix(query_vectors, job_mask, exact=False).astype(np.float64) @ w
+        valid = self.job_mask if job_mask is None else self.job_mask & job_mask
+        rescore_mask = np.zeros(self.n_jobs, dtype=bool)
+        rescore_mask[top_k(approx, self.rescore_k, np.flatnonzero(valid), self.job_order)] = True
+        scores = self._field_matrix(query_vectors, rescore_mask).astype(np.float64) @ w
+        # 재채점되지 않은 공고는 순위에서 제외
+        scores[~rescore_mask] = np.nan
+        return scores
+
+    def field_similarities(self, query_vectors: dict, job_ids) -> dict:
+        """
+        지정한 공고들의 필드별 raw 유사도 (추천 사유 대체 설명용)
+        반환: {공고id: {필드명: 유사도}} (해당 필드 문서가 없으면 0.0)
+        """
+        job_mask = self.job_mask_for(job_ids)
+        sims = self._field_matrix(query_vectors, job_mask)
+        fields = list(query_vectors.keys())
+        return {
+            str(j_id): {f: float(sims[self.job_index[str(j_id)], i]) for i, f in enumerate(fields)}
+            for j_id in job_ids if str(j_id) in self.job_index
+        }
+
+    def field_rows(self, job_ids, doc_type: str) -> np.ndarray:
+        """
+        공고별로 doc_type 점수에 쓰인 행 번호 (없으면 -1)
+        같은 공고id의 같은 type 문서가 여러 행이면 _field_matrix / title_scores와 같이 대상 행 중 마지막 행
+        (기존 calc_soft_filter_scores에서 나중 문서가 앞 문서 점수를 덮어쓰던 것과 동일)
+        """
+        last = np.full(self.n_jobs, -1, dtype=np.int64)
+        rows = self._rows_of(self.types == doc_type)
+        np.maximum.at(last, self.job_codes[rows], rows)
+        return np.array([last[self.job_index[str(j)]] if str(j) in self.job_index else -1 for j in job_ids],
+                        dtype=np.int64)
+
+    def title_scores(self, title_vec) -> np.ndarray:
+        """
+        공고제목 문서와의 코사인 유사도 (공고 단위)
+        공고제목 문서가 없는 공고는 NaN
+        """
+        scores = np.full(self.n_jobs, np.nan, dtype=np.float64)
+        rows = self._rows_of(self.types == TITLE_TYPE)
+        if len(rows) == 0:
+            return scores
+        q = normalize_rows(title_vec)
+        if self.quantized is not None and len(rows) > self.rescore_k:
+            # 1차: 양자화 점수 상위 rescore_k개 행만 full-precision으로 재채점
+            approx = self._row_dot(rows, q, exact=False)[:, 0]
+            rows = np.sort(rows[np.argpartition(-approx, self.rescore_k - 1)[:self.rescore_k]])
+        scores[self.job_codes[rows]] = self._row_dot(rows, q)[:, 0]
+        return scores
+
+    def title_pass_mask(self, title_vec, threshold: float) -> np.ndarray:
+        """
+        공고제목 문서 중 하나라도 유사도가 threshold 이상인 공고의 bool 마스크 (Case B)
+        """
+        mask = np.zeros(self.n_jobs, dtype=bool)
+        rows = self._rows_of(self.types == TITLE_TYPE)
+        if len(rows) == 0:
+            return mask
+        q = normalize_rows(title_vec)
+        if self.quantized is not None:
+            # 양자화 점수 + 오차 상한이 threshold에 닿는 행만 full-precision으로 판정
+            approx = self._row_dot(rows, q, exact=False)[:, 0]
+            bound = self.quantized.error_bound(rows, q)[:, 0]
+            rows = rows[approx + bound >= threshold]
+        passed = rows[self._row_dot(rows, q)[:, 0] >= threshold]
+        mask[self.job_codes[passed]] = True
+        return mask
+
+    def rank(self, scores: np.ndarray, k: int = 5, job_mask=None):
+        """
+        상위 k개 (공고id, 점수) 리스트 반환
+        job_mask가 주어지면 해당 공고만, NaN 점수는 제외
+        """
+        valid = ~np.isnan(scores) & self.job_mask
+        if job_mask is not None:
+            valid &= job_mask
+        idx = top_k(scores, k, np.flatnonzero(valid), self.job_order)
+        return [(self.job_ids[i], float(scores[i])) for i in idx]
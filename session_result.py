@@ -0,0 +1,117 @@
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+############################
+# 세션별 검색 결과 상태 (st.session_state에 보관)
+############################
+# 제출 결과를 공고 DataFrame(카드 컬럼 전체)과 추천 사유 문자열 그대로 세션에 두면
+# 접속한 세션 수만큼 같은 공고 텍스트 사본이 메모리에 쌓인다.
+# 세션에는 순위별 공고id / 점수와 캐시 키만 두고,
+# - 카드 행: 렌더링할 때 프로세스 공용 공고 저장소(PostingStore, 메모리 매핑)에서 현재 페이지만 조회
+# - 추천 사유: 프로세스 공용 결과 캐시(ResultCache)에서 (cache_key, index_version)으로 조회
+#   (같은 조건을 제출한 세션은 설명 한 벌을 공유. 캐시 항목이 LRU / TTL로 제거되면 다시 표시하지 않음)
+#
+# 세션당 메모리 비교 (합성 공고 저장소): python session_result.py --top-k 5 --sessions 500
+
+
+class SessionResult:
+    """
+    한 세션의 최근 검색 결과
+
+    case: "A" | "B" | "C" | "D"
+    job_ids / scores: 순위 순서의 공고id / 최종점수 (Case D는 0.0)
+    cache_key / index_version: 결과 캐시(추천 사유) 조회 키
+    """
+
+    __slots__ = ("case", "job_ids", "scores", "cache_key", "index_version")
+
+    def __init__(self, case, job_ids, scores, cache_key=None, index_version=None):
+        self.case = case
+        self.job_ids = tuple(str(j_id) for j_id in job_ids)
+        self.scores = tuple(float(s) for s in scores)
+        self.cache_key = cache_key
+        self.index_version = index_version
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, case, cache_key=None, index_version=None):
+        """fetch_postings 결과(공고id, 최종점수)에서 생성 (공고 저장소에 있는 공고만, 표시 순서 유지)"""
+        return cls(case, df["공고id"].tolist(), df["최종점수"].tolist(), cache_key, index_version)
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    def page(self, page: int, page_size: int) -> tuple:
+        """페이지의 (공고id 목록, {공고id: 점수})"""
+        start, stop = page * page_size, (page + 1) * page_size
+        job_ids = list(self.job_ids[start:stop])
+        return job_ids, dict(zip(job_ids, self.scores[start:stop]))
+
+
+def state_bytes(obj, _seen=None) -> int:
+    """
+    세션 상태 값이 차지하는 바이트 수 (컨테이너 / __slots__ 객체는 참조하는 값까지 합산)
+    DataFrame은 memory_usage(deep=True) 기준
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(state_bytes(k, _seen) + state_bytes(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(state_bytes(v, _seen) for v in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(state_bytes(getattr(obj, s), _seen) for s in obj.__slots__ if hasattr(obj, s))
+    return size
+
+
+if __name__ == "__main__":
+    from benchmark import SAMPLE_TITLES, make_synthetic_store
+    from hard_filter import region_keys
+    from locations import location_dict
+    from posting_store import CARD_COLUMNS
+
+    parser = argparse.ArgumentParser(description="세션당 검색 결과 상태 메모리 비교 (DataFrame + 추천 사유 vs SessionResult)")
+    parser.add_argument("--jobs", type=int, default=2000, help="합성 공고 수")
+    parser.add_argument("--top-k", type=int, default=5, help="추천 공고 수 (RESULT_TOP_K)")
+    parser.add_argument("--sessions", type=int, default=500, help="환산할 동시 세션 수")
+    parser.add_argument("--rationale-chars", type=int, default=1500, help="추천 사유 글자 수")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    regions = region_keys(location_dict)
+    jobs = pd.DataFrame({
+        "공고id": [f"J{i:07d}" for i in range(args.jobs)],
+        "공고제목": np.array(SAMPLE_TITLES, dtype=object)[rng.integers(0, len(SAMPLE_TITLES), args.jobs)],
+        "경력": rng.integers(0, 11, args.jobs),
+        "근무위치": np.array(regions, dtype=object)[rng.integers(0, len(regions), args.jobs)],
+    })
+    store = make_synthetic_store(jobs, os.path.join(tempfile.mkdtemp(prefix="session_"), "postings.arrow"), args.seed)
+
+    job_ids = list(rng.choice(jobs["공고id"].to_numpy(), size=min(args.top_k, args.jobs), replace=False))
+    scores = {j_id: float(s) for j_id, s in zip(job_ids, np.sort(rng.random(len(job_ids)))[::-1])}
+    top_df = store.get_rows(job_ids, CARD_COLUMNS)
+    top_df["최종점수"] = top_df["공고id"].map(lambda x: round(scores[x], 4))
+    # 한글 추천 사유 (글자마다 다른 문자열 객체가 되지 않도록 한 번에 생성)
+    rationale = ("가나다라마바사아자차카타파하 " * (args.rationale_chars // 15 + 1))[:args.rationale_chars]
+
+    # 추천 사유는 결과 캐시(프로세스 공용, 같은 조건의 세션이 공유)에만 있으므로 세션 상태에 포함하지 않음
+    before = {"analysis_result": top_df, "latest_explanation": rationale}
+    after = {"analysis_result": SessionResult.from_frame(top_df, "B", "0" * 32, "v1")}
+    sizes = {"before": state_bytes(before), "after": state_bytes(after)}
+    store.close()
+
+    for name, size in sizes.items():
+        print(f"{name:>6}: {size / 1024:8.1f} KiB/session  x{args.sessions} = {size * args.sessions / 2 ** 20:7.1f} MiB")
+    print(f"top_k={args.top_k} rationale_chars={args.rationale_chars} -> "
+          f"{100 * sizes['after'] / max(sizes['before'], 1):.1f}% of before")
@@ -0,0 +1,137 @@
+import contextlib
+import fcntl
+import logging
+import os
+import shutil
+import time
+
+from snapshot import EmbeddingSnapshot
+
+############################
+# 호스트 공유 임베딩 스냅샷 (메모리 매핑 .npy)
+############################
+# Streamlit 프로세스를 여러 개 띄우면 cache_resource는 프로세스 안에서만 공유되므로
+# 프로세스마다 임베딩 행렬 / 메타데이터 컬럼을 따로 들고 있게 된다.
+# 스냅샷을 호스트당 한 번만 디렉터리에 내려두고(publish) 모든 프로세스가 읽기 전용 메모리 매핑으로 열면(attach)
+# 실제 페이지는 페이지 캐시 하나만 쓰이므로 프로세스 수가 늘어도 상주 메모리가 늘지 않는다.
+#
+# 디렉터리 구성: {db_path}/shared_snapshot/{float32|int8|float16}/
+#   {version:08d}/  EmbeddingSnapshot.save 결과 (version = 증분 색인 변경 목록 버전)
+#   CURRENT         현재 버전 번호 (원자적으로 교체)
+#   .lock           발행 잠금 (fcntl.flock). 먼저 잠근 프로세스만 Chroma에서 읽어 발행하고 나머지는 기다렸다가 attach
+#   .attach.lock    attach / 정리 잠금. attach는 CURRENT를 읽고 파일을 매핑할 때까지 공유 잠금,
+#                   이전 버전 정리는 배타 잠금을 잡으므로 CURRENT를 읽은 직후 그 버전이 지워지는 일이 없다
+# 이전 버전 디렉터리는 keep개만 남기고 지운다. 이미 매핑한 프로세스는 파일이 지워져도 계속 읽을 수 있다 (Linux).
+#
+# 공고 원문은 이미 메모리 매핑 Arrow 파일(posting_store.py)이라 같은 방식으로 공유된다.
+# BGE-M3 모델 가중치와 하드필터 인덱스 등 파생 인덱스는 여전히 프로세스별로 만든다.
+
+logger = logging.getLogger(__name__)
+
+SHARED_DIR_NAME = "shared_snapshot"
+CURRENT_NAME = "CURRENT"
+LOCK_NAME = ".lock"
+ATTACH_LOCK_NAME = ".attach.lock"
+
+
+class SharedSnapshotStore:
+    """
+    root: 공유 스냅샷 디렉터리 (양자화 방식별로 분리)
+    keep: 남겨둘 버전 디렉터리 수
+    """
+
+    def __init__(self, root: str, keep: int = 2):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.keep = keep
+
+    @classmethod
+    def for_db(cls, db_path: str, quantization=None, keep: int = 2) -> "SharedSnapshotStore":
+        return cls(os.path.join(db_path, SHARED_DIR_NAME, quantization or "float32"), keep=keep)
+
+    def version_path(self, version: int) -> str:
+        return os.path.join(self.root, f"{version:08d}")
+
+    def current_version(self):
+        """발행된 최신 버전 (없으면 None)"""
+        try:
+            with open(os.path.join(self.root, CURRENT_NAME), encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+
+    @contextlib.contextmanager
+    def lock(self, name: str = LOCK_NAME, shared: bool = False):
+        """호스트 내 프로세스 간 잠금 (기본: 발행 잠금. shared=True면 공유 잠금)"""
+        with open(os.path.join(self.root, name), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def attach(self, version: int = None) -> EmbeddingSnapshot:
+        """
+        발행된 스냅샷을 읽기 전용 메모리 매핑으로 열기 (version=None이면 CURRENT)
+        매핑을 마칠 때까지 attach 공유 잠금을 잡아 그 사이 _prune이 버전 디렉터리를 지우지 못하게 함
+        """
+        with self.lock(ATTACH_LOCK_NAME, shared=True):
+            return self._load(version)
+
+    def _load(self, version: int = None) -> EmbeddingSnapshot:
+        """attach 공유 잠금 안에서 호출"""
+        if version is None:
+            version = self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"발행된 공유 스냅샷이 없습니다: {self.root}")
+        return EmbeddingSnapshot.load(self.version_path(version), mmap=True)
+
+    def publish(self, snapshot: EmbeddingSnapshot, version: int):
+        """
+        스냅샷을 version 디렉터리에 저장하고 CURRENT를 교체 (lock 안에서 호출)
+        """
+        start = time.perf_counter()
+        path = self.version_path(version)
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        snapshot.save(tmp_path)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+        current_tmp = os.path.join(self.root, CURRENT_NAME + ".tmp")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(str(version))
+        os.replace(current_tmp, os.path.join(self.root, CURRENT_NAME))
+        self._prune(version)
+        logger.info(
+            "shared snapshot version %d published: %d docs (%.2fs)",
+            version, len(snapshot), time.perf_counter() - start
+        )
+
+    def _prune(self, current: int):
+        """current 외에 keep - 1개만 남기고 이전 버전 삭제 (attach 중인 프로세스가 없을 때, 배타 잠금)"""
+        with self.lock(ATTACH_LOCK_NAME):
+            versions = sorted(
+                int(name) for name in os.listdir(self.root) if name.isdigit() and int(name) != current
+            )
+            for version in versions[:max(0, len(versions) - (self.keep - 1))]:
+                shutil.rmtree(self.version_path(version), ignore_errors=True)
+
+    def get_or_publish(self, version: int, build) -> tuple:
+        """
+        version 이상의 발행본이 있으면 attach, 없으면 잠금을 잡고 build()로 만들어 발행한 뒤 attach
+        build: () -> EmbeddingSnapshot (같은 호스트에서 한 프로세스만 실행)
+        반환: (스냅샷, 발행본 버전)
+        """
+        with self.lock(ATTACH_LOCK_NAME, shared=True):
+            current = self.current_version()
+            if current is not None and current >= version:
+                return self._load(current), current
+        with self.lock():
+            # 잠금을 기다리는 동안 다른 프로세스가 발행했을 수 있음
+            current = self.current_version()
+            if current is None or current < version:
+                self.publish(build(), version)
+                current = version
+            # 발행 잠금을 놓기 전에 attach (놓은 뒤에는 다른 발행이 current를 정리할 수 있음)
+            return self.attach(current), current
@@ -0,0 +1,249 @@
+import json
+import mmap
+import os
+
+import numpy as np
+
+from quantize import QuantizedMatrix
+from scoring import ScoringEngine, normalize_rows
+
+############################
+# 프로세스 상주 임베딩 스냅샷
+############################
+# chroma_db_bge 컬렉션을 프로세스당 한 번만 읽어
+# - 정규화된 contiguous float32 임베딩 행렬
+# - 컬럼형 메타데이터 배열 (공고id, type, 경력, 근무위치)
+# 로 보관한다. 하드필터는 이 스냅샷 위의 행 마스크로 계산되므로
+# 요청마다 collection.get(limit=999999)로 문서/메타데이터 dict를 만들 필요가 없다.
+#
+# quantization="int8" | "float16"이면 1차 채점은 양자화 행렬로 하고,
+# full-precision 행렬은 full_precision_path(.npy)에 저장 후 메모리 매핑으로만 참조해
+# 상위 후보 재채점 시 필요한 행만 읽는다.
+#
+# 증분 색인(reindex.py) 후에는 apply_delta로 바뀐 문서만 반영한 새 스냅샷을 만든다 (Chroma 전체 재조회 없음).
+#
+# save / load: 스냅샷 배열을 .npy 파일로 내려두고 메모리 매핑으로 다시 연다.
+# 같은 호스트의 여러 Streamlit 프로세스가 페이지 캐시의 같은 페이지를 공유한다. (shared_snapshot.py)
+
+SNAPSHOT_META_NAME = "meta.json"
+
+
+def make_doc_id(job_id, doc_type: str, row: int) -> str:
+    """
+    문서 id "{공고id}-{type}-{행 번호}" (기존 chroma_db_bge 컬렉션 형식, 예: 257955-공고제목-6)
+    행 번호는 처음 색인할 때 공고 테이블의 행 번호(0부터)로, 같은 공고id가 여러 행에 있어도 id가 겹치지 않음
+    """
+    return f"{job_id}-{doc_type}-{row}"
+
+
+def split_doc_id(doc_id: str) -> tuple:
+    """문서 id -> (공고id, type, 행 번호 문자열). type과 행 번호에는 "-"가 없으므로 뒤에서부터 나눔"""
+    job_id, doc_type, row = str(doc_id).rsplit("-", 2)
+    return job_id, doc_type, row
+
+
+def _str_column(values) -> np.ndarray:
+    """고정폭 문자열 배열 (메모리 매핑된 배열은 복사하지 않음)"""
+    arr = np.asarray(values)
+    return arr if arr.dtype.kind == "U" else arr.astype(object).astype(str)
+
+
+def _object_column(values) -> np.ndarray:
+    """메타데이터 컬럼 (고정폭 문자열 배열은 그대로, 그 외는 object 배열)"""
+    arr = np.asarray(values)
+    return arr if arr.dtype.kind == "U" else np.asarray(values, dtype=object)
+
+
+def _is_mapped(arr) -> bool:
+    """메모리 매핑된 파일을 참조하는 배열(또는 그 뷰)인지"""
+    while arr is not None:
+        if isinstance(arr, (np.memmap, mmap.mmap)):
+            return True
+        arr = getattr(arr, "base", None)
+    return False
+
+
+class EmbeddingSnapshot:
+    """
+    읽기 전용 임베딩 스냅샷
+
+    embeddings: (문서 수, 차원) 정규화된 float32 행렬
+    job_ids / types / experience / locations: 문서(행)별 메타데이터 컬럼
+    doc_ids: 문서 id (None이면 make_doc_id(공고id, type, 공고 등장 순서)로 구성)
+    quantization: None, "int8", "float16"
+    full_precision_path: 양자화 시 full-precision 행렬을 내려둘 .npy 경로 (None이면 메모리에 유지)
+    normalized: embeddings가 이미 정규화된 경우 True (load에서 메모리 매핑 배열을 복사하지 않기 위해 사용)
+    quantized: 미리 만든 QuantizedMatrix (None이면 quantization에 따라 생성)
+    """
+
+    def __init__(self, embeddings, job_ids, types, experience, locations, quantization=None,
+                 full_precision_path=None, rescore_k: int = 300, doc_ids=None, normalized: bool = False,
+                 quantized=None):
+        self.options = {
+            "quantization": quantization, "full_precision_path": full_precision_path, "rescore_k": rescore_k
+        }
+        self.embeddings = np.asarray(embeddings, dtype=np.float32) if normalized else normalize_rows(embeddings)
+        self.quantized = quantized
+        if quantization and quantized is None:
+            self.quantized = QuantizedMatrix.from_float32(self.embeddings, quantization)
+            if full_precision_path:
+                # 이전 스냅샷이 같은 파일을 메모리 매핑 중일 수 있으므로 새 파일로 교체
+                tmp_path = full_precision_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, self.embeddings)
+                os.replace(tmp_path, full_precision_path)
+                self.embeddings = np.load(full_precision_path, mmap_mode="r")
+        self.job_ids = _str_column(job_ids)
+        self.types = _object_column(types)
+        self.experience = np.asarray(experience, dtype=np.float64)
+        self.locations = _object_column(locations)
+        if doc_ids is None:
+            posting_rows = {}
+            doc_ids = [
+                make_doc_id(j, t, posting_rows.setdefault(j, len(posting_rows)))
+                for j, t in zip(self.job_ids, self.types)
+            ]
+        self.doc_ids = _str_column(doc_ids)
+        for arr in (self.embeddings, self.job_ids, self.types, self.experience, self.locations, self.doc_ids):
+            arr.flags.writeable = False
+
+        self.engine = ScoringEngine(
+            self.embeddings, self.job_ids, self.types,
+            normalized=True, quantized=self.quantized, rescore_k=rescore_k
+        )
+
+    @classmethod
+    def from_collection(cls, collection, batch_size: int = 5000, **kwargs):
+        """
+        Chroma 컬렉션 전체를 batch_size 단위로 읽어 스냅샷 생성
+        kwargs: quantization, full_precision_path, rescore_k
+        """
+        emb_chunks, metas, ids = [], [], []
+        offset = 0
+        while True:
+            batch = collection.get(
+                include=["embeddings", "metadatas"],
+                limit=batch_size,
+                offset=offset
+            )
+            if len(batch["ids"]) == 0:
+                break
+            emb_chunks.append(np.asarray(batch["embeddings"], dtype=np.float32))
+            metas.extend(batch["metadatas"])
+            ids.extend(batch["ids"])
+            offset += len(batch["ids"])
+
+        embeddings = np.vstack(emb_chunks) if emb_chunks else np.zeros((0, 0), dtype=np.float32)
+        return cls(
+            embeddings,
+            [m.get("공고id") for m in metas],
+            [m.get("type") for m in metas],
+            [m.get("경력", np.nan) for m in metas],
+            [m.get("근무위치") for m in metas],
+            doc_ids=ids,
+            **kwargs
+        )
+
+    def save(self, path: str):
+        """
+        스냅샷 배열을 path 디렉터리에 .npy로 저장 (메모리 매핑 가능한 고정폭 타입으로 변환)
+        근무위치가 없는 행(None)은 "None" 문자열로 저장됨 (하드필터 인덱스도 문자열로 비교하므로 동일)
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {
+            "embeddings": np.asarray(self.embeddings, dtype=np.float32),
+            "job_ids": self.job_ids,
+            "types": _str_column(self.types),
+            "experience": self.experience,
+            "locations": _str_column(self.locations),
+            "doc_ids": self.doc_ids,
+        }
+        if self.quantized is not None:
+            arrays["quantized_codes"] = self.quantized.codes
+            if self.quantized.scales is not None:
+                arrays["quantized_scales"] = self.quantized.scales
+        for name, arr in arrays.items():
+            np.save(os.path.join(path, name + ".npy"), np.ascontiguousarray(arr))
+        meta = {
+            "n_docs": len(self),
+            "quantization": self.quantized.mode if self.quantized is not None else None,
+            "rescore_k": self.options["rescore_k"],
+        }
+        with open(os.path.join(path, SNAPSHOT_META_NAME), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "EmbeddingSnapshot":
+        """save로 저장한 스냅샷 열기. mmap=True면 모든 배열을 읽기 전용 메모리 매핑으로 참조 (복사 없음)"""
+        with open(os.path.join(path, SNAPSHOT_META_NAME), encoding="utf-8") as f:
+            meta = json.load(f)
+        mmap_mode = "r" if mmap else None
+
+        def array(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode=mmap_mode, allow_pickle=False)
+
+        quantized = None
+        if meta["quantization"]:
+            scales_path = os.path.join(path, "quantized_scales.npy")
+            quantized = QuantizedMatrix(
+                meta["quantization"], array("quantized_codes"),
+                array("quantized_scales") if os.path.exists(scales_path) else None
+            )
+        return cls(
+            array("embeddings"), array("job_ids"), array("types"), array("experience"), array("locations"),
+            quantization=meta["quantization"], rescore_k=meta["rescore_k"], doc_ids=array("doc_ids"),
+            normalized=True, quantized=quantized
+        )
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """프로세스에 상주하는 임베딩 바이트 수 (메모리 매핑된 행렬은 제외)"""
+        resident = 0
+        if not _is_mapped(self.embeddings):
+            resident += self.embeddings.nbytes
+        if self.quantized is not None and not _is_mapped(self.quantized.codes):
+            resident += self.quantized.nbytes
+        return resident
+
+    def filtered_engine(self, row_mask) -> ScoringEngine:
+        """하드필터 마스크를 적용한 ScoringEngine (임베딩 복사 없음)"""
+        return self.engine.with_rows(row_mask)
+
+    def apply_delta(self, doc_ids, embeddings, metadatas, deleted_ids=()) -> "EmbeddingSnapshot":
+        """
+        증분 색인 결과를 반영한 새 스냅샷 (기존 스냅샷은 그대로 두어 진행 중인 요청에 영향 없음)
+        - 기존 문서 id: 같은 행 위치에서 임베딩/메타데이터 교체
+        - 새 문서 id: 끝에 추가
+        - deleted_ids: 행 제거
+        """
+        row_of = {d: i for i, d in enumerate(self.doc_ids)}
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(doc_ids), self.embeddings.shape[1])
+
+        emb = np.array(self.embeddings, dtype=np.float32)
+        # 고정폭 문자열 배열(load한 스냅샷)에 더 긴 값이 들어와도 잘리지 않도록 object로 복사
+        job_ids, types = self.job_ids.astype(object), self.types.astype(object)
+        experience, locations = self.experience.copy(), self.locations.astype(object)
+        new_rows = []
+        for i, (d, meta) in enumerate(zip(doc_ids, metadatas)):
+            row = row_of.get(d)
+            if row is None:
+                new_rows.append(i)
+                continue
+            emb[row] = embeddings[i]
+            job_ids[row], types[row] = meta.get("공고id"), meta.get("type")
+            experience[row], locations[row] = meta.get("경력", np.nan), meta.get("근무위치")
+
+        keep = ~np.isin(self.doc_ids, np.asarray(list(deleted_ids), dtype=str))
+        new_metas = [metadatas[i] for i in new_rows]
+        return EmbeddingSnapshot(
+            np.vstack([emb[keep], embeddings[new_rows]]) if new_rows else emb[keep],
+            np.concatenate([job_ids[keep], [m.get("공고id") for m in new_metas]]),
+            np.concatenate([types[keep], [m.get("type") for m in new_metas]]),
+            np.concatenate([experience[keep], [m.get("경력", np.nan) for m in new_metas]]),
+            np.concatenate([locations[keep], [m.get("근무위치") for m in new_metas]]),
+            doc_ids=np.concatenate([self.doc_ids[keep], np.asarray([doc_ids[i] for i in new_rows], dtype=str)]),
+            **self.options
+        )
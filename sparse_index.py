@@ -0,0 +1,167 @@
+import os
+
+import numpy as np
+
+############################
+# BGE-M3 sparse(lexical) 역색인 (자격요건및우대사항)
+############################
+# 색인 시 자격요건및우대사항 문서의 lexical weight(토큰 id -> 가중치)를 저장해 두고
+# 질의의 lexical weight와 sparse 내적으로 공고 점수를 계산한다.
+# "Python과 SQL" 같은 기술 키워드 질의는 dense보다 어휘 일치가 더 직접적인 신호가 된다.
+#
+# 저장 형식 (npz): 토큰 id 정렬 배열 + offsets(CSR) + posting별 공고 번호 / float16 가중치
+# 공고 번호는 자격요건및우대사항 문서 하나에 대응하며, 문서 id(doc_ids)를 함께 저장해
+# 증분 색인은 문서 단위로 교체 / 삭제한다 (같은 공고id가 여러 행에 있어도 바뀐 행의 문서만 교체).
+# - dense:  기존 dense 점수만 사용
+# - sparse: 자격요건및우대사항 필드 점수를 sparse 점수로 대체
+# - hybrid: sparse 상위 top_n 공고로 후보를 줄인 뒤 dense 점수 + alpha * sparse 점수
+
+SPARSE_FIELD = "자격요건및우대사항"
+SPARSE_MODES = ("dense", "sparse", "hybrid")
+SPARSE_INDEX_NAME = "sparse_skills.npz"
+
+
+class SparseIndex:
+    """
+    토큰 id -> (공고 번호, 가중치) posting list
+
+    job_ids: 공고 번호 -> 공고id
+    tokens: 정렬된 토큰 id (int32)
+    offsets: tokens[i]의 posting 구간 [offsets[i], offsets[i+1])
+    post_jobs / post_weights: posting별 공고 번호(int32) / 가중치(float16)
+    doc_ids: 공고 번호 -> 문서 id (None이면 문서 id 없이 만든 이전 형식. apply_delta 불가)
+    """
+
+    def __init__(self, job_ids, tokens, offsets, post_jobs, post_weights, doc_ids=None):
+        self.job_ids = np.asarray(job_ids, dtype=object).astype(str)
+        self.doc_ids = None if doc_ids is None else np.asarray(doc_ids, dtype=object).astype(str)
+        self.tokens = np.asarray(tokens, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.post_jobs = np.asarray(post_jobs, dtype=np.int32)
+        self.post_weights = np.asarray(post_weights, dtype=np.float16)
+        self._mapped_for = None
+        self._engine_codes = None
+
+    @classmethod
+    def from_triplets(cls, job_ids, jobs, tokens, weights, doc_ids=None) -> "SparseIndex":
+        """(공고 번호, 토큰 id, 가중치) COO 배열로부터 CSR 역색인 구성"""
+        jobs = np.asarray(jobs, dtype=np.int32)
+        tokens = np.asarray(tokens, dtype=np.int32)
+        order = np.lexsort((jobs, tokens))
+        tokens, jobs = tokens[order], jobs[order]
+        weights = np.asarray(weights, dtype=np.float32)[order]
+        uniq, starts = np.unique(tokens, return_index=True)
+        offsets = np.append(starts, len(tokens)).astype(np.int64)
+        return cls(job_ids, uniq, offsets, jobs, weights, doc_ids)
+
+    @classmethod
+    def from_weights(cls, job_ids, lexical_weights, doc_ids=None) -> "SparseIndex":
+        """
+        job_ids: 문서별 공고id 목록
+        lexical_weights: 문서별 {토큰 id: 가중치} (BGE-M3 lexical_weights)
+        doc_ids: 문서 id 목록 (증분 갱신용)
+        """
+        jobs, tokens, weights = [], [], []
+        for j, lw in enumerate(lexical_weights):
+            jobs.extend([j] * len(lw))
+            tokens.extend(int(t) for t in lw.keys())
+            weights.extend(float(w) for w in lw.values())
+        return cls.from_triplets(job_ids, jobs, tokens, weights, doc_ids)
+
+    def to_triplets(self):
+        """(공고 번호, 토큰 id, 가중치) COO 배열"""
+        tokens = np.repeat(self.tokens, np.diff(self.offsets))
+        return self.post_jobs, tokens, self.post_weights.astype(np.float32)
+
+    @classmethod
+    def load(cls, path: str) -> "SparseIndex":
+        data = np.load(path, allow_pickle=False)
+        return cls(
+            data["job_ids"], data["tokens"], data["offsets"], data["post_jobs"], data["post_weights"],
+            data["doc_ids"] if "doc_ids" in data.files else None
+        )
+
+    def save(self, path: str):
+        # np.savez는 .npz 확장자를 붙이므로 파일 객체로 저장 후 교체
+        tmp_path = path + ".tmp"
+        arrays = {} if self.doc_ids is None else {"doc_ids": self.doc_ids.astype(str)}
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f, job_ids=self.job_ids.astype(str), tokens=self.tokens, offsets=self.offsets,
+                post_jobs=self.post_jobs, post_weights=self.post_weights, **arrays
+            )
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.tokens.nbytes + self.offsets.nbytes + self.post_jobs.nbytes + self.post_weights.nbytes
+
+    def apply_delta(self, doc_ids, job_ids, lexical_weights, deleted_doc_ids=()) -> "SparseIndex":
+        """
+        문서 단위 갱신: doc_ids 문서의 posting을 새 가중치로 교체(없으면 추가), deleted_doc_ids는 제거
+        같은 공고id의 다른 문서(중복 행)는 그대로 유지
+        """
+        if self.doc_ids is None:
+            raise ValueError("문서 id가 없는 이전 형식의 sparse 색인은 증분 갱신할 수 없습니다. 다시 생성해주세요.")
+        replaced = set(map(str, doc_ids)) | set(map(str, deleted_doc_ids))
+        keep_doc = np.array([d not in replaced for d in self.doc_ids], dtype=bool)
+        remap = np.full(len(self.job_ids), -1, dtype=np.int64)
+        remap[keep_doc] = np.arange(keep_doc.sum())
+
+        jobs, tokens, weights = self.to_triplets()
+        keep_post = keep_doc[jobs] if len(jobs) else np.zeros(0, dtype=bool)
+        new = SparseIndex.from_weights(list(map(str, job_ids)), lexical_weights, list(map(str, doc_ids)))
+        new_jobs, new_tokens, new_weights = new.to_triplets()
+        return SparseIndex.from_triplets(
+            np.concatenate([self.job_ids[keep_doc], new.job_ids]),
+            np.concatenate([remap[jobs[keep_post]], new_jobs.astype(np.int64) + int(keep_doc.sum())]),
+            np.concatenate([tokens[keep_post], new_tokens]),
+            np.concatenate([weights[keep_post], new_weights]),
+            np.concatenate([self.doc_ids[keep_doc], new.doc_ids]),
+        )
+
+    def _codes_for(self, engine) -> np.ndarray:
+        """색인 공고 번호 -> engine 공고 코드 (없으면 -1). 같은 스냅샷 엔진이면 재사용"""
+        if self._mapped_for is not engine.job_ids:
+            self._engine_codes = np.array([engine.job_index.get(j, -1) for j in self.job_ids], dtype=np.int64)
+            self._mapped_for = engine.job_ids
+        return self._engine_codes
+
+    def job_scores(self, query_weights, engine) -> np.ndarray:
+        """
+        질의 lexical weight 목록과의 sparse 내적 (키워드 평균, engine 공고 코드 순서)
+        query_weights: [{토큰 id: 가중치}, ...]
+        """
+        codes = self._codes_for(engine)
+        scores = np.zeros(engine.n_jobs, dtype=np.float64)
+        if not query_weights:
+            return scores
+        for qw in query_weights:
+            if not qw:
+                continue
+            q_tokens = np.fromiter((int(t) for t in qw.keys()), dtype=np.int64, count=len(qw))
+            q_vals = np.fromiter((float(w) for w in qw.values()), dtype=np.float64, count=len(qw))
+            pos = np.searchsorted(self.tokens, q_tokens)
+            found = (pos < len(self.tokens)) & (self.tokens[np.minimum(pos, len(self.tokens) - 1)] == q_tokens)
+            if not found.any():
+                continue
+            starts, ends = self.offsets[pos[found]], self.offsets[pos[found] + 1]
+            idx = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+            contrib = self.post_weights[idx].astype(np.float64) * np.repeat(q_vals[found], ends - starts)
+            job_codes = codes[self.post_jobs[idx]]
+            valid = job_codes >= 0
+            scores += np.bincount(job_codes[valid], weights=contrib[valid], minlength=engine.n_jobs)
+        return scores / len(query_weights)
+
+
+def sparse_prune_mask(lex_scores, job_mask, top_n: int) -> np.ndarray:
+    """job_mask 안에서 sparse 점수가 양수인 상위 top_n 공고 마스크 (hybrid 후보 축소)"""
+    candidates = np.flatnonzero(job_mask & (lex_scores > 0))
+    if len(candidates) > top_n:
+        candidates = candidates[np.argpartition(-lex_scores[candidates], top_n - 1)[:top_n]]
+    mask = np.zeros(len(lex_scores), dtype=bool)
+    mask[candidates] = True
+    return mask
@@ -0,0 +1,136 @@
+import numpy as np
+
+from locations import location_dict
+
+############################
+# 기준 구현 (최초 app.py의 문서 단위 반복문)
+############################
+# 벡터화 / 인덱스 / 캐시 최적화가 순위를 바꾸지 않았는지 비교하기 위한 참조 구현.
+# 하드필터(Chroma where 절), cosine_similarity, calc_soft_filter_scores, Case A~D 분기를
+# Streamlit / Chroma 없이 스냅샷 행에 대해 그대로 옮겼다. 최적화 대상이 아니므로 느려도 된다.
+
+TITLE_THRESHOLD = 0.7
+
+
+def expand_selected_regions(regions) -> list:
+    """지역 키("전체", 시/도명, "시도 시군구", "세종")를 기존 selected_sigungu 목록으로 전개"""
+    selected_sigungu = []
+    for region in regions:
+        if region == "전체":
+            for sido_key, sigungu_list in location_dict.items():
+                if sido_key == "세종":
+                    selected_sigungu.append("세종")
+                else:
+                    for sg in sigungu_list:
+                        selected_sigungu.append(f"{sido_key} {sg}")
+        elif region == "세종":
+            selected_sigungu.append("세종")
+        elif region in location_dict:
+            for sg in location_dict[region]:
+                selected_sigungu.append(f"{region} {sg}")
+        else:
+            selected_sigungu.append(region)
+    return selected_sigungu
+
+
+def hard_filter_docs(snapshot, hard_exp, hard_locs) -> dict:
+    """경력 $lte, 근무위치 $in 조건을 행마다 검사한 collection.get 결과 형태"""
+    docs = {"ids": [], "embeddings": [], "metadatas": []}
+    for i in range(len(snapshot)):
+        if not snapshot.experience[i] <= float(hard_exp):
+            continue
+        if "전체" not in hard_locs and len(hard_locs) > 0 and snapshot.locations[i] not in hard_locs:
+            continue
+        docs["ids"].append(snapshot.doc_ids[i])
+        docs["embeddings"].append(snapshot.embeddings[i])
+        docs["metadatas"].append({"공고id": snapshot.job_ids[i], "type": snapshot.types[i]})
+    return docs
+
+
+def cosine_similarity(vec1, vec2):
+    dot = np.dot(vec1, vec2)
+    norm1 = np.linalg.norm(vec1)
+    norm2 = np.linalg.norm(vec2)
+    if norm1 == 0 or norm2 == 0:
+        return 0.0
+    return float(dot / (norm1 * norm2))
+
+
+def calc_soft_filter_scores(docs, user_filter_dict, embed):
+    keyword_embeddings = {}
+    for col_type, info in user_filter_dict.items():
+        keyword_embeddings[col_type] = [embed(kw) for kw in info["조건"]]
+
+    sim_raw = {}
+    for i, doc_id in enumerate(docs["ids"]):
+        emb = np.array(docs["embeddings"][i], dtype=np.float32)
+        meta = docs["metadatas"][i]
+        j_id = meta["공고id"]
+        t = meta["type"]
+        if j_id not in sim_raw:
+            sim_raw[j_id] = {}
+        if t in user_filter_dict:
+            kw_embs = keyword_embeddings[t]
+            if len(kw_embs) == 0:
+                raw_sim = 0.0
+            else:
+                scores = [cosine_similarity(emb, kw_vec) for kw_vec in kw_embs]
+                raw_sim = np.mean(scores) if scores else 0.0
+            sim_raw[j_id][t] = raw_sim
+
+    final_scores = {}
+    for j_id in sim_raw.keys():
+        score_sum = 0.0
+        for doc_type, info in user_filter_dict.items():
+            score_sum += sim_raw[j_id].get(doc_type, 0.0) * info["가중치"]
+        final_scores[j_id] = score_sum
+    return final_scores
+
+
+def recommend(snapshot, embed, hard_filter_dict, soft_filter_dict, job_title_input, k=5):
+    """
+    기존 제출 흐름의 순위 결과
+    embed: 텍스트 -> 벡터
+    반환: [(공고id, 점수), ...] (Case D는 점수 0.0, 결과가 없으면 빈 목록)
+    """
+    hard_locs = expand_selected_regions(hard_filter_dict["근무위치"])
+    filtered_docs = hard_filter_docs(snapshot, hard_filter_dict["경력"], hard_locs)
+    if len(filtered_docs["ids"]) == 0:
+        return []
+
+    if job_title_input and not soft_filter_dict:
+        title_vec = embed(job_title_input)
+        doc_scores = {}
+        for i, meta in enumerate(filtered_docs["metadatas"]):
+            if meta["type"] == "공고제목":
+                emb = np.array(filtered_docs["embeddings"][i], dtype=np.float32)
+                doc_scores[meta["공고id"]] = cosine_similarity(title_vec, emb)
+        sorted_ids = sorted(doc_scores.keys(), key=lambda x: doc_scores[x], reverse=True)[:k]
+        return [(j_id, doc_scores[j_id]) for j_id in sorted_ids]
+
+    if job_title_input:
+        title_vec = embed(job_title_input)
+        pass_ids = []
+        for i, meta in enumerate(filtered_docs["metadatas"]):
+            if meta["type"] == "공고제목":
+                emb = np.array(filtered_docs["embeddings"][i], dtype=np.float32)
+                if cosine_similarity(title_vec, emb) >= TITLE_THRESHOLD and meta["공고id"] not in pass_ids:
+                    pass_ids.append(meta["공고id"])
+        pass_docs = {"ids": [], "embeddings": [], "metadatas": []}
+        for i, meta in enumerate(filtered_docs["metadatas"]):
+            if meta["공고id"] in pass_ids:
+                pass_docs["ids"].append(filtered_docs["ids"][i])
+                pass_docs["embeddings"].append(filtered_docs["embeddings"][i])
+                pass_docs["metadatas"].append(meta)
+        filtered_docs = pass_docs
+
+    if not soft_filter_dict:
+        job_ids = []
+        for meta in filtered_docs["metadatas"]:
+            if meta["공고id"] not in job_ids:
+                job_ids.append(meta["공고id"])
+        return [(j_id, 0.0) for j_id in job_ids[:k]]
+
+    final_scores = calc_soft_filter_scores(filtered_docs, soft_filter_dict, embed)
+    sorted_ids = sorted(final_scores.keys(), key=lambda x: final_scores[x], reverse=True)[:k]
+    return [(j_id, final_scores[j_id]) for j_id in sorted_ids]
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# 루트의 평면 모듈(scoring.py, pipeline.py, ...)을 그대로 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import StubEncoder, make_synthetic_snapshot  # noqa: E402
+from hard_filter import HardFilterIndex  # noqa: E402
+from locations import location_dict  # noqa: E402
+
+# 테스트용 합성 스냅샷 크기 (BGE-M3와 같은 분포를 흉내 내되 차원은 줄임)
+N_DOCS = 2000
+DIM = 64
+
+
+@pytest.fixture(scope="session")
+def encoder():
+    return StubEncoder(DIM)
+
+
+@pytest.fixture(scope="session")
+def synthetic():
+    """(EmbeddingSnapshot, 공고 메타데이터 DataFrame)"""
+    return make_synthetic_snapshot(N_DOCS, dim=DIM, seed=7)
+
+
+@pytest.fixture(scope="session")
+def hard_index(synthetic):
+    snapshot, _ = synthetic
+    return HardFilterIndex.from_snapshot(snapshot, location_dict)
+
+
+@pytest.fixture
+def offline_index(monkeypatch, encoder):
+    """ingest / reindex가 메모리 컬렉션과 현재 프로세스 인코딩을 쓰도록 대체 (FakeCollection 반환)"""
+    import fake_index
+    return fake_index.install(monkeypatch, encoder)
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+
+import numpy as np
+
+############################
+# 오프라인 색인 테스트용 Chroma 컬렉션 / 인코딩 풀 대체
+############################
+# ingest.py / reindex.py / SnapshotRefresher가 쓰는 컬렉션 API(get / upsert / update / delete)와
+# 프로세스 풀(map / shutdown)만 메모리에서 흉내 낸다. 인코딩은 워커 전역 인코더(StubEncoder)로 현재 프로세스에서 실행.
+
+
+class FakeCollection:
+    def __init__(self):
+        self.rows = OrderedDict()  # 문서 id -> (임베딩, 텍스트, 메타데이터)
+        self.calls = {"upsert": 0, "update": 0, "delete": 0}
+
+    def count(self) -> int:
+        return len(self.rows)
+
+    def get(self, ids=None, include=(), limit=None, offset=0):
+        keys = list(self.rows) if ids is None else [d for d in ids if d in self.rows]
+        keys = keys[offset:] if limit is None else keys[offset:offset + limit]
+        out = {"ids": keys}
+        if "embeddings" in include:
+            out["embeddings"] = [self.rows[d][0] for d in keys]
+        if "metadatas" in include:
+            out["metadatas"] = [dict(self.rows[d][2]) for d in keys]
+        if "documents" in include:
+            out["documents"] = [self.rows[d][1] for d in keys]
+        return out
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.calls["upsert"] += len(ids)
+        for d, text, meta, emb in zip(ids, documents, metadatas, embeddings):
+            self.rows[d] = (list(emb), text, dict(meta))
+
+    def update(self, ids, metadatas):
+        self.calls["update"] += len(ids)
+        for d, meta in zip(ids, metadatas):
+            emb, text, _ = self.rows[d]
+            self.rows[d] = (emb, text, dict(meta))
+
+    def delete(self, ids):
+        self.calls["delete"] += len(ids)
+        for d in ids:
+            self.rows.pop(d, None)
+
+
+class FakeClient:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def delete_collection(self, name):
+        self.collection.rows.clear()
+
+
+class InlinePool:
+    """ProcessPoolExecutor 대체 (현재 프로세스에서 순서대로 실행)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def map(self, fn, *iterables):
+        return list(map(fn, *iterables))
+
+    def shutdown(self):
+        pass
+
+
+def install(monkeypatch, encoder, collection=None) -> FakeCollection:
+    """ingest / reindex 모듈의 컬렉션 / 풀 / 워커 인코더를 대체하고 컬렉션 반환"""
+    import ingest
+    import reindex
+
+    collection = collection or FakeCollection()
+
+    def open_collection(db_path, collection_name, upsert_batch=5000):
+        return FakeClient(collection), collection, min(upsert_batch, 7)
+
+    for module in (ingest, reindex):
+        monkeypatch.setattr(module, "open_collection", open_collection)
+        monkeypatch.setattr(module, "encoder_pool", lambda *args, **kwargs: InlinePool())
+    monkeypatch.setattr(ingest, "_worker_encoder", encoder)
+    return collection
+
+
+def embedding_of(collection, doc_id) -> np.ndarray:
+    return np.asarray(collection.rows[doc_id][0], dtype=np.float32)
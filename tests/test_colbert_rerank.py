@@ -0,0 +1,121 @@
+import numpy as np
+
+from benchmark import make_synthetic_colbert_store
+from colbert_rerank import ColbertReranker, ColbertStore, ColbertWriter, maxsim_scores
+from hard_filter import HardFilterIndex
+from locations import location_dict
+from pipeline import recommend
+from snapshot import EmbeddingSnapshot
+
+DIM = 8
+
+
+def random_tokens(rng, n):
+    vecs = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def naive_maxsim(query, doc_tokens) -> float:
+    if doc_tokens is None:
+        return 0.0
+    return float(np.mean([max(float(q @ t) for t in doc_tokens) for q in query]))
+
+
+def test_maxsim_matches_naive(tmp_path):
+    rng = np.random.default_rng(0)
+    docs = {f"J{i}-주요업무-{i}": random_tokens(rng, int(rng.integers(1, 6))) for i in range(6)}
+    writer = ColbertWriter(str(tmp_path), DIM)
+    for d, tokens in docs.items():
+        writer.add(d, tokens)
+    writer.close()
+    store = ColbertStore(str(tmp_path))
+    query = random_tokens(rng, 3)
+    doc_ids = list(docs)[::-1] + ["없는문서", None]
+    stored = {d: tokens.astype(np.float16).astype(np.float32) for d, tokens in docs.items()}
+    expected = [naive_maxsim(query, stored.get(d)) for d in doc_ids]
+    np.testing.assert_allclose(maxsim_scores(store, query, doc_ids), expected, atol=1e-5)
+
+
+def test_rewrite_swaps_files_without_touching_mapped_store(tmp_path):
+    """새로 쓰기(append=False)는 임시 파일에 쓴 뒤 교체하므로 이미 연 저장소는 이전 벡터를 계속 읽음"""
+    rng = np.random.default_rng(1)
+    old = random_tokens(rng, 4)
+    writer = ColbertWriter(str(tmp_path), DIM)
+    writer.add("J1-주요업무-0", old)
+    writer.close()
+    store = ColbertStore(str(tmp_path))
+
+    writer = ColbertWriter(str(tmp_path), DIM)
+    writer.add("J1-주요업무-0", random_tokens(rng, 2))
+    np.testing.assert_array_equal(store.vectors[:4], old.astype(np.float16))
+    writer.close()
+    np.testing.assert_array_equal(store.vectors[:4], old.astype(np.float16))
+    assert len(ColbertStore(str(tmp_path)).vectors) == 2
+
+    # append=True는 기존 행 오프셋을 유지하고 끝에 추가
+    writer = ColbertWriter(str(tmp_path), append=True)
+    writer.add("J2-주요업무-1", old)
+    writer.delete(["J1-주요업무-0"])
+    writer.close()
+    appended = ColbertStore(str(tmp_path))
+    assert list(appended.doc_ids) == ["J2-주요업무-1"]
+    assert (appended.starts[0], appended.ends[0]) == (2, 6)
+
+
+def test_budget_fallback_skips_encoding(synthetic, tmp_path, encoder):
+    snapshot, _ = synthetic
+    store = make_synthetic_colbert_store(snapshot, str(tmp_path))
+    calls = []
+
+    def encode_colbert(texts):
+        calls.append(len(texts))
+        return encoder.encode_colbert(texts)
+
+    reranker = ColbertReranker(store, encode_colbert, top_n=10, budget_ms=1000.0)
+    job_ids = list(snapshot.engine.job_ids[:10])
+    ranked = [(j, 1.0 - i / 10) for i, j in enumerate(job_ids)]
+    doc_ids = {"주요업무": [f"{j}-주요업무-{i}" for i, j in enumerate(job_ids)]}
+    out, reranked, scores = reranker.rerank(ranked, {"주요업무": (["API 서버 개발"], 1.0)}, doc_ids, k=5)
+    assert reranked and len(out) == 5 and set(scores) == {j for j, _ in out}
+    # 재순위는 순서만 바꾸고 dense 점수는 유지
+    assert all(dict(ranked)[j] == s for j, s in out)
+    assert sorted(scores.values(), reverse=True) == [scores[j] for j, _ in out]
+
+    # 예상 인코딩 비용이 예산을 넘으면 인코딩 없이 dense 순서, 추정치는 점점 줄어듦
+    reranker.encode_ms_per_text = 2000.0
+    out, reranked, scores = reranker.rerank(ranked, {"주요업무": (["API 서버 개발"], 1.0)}, doc_ids, k=5)
+    assert (out, reranked, scores) == (ranked[:5], False, None)
+    assert calls == [1] and reranker.encode_ms_per_text < 2000.0
+
+
+class RecordingReranker:
+    top_n = 10
+
+    def rerank(self, ranked, queries, doc_ids, k=5):
+        self.doc_ids = doc_ids
+        return ranked[:k], True, {j: 0.0 for j, _ in ranked[:k]}
+
+
+def test_rerank_uses_the_rows_the_dense_engine_scored(encoder):
+    """같은 공고id가 여러 행이면 재순위도 dense 점수를 낸 (마지막) 행의 문서를 사용"""
+    rng = np.random.default_rng(2)
+    job_ids = ["J1", "J1", "J2", "J1"]
+    types = ["주요업무", "주요업무", "주요업무", "공고제목"]
+    doc_ids = ["J1-주요업무-0", "J1-주요업무-1", "J2-주요업무-2", "J1-공고제목-0"]
+    snapshot = EmbeddingSnapshot(
+        rng.standard_normal((4, 64)), job_ids, types, [0] * 4, ["세종"] * 4, doc_ids=doc_ids
+    )
+    np.testing.assert_array_equal(snapshot.engine.field_rows(["J2", "J1", "J3"], "주요업무"), [2, 1, -1])
+
+    hard_index = HardFilterIndex.from_snapshot(snapshot, location_dict)
+    reranker = RecordingReranker()
+    rec = recommend(
+        snapshot, hard_index, encoder.encode, {"경력": 0, "근무위치": []},
+        {"주요업무": {"가중치": 1.0, "조건": ["API 서버 개발"]}}, "", rerank=reranker
+    )
+    field_scores = rec.field_scores
+    query = encoder.encode(["API 서버 개발"])[0]
+    expected = dict(zip(["J1-주요업무-1", "J2-주요업무-2"], snapshot.embeddings[[1, 2]] @ query))
+    assert sorted(reranker.doc_ids["주요업무"]) == sorted(expected)
+    for j_id, d_id in zip([j for j, _ in rec.ranked], reranker.doc_ids["주요업무"]):
+        np.testing.assert_allclose(field_scores[j_id]["주요업무"], expected[d_id], atol=1e-5)
@@ -0,0 +1,71 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from benchmark import SAMPLE_BENEFITS, SAMPLE_SKILLS, SAMPLE_TASKS, SAMPLE_TITLES
+from embed_batcher import EmbeddingBatcher
+
+TEXTS = SAMPLE_TITLES + SAMPLE_TASKS + SAMPLE_SKILLS + SAMPLE_BENEFITS
+
+
+@pytest.fixture
+def batcher(encoder):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return encoder.encode(texts)
+
+    batcher = EmbeddingBatcher(encode, max_batch=8, max_wait_ms=20.0)
+    batcher.calls = calls
+    yield batcher
+    batcher.close()
+
+
+def test_concurrent_requests_match_serial(batcher, encoder):
+    """여러 스레드의 요청이 묶여도 요청별 결과가 단독 encode와 같은지 (중복 텍스트는 한 번만 인코딩)"""
+    rng = np.random.default_rng(0)
+    requests = [list(rng.choice(TEXTS, size=int(rng.integers(1, 4)))) for _ in range(64)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(batcher.encode, requests))
+    for texts, got in zip(requests, results):
+        np.testing.assert_array_equal(got, encoder.encode(texts))
+
+    assert batcher.stats["requests"] == len(requests)
+    assert all(len(call) == len(set(call)) for call in batcher.calls)
+    assert batcher.stats["batches"] < len(requests)
+
+
+def test_oversized_request_runs_alone(batcher, encoder):
+    """max_batch보다 큰 요청도 잘리지 않고 그대로 처리"""
+    np.testing.assert_array_equal(batcher.encode(TEXTS), encoder.encode(TEXTS))
+
+
+def test_list_results_and_errors():
+    """리스트 결과는 요청별로 잘라 돌려주고, encode 예외는 해당 배치의 모든 요청에 전달"""
+    started, release = threading.Event(), threading.Event()
+
+    def encode(texts):
+        started.set()
+        release.wait(5.0)
+        if "fail" in texts:
+            raise ValueError("boom")
+        return [t.upper() for t in texts]
+
+    batcher = EmbeddingBatcher(encode, max_batch=32, max_wait_ms=1.0)
+    try:
+        ok = batcher.submit(["a", "b"])
+        # 첫 배치를 인코딩하는 동안 들어온 두 요청은 다음 배치 하나로 묶임
+        assert started.wait(5.0)
+        bad = [batcher.submit(["fail"]), batcher.submit(["c"])]
+        release.set()
+        assert ok.result() == ["A", "B"]
+        for future in bad:
+            with pytest.raises(ValueError):
+                future.result()
+    finally:
+        batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(["a"])
@@ -0,0 +1,37 @@
+import numpy as np
+
+import baseline
+from benchmark import random_profile
+from hard_filter import ALL_REGIONS, HardFilterIndex
+from locations import location_dict
+
+
+def naive_mask(snapshot, hard_exp, regions) -> np.ndarray:
+    docs = baseline.hard_filter_docs(snapshot, hard_exp, baseline.expand_selected_regions(regions))
+    return np.isin(snapshot.doc_ids, docs["ids"])
+
+
+def test_mask_matches_where_clause(synthetic, hard_index):
+    """경력 $lte + 근무위치 $in 행 마스크가 기존 Chroma where 조건과 같은지 (시/도 전체, "전체" 포함)"""
+    snapshot, _ = synthetic
+    rng = np.random.default_rng(0)
+    for _ in range(60):
+        profile = random_profile(rng, "C")
+        np.testing.assert_array_equal(
+            hard_index.mask(profile["experience"], profile["regions"]),
+            naive_mask(snapshot, profile["experience"], profile["regions"])
+        )
+    sido = next(s for s, sigungu in location_dict.items() if sigungu)
+    for regions in ([ALL_REGIONS], [sido], ["세종", sido], []):
+        for exp in (0, 3, 20):
+            np.testing.assert_array_equal(hard_index.mask(exp, regions), naive_mask(snapshot, exp, regions))
+
+
+def test_unknown_location_and_missing_experience():
+    """location_dict에 없는 근무위치는 지역 선택에서 제외, 경력 NaN은 어떤 조건도 만족하지 않음"""
+    sido = next(s for s, sigungu in location_dict.items() if sigungu)
+    district = f"{sido} {location_dict[sido][0]}"
+    index = HardFilterIndex(location_dict, [district, "해외", district], [0, 1, np.nan])
+    assert index.mask(5, [sido]).tolist() == [True, False, False]
+    assert index.mask(5, []).tolist() == [True, True, False]
+    assert index.mask(0, [district, "해외"]).tolist() == [True, False, False]
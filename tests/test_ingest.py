@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from ingest import (
+    DOC_TYPES, chunk_documents, content_hash, ingest, iter_posting_chunks, latest_delta_version,
+    posting_documents, read_delta_manifests, write_delta_manifest
+)
+from posting_store import write_frame
+from snapshot import EmbeddingSnapshot, split_doc_id
+from sparse_index import SPARSE_FIELD, SPARSE_INDEX_NAME, SparseIndex
+
+from fake_index import embedding_of
+
+
+def posting_table(n: int = 12) -> pd.DataFrame:
+    return pd.DataFrame({
+        "공고id": [str(100 + i) for i in range(n)],
+        "공고제목": [f"데이터 엔지니어 {i}" for i in range(n)],
+        "주요업무": [f"파이프라인 구축 {i}" if i % 5 else None for i in range(n)],
+        "자격요건": [f"Python {i}" for i in range(n)],
+        "우대사항": [f"Spark {i}" if i % 2 else "" for i in range(n)],
+        "혜택및복지": ["재택근무"] * n,
+        "근무위치": ["서울 강남구"] * n,
+        "경력": [i % 4 for i in range(n)],
+    })
+
+
+def test_posting_documents():
+    row = {"공고id": 257955, "공고제목": "백엔드", "주요업무": float("nan"), "자격요건": "Java",
+           "우대사항": "Kotlin", "혜택및복지": " ", "근무위치": "서울 강남구", "경력": "3.0"}
+    docs = posting_documents(row, 6)
+    assert [d[0] for d in docs] == ["257955-공고제목-6", "257955-자격요건및우대사항-6"]
+    text, meta = docs[1][1], docs[1][2]
+    assert text == "Java\nKotlin"
+    assert meta == {"공고id": "257955", "근무위치": "서울 강남구", "경력": 3, "type": SPARSE_FIELD,
+                    "hash": content_hash(text)}
+    assert "경력" not in posting_documents({**row, "경력": None}, 0)[0][2]
+
+
+def test_chunks_keep_table_row_numbers(tmp_path):
+    path = str(tmp_path / "postings.arrow")
+    write_frame(posting_table(), path)
+    chunks = list(iter_posting_chunks(path, chunk_rows=5))
+    assert [len(c) for c in chunks] == [5, 5, 2]
+    rows = [int(split_doc_id(d[0])[2]) for no, c in enumerate(chunks) for d in chunk_documents(c, no * 5)]
+    expected = [i for i in range(12) for t in DOC_TYPES if not (t == "주요업무" and i % 5 == 0)]
+    assert rows == expected
+
+
+def test_ingest_builds_collection_snapshot_and_sparse_index(tmp_path, offline_index, encoder):
+    source = str(tmp_path / "postings.arrow")
+    write_frame(posting_table(), source)
+    # (Chroma PersistentClient가 만드는 db 디렉터리)
+    db_path = str(tmp_path)
+    result = ingest(source, db_path, chunk_rows=5, sparse=True)
+
+    docs = chunk_documents(posting_table().to_dict("records"), 0)
+    assert result["docs"] == len(docs) == offline_index.count()
+    for d_id, text, meta in docs:
+        assert offline_index.rows[d_id][2] == meta
+        np.testing.assert_allclose(embedding_of(offline_index, d_id), encoder.encode([text])[0])
+
+    snapshot = EmbeddingSnapshot.from_collection(offline_index, batch_size=4)
+    assert sorted(snapshot.doc_ids) == sorted(d[0] for d in docs)
+
+    sparse = SparseIndex.load(f"{db_path}/{SPARSE_INDEX_NAME}")
+    assert sorted(sparse.doc_ids) == sorted(d[0] for d in docs if d[2]["type"] == SPARSE_FIELD)
+    assert read_delta_manifests(db_path, 0)[-1]["full"] is True
+
+
+def test_delta_manifests(tmp_path):
+    db_path = str(tmp_path)
+    assert latest_delta_version(db_path) == 0
+    for i in range(5):
+        write_delta_manifest(db_path, upserted=[f"u{i}"], deleted=[f"d{i}"], keep=3)
+    assert latest_delta_version(db_path) == 5
+    assert [m["upserted"] for m in read_delta_manifests(db_path, 2)] == [["u2"], ["u3"], ["u4"]]
+    # 지워진 버전 이후부터 읽으려 하면 전체 재조회가 필요함을 알림
+    assert read_delta_manifests(db_path, 1) is None
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from posting_digest import (
+    DIGEST_CHARS, DIGEST_ITEMS, ITEM_CHARS, ITEM_SEPARATOR, add_digest_columns, digest_column, digest_text,
+    has_digest_columns, split_items
+)
+from text_format import DETAIL_FIELDS
+
+
+def test_split_items_strips_markers_headings_and_duplicates():
+    text = "\n".join([
+        "[담당업무]",
+        "1) 데이터 파이프라인 구축",
+        "- 2. 대시보드 개발",
+        "• 데이터 파이프라인 구축",
+        "자격요건 :",
+        "Python • SQL • Spark",
+        "-",
+    ])
+    assert split_items(text) == ["데이터 파이프라인 구축", "대시보드 개발", "Python", "SQL", "Spark"]
+
+
+def test_digest_limits():
+    items = [f"항목 {i} " + "가" * 30 for i in range(20)]
+    digest = digest_text("\n".join(items))
+    parts = digest.split(ITEM_SEPARATOR)
+    assert len(parts) <= DIGEST_ITEMS and len(digest) <= DIGEST_CHARS
+    assert parts == items[:len(parts)]
+
+    long_item = digest_text("가" * 500)
+    assert len(long_item) == ITEM_CHARS + 1 and long_item.endswith("…")
+    for empty in (None, np.nan, "", "[자격요건]"):
+        assert digest_text(empty) == ""
+
+
+def test_add_digest_columns():
+    df = pd.DataFrame({field: ["- A 업무\n- B 업무", None] for field in DETAIL_FIELDS})
+    out = add_digest_columns(df)
+    assert has_digest_columns(out.columns) and not has_digest_columns(df.columns)
+    for field in DETAIL_FIELDS:
+        assert out[digest_column(field)].tolist() == ["A 업무 / B 업무", ""]
@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from benchmark import make_synthetic_store
+from posting_store import CARD_COLUMNS, PostingStore, write_frame
+from text_format import DETAIL_FIELDS, format_display
+
+
+@pytest.fixture
+def store(synthetic, tmp_path):
+    _, jobs = synthetic
+    store = make_synthetic_store(jobs, str(tmp_path / "postings.arrow"))
+    yield store
+    store.close()
+
+
+def test_get_rows_in_request_order(store, synthetic):
+    _, jobs = synthetic
+    job_ids = list(jobs["공고id"].iloc[[30, 2, 17]]) + ["없는공고"]
+    df = store.get_rows(job_ids, CARD_COLUMNS)
+    assert df["공고id"].tolist() == job_ids[:3]
+    assert list(df.columns) == [c for c in CARD_COLUMNS if c in store.columns]
+    assert df["공고제목"].tolist() == jobs.set_index("공고id").loc[job_ids[:3], "공고제목"].tolist()
+
+
+def test_get_details_matches_formatted_text(store, synthetic):
+    _, jobs = synthetic
+    j_id = jobs["공고id"].iloc[5]
+    details = store.get_details(j_id)
+    for field in DETAIL_FIELDS:
+        assert details[field] == format_display(store.get_value(j_id, field))
+    assert store.get_value("없는공고", "공고제목") is None
+
+
+def test_concurrent_writes_leave_one_complete_file(tmp_path):
+    """동시에 변환해도 임시 파일이 겹치지 않고, 마지막으로 교체된 완전한 파일만 남음"""
+    path = str(tmp_path / "postings.arrow")
+    frames = [pd.DataFrame({"공고id": [f"J{w}-{i}" for i in range(2000)], "값": range(2000)}) for w in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda df: write_frame(df, path), frames))
+    assert os.listdir(tmp_path) == ["postings.arrow"]
+    store = PostingStore(path)
+    try:
+        df = store.get_rows(list(store.row_index))
+        assert len({j_id.split("-")[0] for j_id in df["공고id"]}) == 1
+        assert df["값"].tolist() == list(range(2000))
+    finally:
+        store.close()
+
+
+def test_duplicated_job_id_yields_one_card_row(tmp_path):
+    """원본 테이블에 같은 공고id가 연속 두 행 있어도 (예: 272799) 카드 조회는 공고당 한 행"""
+    df = pd.DataFrame({
+        "공고id": ["272798", "272799", "272799", "272800"],
+        "공고제목": ["A", "B-1", "B-2", "C"],
+    })
+    path = str(tmp_path / "postings.arrow")
+    write_frame(df, path)
+    store = PostingStore(path)
+    try:
+        assert store.get_rows(["272799", "272800"])["공고제목"].tolist() == ["B-1", "B-2", "C"]
+        cards = store.get_rows(["272799", "272800"], unique=True)
+        assert cards["공고제목"].tolist() == ["B-1", "C"]
+        assert store.get_value("272799", "공고제목") == cards["공고제목"].iloc[0]
+    finally:
+        store.close()
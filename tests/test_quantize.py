@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from benchmark import SAMPLE_TASKS, SAMPLE_TITLES, make_synthetic_snapshot
+from pipeline import TITLE_THRESHOLD
+from quantize import QUANTIZATION_MODES, QuantizedMatrix, ranking_agreement
+from scoring import ScoringEngine
+
+from conftest import DIM, N_DOCS
+
+
+def random_queries(snapshot, n, seed=0) -> list:
+    """저장된 문서 임베딩을 필드별 의사 질의로 사용 (quantize.py 리포트와 같은 방식)"""
+    rng = np.random.default_rng(seed)
+    fields = ["주요업무", "자격요건및우대사항", "혜택및복지"]
+    queries = []
+    for _ in range(n):
+        chosen = rng.choice(fields, size=int(rng.integers(1, len(fields) + 1)), replace=False)
+        queries.append({f: [snapshot.embeddings[rng.integers(len(snapshot))]] for f in chosen})
+    return queries
+
+
+@pytest.mark.parametrize("mode", QUANTIZATION_MODES)
+def test_error_bound_covers_quantization_error(synthetic, encoder, mode):
+    snapshot, _ = synthetic
+    quantized = QuantizedMatrix.from_float32(snapshot.embeddings, mode)
+    rows = np.arange(len(snapshot))
+    q = encoder.encode(SAMPLE_TASKS)
+    exact = snapshot.embeddings @ q.T
+    assert np.all(np.abs(quantized.row_dot(rows, q) - exact) <= quantized.error_bound(rows, q) + 1e-6)
+
+
+@pytest.mark.parametrize("mode", QUANTIZATION_MODES)
+def test_rescored_top_k_matches_float32(synthetic, mode):
+    """1차 양자화 채점 + full-precision 재채점 상위 k개가 float32 엔진과 같은지"""
+    snapshot, _ = synthetic
+    quantized = make_synthetic_snapshot(N_DOCS, dim=DIM, seed=7, quantization=mode, rescore_k=300)[0]
+    agreement = ranking_agreement(snapshot.engine, quantized.engine, random_queries(snapshot, 100))
+    assert agreement["overlap_at_k"] >= 0.99
+    assert agreement["exact_order"] >= 0.95
+
+    # 재채점 대상이 전체 공고를 덮으면 순위 / 점수까지 정확히 일치
+    full = ScoringEngine(
+        snapshot.embeddings, snapshot.job_ids, snapshot.types, normalized=True,
+        quantized=quantized.quantized, rescore_k=snapshot.engine.n_jobs
+    )
+    assert ranking_agreement(snapshot.engine, full, random_queries(snapshot, 50, seed=1)) == {
+        "overlap_at_k": 1.0, "exact_order": 1.0
+    }
+
+
+@pytest.mark.parametrize("mode", QUANTIZATION_MODES)
+def test_title_scores_and_threshold_match_float32(synthetic, encoder, mode):
+    """Case A 상위 k개와 Case B threshold 통과 공고가 float32 엔진과 같은지"""
+    snapshot, _ = synthetic
+    quantized = make_synthetic_snapshot(N_DOCS, dim=DIM, seed=7, quantization=mode, rescore_k=50)[0]
+    for title_vec in encoder.encode(SAMPLE_TITLES):
+        ref, got = snapshot.engine, quantized.engine
+        assert got.rank(got.title_scores(title_vec)) == ref.rank(ref.title_scores(title_vec))
+        np.testing.assert_array_equal(
+            got.title_pass_mask(title_vec, TITLE_THRESHOLD), ref.title_pass_mask(title_vec, TITLE_THRESHOLD)
+        )
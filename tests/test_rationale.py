@@ -0,0 +1,155 @@
+import re
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from benchmark import StubEncoder
+from rationale import (
+    FALLBACK_NOTICE, NOT_FOUND_TEXT, AsyncRationaleRunner, BackgroundStream, encode_within_budget,
+    explain_locally, generate_parallel, split_sentences
+)
+from result_cache import ResultCache
+
+SOFT_FILTER = {
+    "주요업무": {"조건": ["데이터 파이프라인 구축"], "가중치": 0.5},
+    "자격요건및우대사항": {"조건": ["Python", "SQL"], "가중치": 0.5},
+}
+
+
+def top_frame(n=5):
+    return pd.DataFrame({
+        "공고id": [str(100 + i) for i in range(n)],
+        "공고제목": [f"데이터 엔지니어 {i}" for i in range(n)],
+        "주요업무": ["- 데이터 파이프라인 구축\n- 대시보드 개발\n- 배치 작업 운영"] * n,
+        "자격요건": ["- Python 3년 이상\n- SQL 능숙"] * n,
+        "우대사항": [None] * n,
+    })
+
+
+class SlowEncoder:
+    """텍스트당 delay초가 걸리는 인코더 (CPU 질의 인코더 흉내)"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.stub = StubEncoder(32)
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        time.sleep(self.delay * len(texts))
+        return self.stub.encode(texts)
+
+
+def test_split_sentences():
+    assert split_sentences("- 첫 문장. 둘째 문장\n- 셋째", max_sentences=2) == ["첫 문장.", "둘째 문장"]
+    assert split_sentences(None) == [] and split_sentences(float("nan")) == []
+
+
+def test_explain_locally_format():
+    text = explain_locally(SOFT_FILTER, top_frame(2), SlowEncoder(0.0))
+    blocks = text.split("\n\n")
+    assert blocks[0] == FALLBACK_NOTICE
+    assert sum(b.startswith("🔷**Top") for b in blocks) == 2
+    # 입력한 항목의 필드만, 내용이 없는 필드는 "명확하지 않음"
+    assert text.count("**주요업무:**") == 2 and "혜택및복지" not in text
+    assert text.count(f"**우대사항:** {NOT_FOUND_TEXT}") == 2
+
+
+def test_encode_within_budget_stops_between_batches():
+    encode = SlowEncoder(0.01)
+    texts = [f"문장 {i}" for i in range(40)]
+    vecs = encode_within_budget(encode, texts, budget=0.2, first=3, batch_size=8)
+    # 첫 배치는 사용자 조건(3) + 8문장, 이후 배치는 예산 안에서만
+    assert encode.calls[0] == 11 and 11 <= len(vecs) < len(texts)
+    assert len(encode_within_budget(SlowEncoder(0.0), texts)) == len(texts)
+
+
+def test_fallback_path_respects_budget():
+    # 문장 전부를 인코딩하면 0.8초 이상 걸리는 인코더: 예산 0.3초 안에 끝나야 함
+    top_df = top_frame(5)
+    field_scores = {j_id: {"주요업무": 0.81, "자격요건및우대사항": 0.77} for j_id in top_df["공고id"]}
+    encode = SlowEncoder(0.02)
+    start = time.perf_counter()
+    text = explain_locally(SOFT_FILTER, top_df, encode, field_scores, budget=0.3)
+    elapsed = time.perf_counter() - start
+    assert elapsed < 0.3 + 0.2 and sum(encode.calls) < 40
+    # 인코딩하지 못한 공고도 검색 단계 유사도와 필드 요약으로 설명
+    assert sum(b.startswith("🔷**Top") for b in text.split("\n\n")) == 5
+    assert "유사도는 0.81이며, 공고의 해당 내용은 \"데이터 파이프라인 구축 / 대시보드 개발 / 배치 작업 운영\"입니다." in text
+
+
+def test_background_stream_deadline():
+    def slow_tokens():
+        time.sleep(0.3)
+        yield "늦은 "
+        yield "응답"
+
+    stream = BackgroundStream(slow_tokens())
+    assert not stream.wait_first(0.05)
+    assert stream.result(timeout=2) == "늦은 응답"
+    assert list(stream) == ["늦은 ", "응답"]
+
+
+class FakeCompletions:
+    """AsyncOpenAI chat.completions 대역: 프롬프트의 공고 제목을 토큰 2개로 나눠 스트리밍"""
+
+    def __init__(self, fail_title=None):
+        self.prompts = []
+        self.fail_title = fail_title
+
+    async def create(self, model, messages, temperature, stream):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        title = re.search(r"\*\*(.+?)\*\*", prompt.split("추천된 채용 공고 내용:")[1]).group(1)
+        if title == self.fail_title:
+            raise RuntimeError("rate limited")
+
+        async def chunks():
+            for text in (f"{title} ", "설명"):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+        return chunks()
+
+
+@pytest.fixture
+def runner():
+    completions = FakeCompletions()
+    runner = AsyncRationaleRunner(lambda: SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    runner.completions = completions
+    yield runner
+    runner.close()
+
+
+def test_generate_parallel_orders_by_rank_and_caches_postings(runner):
+    top_df = top_frame(3)
+    cache = ResultCache(name="posting_rationale_cache", llm_values=True)
+    timing = {}
+    text = "".join(generate_parallel(runner, SOFT_FILTER, top_df, timing, cache=cache, version="v1"))
+    assert text == "\n\n".join(
+        f"🔷**Top {i + 1}: 데이터 엔지니어 {i}**\n\n데이터 엔지니어 {i} 설명" for i in range(3)
+    )
+    assert timing["posting_calls"] == 3 and timing["posting_cache_hits"] == 0
+    assert timing["prompt_tokens"] > 0 and "ttft" in timing and "total" in timing
+
+    # 순위가 바뀐 다음 질의: 캐시된 공고는 호출하지 않고 새 공고만 요청
+    reordered = pd.concat([top_frame(4).iloc[[3]], top_df.iloc[[1, 0]]], ignore_index=True)
+    timing = {}
+    text = "".join(generate_parallel(runner, SOFT_FILTER, reordered, timing, cache=cache, version="v1"))
+    assert timing["posting_calls"] == 1 and timing["posting_cache_hits"] == 2
+    assert len(runner.completions.prompts) == 4
+    assert text.startswith("🔷**Top 1: 데이터 엔지니어 3**\n\n데이터 엔지니어 3 설명")
+    assert "🔷**Top 3: 데이터 엔지니어 0**\n\n데이터 엔지니어 0 설명" in text
+
+
+def test_generate_parallel_failure_is_not_cached(runner):
+    runner.completions.fail_title = "데이터 엔지니어 1"
+    cache = ResultCache()
+    timing = {}
+    text = "".join(generate_parallel(runner, SOFT_FILTER, top_frame(2), timing, cache=cache, version="v1"))
+    assert "rate limited" in timing["error"] and "🔷**Top 2: 데이터 엔지니어 1**" in text
+    # 실패한 공고만 다시 요청
+    runner.completions.fail_title = None
+    timing = {}
+    "".join(generate_parallel(runner, SOFT_FILTER, top_frame(2), timing, cache=cache, version="v1"))
+    assert timing["posting_calls"] == 1 and "error" not in timing
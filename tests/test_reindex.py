@@ -0,0 +1,148 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hard_filter import HardFilterIndex
+from ingest import chunk_documents, ingest, latest_delta_version
+from locations import location_dict
+from posting_store import write_frame
+from reindex import SnapshotRefresher, classify_document, documents_by_key, reindex, reuse_existing_id
+from scoring import ScoringEngine
+from snapshot import EmbeddingSnapshot
+from sparse_index import SPARSE_FIELD, SPARSE_INDEX_NAME, SparseIndex
+
+from fake_index import FakeCollection, install
+from test_ingest import posting_table
+
+
+def changed_table(old: pd.DataFrame) -> pd.DataFrame:
+    """
+    - 0행 삭제 (이후 행 번호가 한 칸씩 밀림)
+    - 8행 주요업무 변경, 6행 경력만 변경, 7행 주요업무 삭제
+    - 중복 공고id(3, 4행) 중 두 번째 행의 자격요건만 변경
+    - 새 공고 추가
+    """
+    new = old.copy()
+    new.loc[8, "주요업무"] = "실시간 스트리밍 처리"
+    new.loc[6, "경력"] = 9
+    new.loc[7, "주요업무"] = None
+    new.loc[4, "자격요건"] = "Scala"
+    added = old.iloc[[1]].assign(공고id="999", 공고제목="신규 공고")
+    return pd.concat([new.iloc[1:], added], ignore_index=True)
+
+
+def with_duplicate(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
+    df.loc[4, "공고id"] = df.loc[3, "공고id"]
+    return df
+
+
+def contents(collection) -> dict:
+    """{(공고id, type): [(텍스트, 메타데이터), ...] (문서 id 행 번호 순)}"""
+    by_key = documents_by_key({d: row[2] for d, row in collection.rows.items()})
+    return {key: [collection.rows[d][1:] for d in ids] for key, ids in by_key.items()}
+
+
+@pytest.fixture
+def indexed(tmp_path, monkeypatch, encoder):
+    """초기 테이블로 색인한 (db_path, 원본 경로, 컬렉션)"""
+    collection = install(monkeypatch, encoder)
+    source = str(tmp_path / "postings.arrow")
+    write_frame(with_duplicate(posting_table()), source)
+    ingest(source, str(tmp_path), chunk_rows=5, sparse=True)
+    return str(tmp_path), source, collection
+
+
+def test_reuse_and_classify():
+    existing = {
+        "7-주요업무-3": {"공고id": "7", "type": "주요업무", "hash": "a", "경력": 1, "근무위치": "세종"},
+        "7-주요업무-4": {"공고id": "7", "type": "주요업무", "hash": "b", "경력": 1, "근무위치": "세종"},
+    }
+    by_key = documents_by_key(existing)
+    assert by_key == {("7", "주요업무"): ["7-주요업무-3", "7-주요업무-4"]}
+    meta = {"공고id": "7", "type": "주요업무", "hash": "a", "경력": 1, "근무위치": "세종"}
+    first = reuse_existing_id(("7-주요업무-0", "t", meta), by_key)
+    second = reuse_existing_id(("7-주요업무-1", "t", {**meta, "hash": "c"}), by_key)
+    third = reuse_existing_id(("7-주요업무-2", "t", meta), by_key)
+    assert [first[0], second[0], third[0]] == ["7-주요업무-3", "7-주요업무-4", "7-주요업무-2"]
+    assert [classify_document(d, existing) for d in (first, second, third)] == ["unchanged", "changed", "new"]
+    assert classify_document((first[0], "t", {**meta, "경력": 2}), existing) == "metadata"
+
+
+def test_reindex_applies_only_the_delta(indexed, tmp_path, monkeypatch, encoder):
+    db_path, source, collection = indexed
+    old_ids = dict(documents_by_key({d: row[2] for d, row in collection.rows.items()}))
+    new_table = changed_table(with_duplicate(posting_table()))
+    write_frame(new_table, source)
+
+    encoded = []
+    original_encode = encoder.encode
+    monkeypatch.setattr(encoder, "encode", lambda texts: encoded.extend(texts) or original_encode(texts))
+    counts = reindex(source, db_path, chunk_rows=5)
+
+    # 새 공고 4개 문서 + 주요업무 변경 1 + 중복 공고 두 번째 행 자격요건 변경 1만 다시 인코딩
+    assert (counts["new"], counts["changed"], counts["metadata"], counts["deleted"]) == (4, 2, 4, 4)
+    assert len(encoded) == 6 and "Scala" in encoded
+    # 행이 밀려도 남은 문서는 기존 id 유지 (중복 공고id는 행 순서대로)
+    for key, ids in documents_by_key({d: row[2] for d, row in collection.rows.items()}).items():
+        if key[0] != "999":
+            assert ids == old_ids[key][:len(ids)]
+
+    # 새 테이블을 처음부터 색인한 결과와 내용이 같음
+    fresh = FakeCollection()
+    install(monkeypatch, encoder, fresh)
+    write_frame(new_table, str(tmp_path / "fresh.arrow"))
+    (tmp_path / "fresh").mkdir()
+    ingest(str(tmp_path / "fresh.arrow"), str(tmp_path / "fresh"), chunk_rows=5, sparse=True)
+    assert contents(collection) == contents(fresh)
+    for d_id, (emb, text, _) in collection.rows.items():
+        np.testing.assert_allclose(emb, original_encode([text])[0])
+
+    # sparse 역색인도 처음부터 만든 색인과 같은 점수
+    delta = SparseIndex.load(f"{db_path}/{SPARSE_INDEX_NAME}")
+    rebuilt = SparseIndex.load(str(tmp_path / "fresh" / SPARSE_INDEX_NAME))
+    job_ids = sorted(set(new_table["공고id"]))
+    engine = ScoringEngine(np.eye(len(job_ids), dtype=np.float32), job_ids, [SPARSE_FIELD] * len(job_ids))
+    query = encoder.encode_sparse(["Python Scala Spark 4 5"])
+    np.testing.assert_allclose(delta.job_scores(query, engine), rebuilt.job_scores(query, engine), atol=1e-6)
+    assert sorted(delta.doc_ids) == sorted(d for d, row in collection.rows.items() if row[2]["type"] == SPARSE_FIELD)
+
+    # 바뀐 것이 없으면 아무것도 하지 않음
+    before = latest_delta_version(db_path)
+    counts = reindex(source, db_path, chunk_rows=5)
+    assert counts["unchanged"] == len(collection.rows) and latest_delta_version(db_path) == before
+
+
+def snapshot_rows(snapshot) -> dict:
+    return {
+        d: (snapshot.job_ids[i], snapshot.types[i], snapshot.experience[i], snapshot.embeddings[i].tolist())
+        for i, d in enumerate(snapshot.doc_ids)
+    }
+
+
+def test_refresher_applies_delta_in_background(indexed):
+    db_path, source, collection = indexed
+    refresher = SnapshotRefresher(
+        collection, db_path, lambda s: HardFilterIndex.from_snapshot(s, location_dict), check_interval=0.0
+    )
+    old_state = refresher.current_versioned()
+
+    write_frame(changed_table(with_duplicate(posting_table())), source)
+    reindex(source, db_path, chunk_rows=5)
+
+    # 변경을 발견한 요청은 이전 버전으로 바로 응답
+    assert refresher.current_versioned() is old_state
+    deadline = time.monotonic() + 5
+    while refresher.version != latest_delta_version(db_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    snapshot, index, version = refresher.current_versioned()
+    assert version == latest_delta_version(db_path)
+    expected = EmbeddingSnapshot.from_collection(collection)
+    got_rows, expected_rows = snapshot_rows(snapshot), snapshot_rows(expected)
+    assert got_rows.keys() == expected_rows.keys()
+    for d in expected_rows:
+        assert got_rows[d][:3] == expected_rows[d][:3]
+        np.testing.assert_allclose(got_rows[d][3], expected_rows[d][3], atol=1e-6)
+    assert index.n_rows == len(snapshot)
@@ -0,0 +1,103 @@
+import pytest
+
+import result_cache
+from result_cache import ResultCache, posting_rationale_key, profile_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic 대체 (TTL 검사용)"""
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_profile_key_normalization():
+    soft = {"주요업무": {"가중치": 0.5, "조건": ["API  서버 개발"]}}
+    key = profile_key({"경력": 3, "근무위치": ["서울 강남구", "세종"]}, soft, "Backend 개발자", k=5)
+    assert key == profile_key(
+        {"경력": 3, "근무위치": ["세종", "서울 강남구", "세종"]},
+        {"주요업무": {"가중치": 0.50001, "조건": [" api 서버 개발 "]}}, "backend  개발자", k=5
+    )
+    assert key != profile_key({"경력": 4, "근무위치": ["서울 강남구", "세종"]}, soft, "Backend 개발자", k=5)
+    assert key != profile_key({"경력": 3, "근무위치": ["서울 강남구", "세종"]}, soft, "Backend 개발자", k=10)
+    # 추천 사유 키는 가중치와 무관
+    reweighted = {"주요업무": {"가중치": 1.0, "조건": ["API 서버 개발"]}}
+    assert posting_rationale_key("J1", soft) == posting_rationale_key("J1", reweighted)
+
+
+def test_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    assert cache.get("a", 1) == "A"
+    cache.put("c", 1, "C")
+    assert cache.get("b", 1) is None
+    assert (cache.get("a", 1), cache.get("c", 1)) == ("A", "C")
+    assert cache.stats["evicted"] == 1
+
+
+def test_ttl_expiry(clock):
+    cache = ResultCache(ttl_seconds=10)
+    cache.put("a", 1, "A")
+    clock[0] += 9.9
+    assert cache.get("a", 1) == "A"
+    clock[0] += 0.2
+    assert cache.get("a", 1) is None
+    assert cache.stats["expired"] == 1 and len(cache) == 0
+
+
+def test_version_invalidation_and_rationale():
+    cache = ResultCache()
+    cache.put("a", 1, "A")
+    cache.put_rationale("a", 1, "사유")
+    assert cache.get_rationale("a", 1) == "사유"
+    # 결과를 다시 저장하면 이전 추천 사유는 버림
+    cache.put("a", 1, "A2")
+    assert cache.get_rationale("a", 1) is None
+    # 버전이 바뀌면 무효화, 캐시에 없는 결과에는 추천 사유를 저장하지 않음
+    assert cache.get("a", 2) is None
+    cache.put_rationale("a", 1, "사유")
+    assert cache.get_rationale("a", 1) is None
+    stats = cache.snapshot_stats()
+    assert (stats["invalidated"], stats["hits"], stats["misses"]) == (1, 0, 1)
+
+
+
+
+
+def test_peek_rationale_is_read_only(clock):
+    """이전 버전 / 만료 조회가 새 버전 항목이나 LRU 순서, 통계를 바꾸지 않는지"""
+    cache = ResultCache(max_entries=2, ttl_seconds=10)
+    cache.put("a", 2, "A")
+    cache.put_rationale("a", 2, "사유")
+    cache.put("b", 2, "B")
+    before = dict(cache.stats)
+    assert cache.peek_rationale("a", 1) is None
+    assert cache.peek_rationale("a", 2) == "사유"
+    assert cache.stats == before and len(cache) == 2
+    # peek은 LRU 순서를 갱신하지 않으므로 a가 먼저 제거됨
+    cache.put("c", 2, "C")
+    assert cache.peek_rationale("a", 2) is None and cache.get("b", 2) == "B"
+    clock[0] += 11
+    assert cache.peek_rationale("b", 2) is None and len(cache) == 2
+
+
+def test_fallback_is_shown_but_never_served():
+    """대체 설명은 재표시(peek)에만 쓰이고, 늦은 GPT 응답이 오면 교체되며, get_rationale로는 반환하지 않음"""
+    cache = ResultCache()
+    cache.put("a", 1, "A")
+    cache.put_fallback("a", 1, "대체")
+    assert cache.peek_rationale("a", 1) == "대체" and cache.rationale_pending("a", 1)
+    assert cache.get_rationale("a", 1) is None
+    cache.finish_fallback("a", 1, "늦은 사유")
+    assert not cache.rationale_pending("a", 1)
+    assert cache.peek_rationale("a", 1) == "늦은 사유" and cache.get_rationale("a", 1) == "늦은 사유"
+
+    # 늦은 응답이 실패하면 대기만 해제하고 대체 설명은 계속 재표시
+    cache.put("b", 1, "B")
+    cache.put_fallback("b", 1, "대체")
+    cache.finish_fallback("b", 1)
+    assert not cache.rationale_pending("b", 1)
+    assert cache.peek_rationale("b", 1) == "대체" and cache.get_rationale("b", 1) is None
+    assert not cache.rationale_pending("missing", 1)
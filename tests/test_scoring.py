@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+import baseline
+from benchmark import CASES, random_profile
+from pipeline import build_soft_filter_dict, recommend
+from scoring import ScoringEngine, normalize_rows, top_k
+
+N_PROFILES = 40
+
+
+def profile_args(profile: dict) -> tuple:
+    soft_filter_dict = build_soft_filter_dict(
+        profile["job_task"], profile["job_task_importance"],
+        profile["job_skills"], profile["job_skills_importance"],
+        profile["job_benefits"], profile["job_benefits_importance"]
+    )
+    hard_filter_dict = {"경력": profile["experience"], "근무위치": profile["regions"]}
+    return hard_filter_dict, soft_filter_dict, profile["job_title"].strip()
+
+
+def assert_same_ranking(got, expected):
+    assert [j_id for j_id, _ in got] == [j_id for j_id, _ in expected]
+    np.testing.assert_allclose([s for _, s in got], [s for _, s in expected], rtol=0, atol=1e-5)
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_recommend_matches_baseline(synthetic, hard_index, encoder, case):
+    """pipeline.recommend 상위 k개가 기존 문서 단위 반복문과 순서 / 점수까지 같은지"""
+    snapshot, _ = synthetic
+    rng = np.random.default_rng(CASES.index(case))
+    embed = lambda text: encoder.encode([text if text.strip() else " "])[0]  # noqa: E731
+    for _ in range(N_PROFILES):
+        hard_filter_dict, soft_filter_dict, job_title = profile_args(random_profile(rng, case))
+        rec = recommend(snapshot, hard_index, encoder.encode, hard_filter_dict, soft_filter_dict, job_title, k=5)
+        assert rec.case == case
+        expected = baseline.recommend(snapshot, embed, hard_filter_dict, soft_filter_dict, job_title, k=5)
+        assert_same_ranking(rec.ranked, expected)
+        assert bool(rec.warning) == (not expected)
+
+
+def test_soft_filter_scores_match_loop(synthetic, encoder):
+    """여러 키워드(평균) / 빈 필드가 섞여도 공고별 가중합이 calc_soft_filter_scores와 같은지"""
+    snapshot, _ = synthetic
+    soft_filter_dict = {
+        "주요업무": {"가중치": 0.5, "조건": ["API 서버 개발", "모델 학습 및 배포"]},
+        "혜택및복지": {"가중치": 0.3, "조건": ["재택근무"]},
+        "자격요건및우대사항": {"가중치": 0.2, "조건": []},
+    }
+    query_vectors = {f: list(encoder.encode(info["조건"])) for f, info in soft_filter_dict.items()}
+    weights = {f: info["가중치"] for f, info in soft_filter_dict.items()}
+    scores = snapshot.engine.soft_filter_scores(query_vectors, weights)
+
+    docs = baseline.hard_filter_docs(snapshot, 100, [])
+    expected = baseline.calc_soft_filter_scores(docs, soft_filter_dict, lambda t: encoder.encode([t])[0])
+    got = {j_id: scores[snapshot.engine.job_index[j_id]] for j_id in expected}
+    np.testing.assert_allclose(list(got.values()), list(expected.values()), rtol=0, atol=1e-5)
+
+
+def test_zero_vectors_score_zero():
+    """norm이 0인 문서 / 질의는 기존 cosine_similarity처럼 0.0"""
+    emb = np.array([[0.0, 0.0], [1.0, 0.0]], dtype=np.float32)
+    engine = ScoringEngine(emb, ["a", "b"], ["주요업무", "주요업무"])
+    scores = engine.soft_filter_scores({"주요업무": [np.array([1.0, 0.0])]}, {"주요업무": 1.0})
+    assert scores.tolist() == [0.0, 1.0]
+    assert not normalize_rows(np.zeros((1, 3))).any()
+
+
+def test_top_k_ties_follow_first_seen_order():
+    """동점은 기존 stable sort처럼 먼저 등장한 공고가 앞 (경계값 동점 포함)"""
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.5, 0.1])
+    assert top_k(scores, 3).tolist() == [1, 3, 0]
+    assert top_k(scores, 4).tolist() == [1, 3, 0, 2]
+    order = np.array([5, 4, 3, 2, 1, 0])
+    assert top_k(scores, 3, order=order).tolist() == [3, 1, 4]
+    assert top_k(scores, 2, candidates=[0, 2, 5]).tolist() == [0, 2]
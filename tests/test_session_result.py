@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from session_result import SessionResult, state_bytes
+
+
+@pytest.fixture
+def result():
+    df = pd.DataFrame({"공고id": [101, "102", "103", "104", "105"], "최종점수": [0.9, 0.8, 0.7, 0.6, 0.5]})
+    return SessionResult.from_frame(df, "B", "k" * 32, "v1")
+
+
+def test_session_result_keeps_only_ids_scores_and_keys(result):
+    assert SessionResult.__slots__ == ("case", "job_ids", "scores", "cache_key", "index_version")
+    assert result.job_ids == ("101", "102", "103", "104", "105") and len(result) == 5
+    # 추천 사유 같은 다른 값은 세션 결과에 붙일 수 없음 (결과 캐시에만 보관)
+    with pytest.raises(AttributeError):
+        result.explanation = "사유"
+
+
+def test_page(result):
+    assert result.page(0, 2) == (["101", "102"], {"101": 0.9, "102": 0.8})
+    assert result.page(2, 2) == (["105"], {"105": 0.5})
+    assert result.page(3, 2) == ([], {})
+
+
+def test_state_bytes_counts_referenced_values(result):
+    size = state_bytes(result)
+    assert size > state_bytes(result.job_ids)
+    assert state_bytes({"analysis_result": result}) > size
+    shared = ["같은 문자열" * 10]
+    assert state_bytes([shared, shared]) < 2 * state_bytes(shared)
@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmark import make_synthetic_snapshot
+from shared_snapshot import SharedSnapshotStore
+from snapshot import _is_mapped
+
+
+def small_snapshot(seed: int):
+    return make_synthetic_snapshot(40, dim=16, seed=seed)[0]
+
+
+def test_get_or_publish_builds_once(tmp_path):
+    """같은 버전을 동시에 요청해도 한 번만 만들어 발행하고 모두 같은 메모리 매핑 스냅샷을 attach"""
+    store = SharedSnapshotStore(str(tmp_path))
+    builds = []
+
+    def build():
+        builds.append(1)
+        return small_snapshot(0)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: store.get_or_publish(3, build), range(16)))
+    assert len(builds) == 1
+    expected = small_snapshot(0)
+    for snapshot, version in results:
+        assert version == 3
+        assert _is_mapped(snapshot.embeddings) and snapshot.nbytes == 0
+        np.testing.assert_allclose(snapshot.embeddings, expected.embeddings)
+        np.testing.assert_array_equal(snapshot.doc_ids, expected.doc_ids)
+
+    # 이미 더 새 버전이 있으면 만들지 않고 그 버전을 attach
+    assert store.get_or_publish(2, build)[1] == 3 and len(builds) == 1
+
+
+def test_prune_keeps_recent_versions(tmp_path):
+    store = SharedSnapshotStore(str(tmp_path), keep=2)
+    for version in range(1, 5):
+        store.get_or_publish(version, lambda: small_snapshot(version))
+    assert sorted(p.name for p in tmp_path.iterdir() if p.name.isdigit()) == ["00000003", "00000004"]
+    assert store.current_version() == 4
+    np.testing.assert_allclose(store.attach().embeddings, small_snapshot(4).embeddings)
+
+
+def test_concurrent_publishers_never_attach_a_pruned_version(tmp_path):
+    """다른 프로세스가 더 새 버전을 발행하고 이전 버전을 지워도 get_or_publish / attach가 실패하지 않음"""
+    store = SharedSnapshotStore(str(tmp_path), keep=1)
+    snapshot = small_snapshot(0)
+    errors = []
+    start = threading.Barrier(8)
+
+    def publisher(worker):
+        start.wait()
+        try:
+            for version in range(worker, 120, 8):
+                got, got_version = store.get_or_publish(version, lambda: snapshot)
+                assert got_version >= version and len(got) == len(snapshot)
+                store.attach()
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=publisher, args=(w,)) for w in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
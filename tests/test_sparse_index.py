@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from scoring import ScoringEngine
+from sparse_index import SparseIndex, sparse_prune_mask
+
+
+def engine_for(job_ids) -> ScoringEngine:
+    return ScoringEngine(np.eye(len(job_ids), dtype=np.float32), job_ids, ["자격요건및우대사항"] * len(job_ids))
+
+
+def naive_scores(docs, query_weights, engine) -> np.ndarray:
+    """문서별 {토큰: 가중치}와 질의의 sparse 내적을 공고별로 합산 (키워드 평균)"""
+    scores = np.zeros(engine.n_jobs)
+    for j_id, lw in docs:
+        for qw in query_weights:
+            dot = sum(float(np.float16(w)) * qw.get(t, 0.0) for t, w in lw.items())
+            scores[engine.job_index[j_id]] += dot / len(query_weights)
+    return scores
+
+
+DOCS = [
+    ("J1", {1: 0.3, 2: 0.2}),
+    ("J2", {2: 0.25, 3: 0.1}),
+    ("J3", {1: 0.05, 4: 0.3}),
+]
+
+
+def test_job_scores_match_naive_dot():
+    index = SparseIndex.from_weights([j for j, _ in DOCS], [lw for _, lw in DOCS], ["d1", "d2", "d3"])
+    engine = engine_for(["J3", "J1", "J2", "J4"])
+    queries = [{1: 0.5, 2: 0.1}, {4: 0.2, 99: 1.0}]
+    np.testing.assert_allclose(index.job_scores(queries, engine), naive_scores(DOCS, queries, engine), atol=1e-6)
+    assert not index.job_scores([], engine).any()
+    mask = sparse_prune_mask(index.job_scores(queries, engine), np.ones(4, dtype=bool), top_n=1)
+    assert mask.tolist() == [False, True, False, False]
+
+
+def test_save_load_roundtrip(tmp_path):
+    index = SparseIndex.from_weights([j for j, _ in DOCS], [lw for _, lw in DOCS], ["d1", "d2", "d3"])
+    path = str(tmp_path / "sparse.npz")
+    index.save(path)
+    loaded = SparseIndex.load(path)
+    for name in ("job_ids", "doc_ids", "tokens", "offsets", "post_jobs", "post_weights"):
+        np.testing.assert_array_equal(getattr(loaded, name), getattr(index, name))
+
+
+def test_apply_delta_replaces_only_changed_documents():
+    """같은 공고id가 두 행(문서)에 있을 때 한 문서의 변경 / 삭제가 다른 문서를 건드리지 않는지"""
+    docs = {"dup-a": ("J1", {1: 0.3}), "dup-b": ("J1", {2: 0.2}), "other": ("J2", {3: 0.1})}
+    index = SparseIndex.from_weights([j for j, _ in docs.values()], [lw for _, lw in docs.values()], list(docs))
+    engine = engine_for(["J1", "J2"])
+    query = [{1: 1.0, 2: 1.0, 3: 1.0, 5: 1.0}]
+
+    # dup-a 변경: dup-b는 유지
+    changed = index.apply_delta(["dup-a"], ["J1"], [{5: 0.4}])
+    expected = {"dup-a": ("J1", {5: 0.4}), "dup-b": docs["dup-b"], "other": docs["other"]}
+    np.testing.assert_allclose(
+        changed.job_scores(query, engine), naive_scores(expected.values(), query, engine), atol=1e-6
+    )
+    assert sorted(changed.doc_ids) == sorted(expected)
+
+    # dup-a 삭제: dup-b의 posting은 남음
+    deleted = index.apply_delta([], [], [], ["dup-a"])
+    remaining = [docs["dup-b"], docs["other"]]
+    np.testing.assert_allclose(deleted.job_scores(query, engine), naive_scores(remaining, query, engine), atol=1e-6)
+
+    # 새 문서 추가
+    added = index.apply_delta(["new"], ["J2"], [{1: 0.1}])
+    assert len(added) == 4 and "new" in added.doc_ids
+
+
+def test_apply_delta_requires_doc_ids():
+    index = SparseIndex.from_weights(["J1"], [{1: 0.3}])
+    with pytest.raises(ValueError):
+        index.apply_delta(["d1"], ["J1"], [{1: 0.1}])
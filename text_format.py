@@ -0,0 +1,77 @@
+import pandas as pd
+
+############################
+# 들여쓰기 처리를 위한 기호 목록
+############################
+INDENTATION_MARKERS = [
+    "1)", "2)", "3)", "4)", "5)", "6)", "7)", "8)", "9)", "10)", "-", "[",
+    "1. ", "2. ", "3. ", "4. ", "5. ", "6. ", "7. ", "8. ", "9.", "10. ",
+    "■", "●", "ㆍ", "·", "•", "ㅇ", "“", "‘", "[1]", "[2]", "[3]", "[4]", "[5]", "[6]", "[7]", "[8]", "[9]", "[10]",
+    "(1)", "(2)", "(3)", "(4)", "(5)", "(6)", "(7)", "(8)", "(9)", "(10)", "○", "▪", "▶", "•", "【"
+]
+# str.startswith에 튜플로 넘겨 줄마다 한 번만 비교
+_MARKER_PREFIXES = tuple(INDENTATION_MARKERS)
+
+############################
+# 공통 유틸 함수 (apply_indentation)
+############################
+def apply_indentation(text):
+    lines = text.split('\n')
+    indented_lines = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith(_MARKER_PREFIXES):
+            indented_lines.append(f"    {stripped}")
+        else:
+            indented_lines.append(line)
+    return '\n'.join(indented_lines)
+
+############################
+# 화면 표시용 텍스트 사전 계산 (공고 저장소 변환 시 1회)
+############################
+# 카드에는 미리보기 컬럼만 읽어 표시하고,
+# 전체 텍스트(들여쓰기 적용본)는 사용자가 상세 보기를 펼칠 때만 공고 저장소에서 읽는다.
+DETAIL_FIELDS = {
+    "주요업무": "주요 업무",
+    "자격요건": "자격 요건",
+    "우대사항": "우대 사항",
+    "혜택및복지": "혜택 및 복지",
+}
+PREVIEW_CHARS = 100
+
+
+def display_column(field: str) -> str:
+    """들여쓰기 적용된 전체 텍스트 컬럼명"""
+    return f"{field}_표시"
+
+
+def preview_column(field: str) -> str:
+    """카드 미리보기 컬럼명 (PREVIEW_CHARS자 + '...')"""
+    return f"{field}_미리보기"
+
+
+def format_display(text) -> str:
+    """결측치/빈 문자열은 빈 문자열, 그 외에는 들여쓰기 적용"""
+    if text is None or (not isinstance(text, str) and pd.isna(text)) or not text:
+        return ""
+    return apply_indentation(str(text))
+
+
+def preview_text(text: str, char_limit: int = PREVIEW_CHARS) -> str:
+    return text if len(text) <= char_limit else text[:char_limit] + "..."
+
+
+def add_display_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """DETAIL_FIELDS별 표시용(_표시) / 미리보기(_미리보기) 컬럼 추가"""
+    df = df.copy()
+    for field in DETAIL_FIELDS:
+        if field not in df.columns:
+            continue
+        display = df[field].map(format_display)
+        df[display_column(field)] = display
+        df[preview_column(field)] = display.map(preview_text)
+    return df
+
+
+def has_display_columns(columns) -> bool:
+    return all(preview_column(f) in columns and display_column(f) in columns for f in DETAIL_FIELDS)
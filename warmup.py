@@ -0,0 +1,86 @@
+import logging
+import threading
+import time
+
+############################
+# 프로세스 시작 시 백그라운드 워밍업 + 준비 상태 신호
+############################
+# 무거운 리소스(BGE 모델 + 더미 encode, 임베딩 스냅샷, 하드필터 인덱스, 공고 저장소)를
+# 프로세스 시작 직후 백그라운드 스레드에서 미리 로드한다.
+# - 단계별 로드 시간과 전체 준비 시간(프로세스 시작 -> ready)을 기록
+# - 준비 완료 시 ready_file(선택)을 생성해 외부 헬스체크가 확인할 수 있도록 함
+# - 요청 지연은 프로세스의 첫 요청과 이후 요청을 구분해 기록
+
+logger = logging.getLogger(__name__)
+
+# 이 모듈이 처음 import된 시점 = Streamlit 프로세스에서 스크립트가 처음 실행된 시점
+PROCESS_START = time.perf_counter()
+
+
+class Warmup:
+    """
+    steps: [(단계 이름, 인자 없는 로드 함수), ...]
+    ready_file: 준비 완료 시 생성할 파일 경로 (None이면 생성하지 않음)
+    """
+
+    def __init__(self, steps, ready_file=None):
+        self.steps = list(steps)
+        self.ready_file = ready_file
+        self.status = "pending"
+        self.timings = {}
+        self.error = None
+        self.startup_seconds = None
+        self.first_request_seconds = None
+        self.request_count = 0
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self) -> "Warmup":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        self.status = "running"
+        try:
+            for name, load in self.steps:
+                step_start = time.perf_counter()
+                load()
+                self.timings[name] = time.perf_counter() - step_start
+                logger.info("warmup step %s: %.2fs", name, self.timings[name])
+            self.status = "ready"
+        except Exception as e:
+            # 워밍업 실패 시에도 요청 처리 시점에 기존처럼 지연 로드됨
+            self.status = "failed"
+            self.error = e
+            logger.exception("warmup failed")
+        finally:
+            self.startup_seconds = time.perf_counter() - PROCESS_START
+            logger.info("warmup %s: startup=%.2fs", self.status, self.startup_seconds)
+            if self.status == "ready" and self.ready_file:
+                with open(self.ready_file, "w") as f:
+                    f.write(f"{self.startup_seconds:.3f}\n")
+            self._ready.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def wait(self, timeout=None) -> bool:
+        """워밍업 종료(성공/실패)까지 대기"""
+        return self._ready.wait(timeout)
+
+    def record_request(self, seconds: float) -> bool:
+        """
+        요청 처리 시간 기록. 프로세스의 첫 요청이면 True
+        """
+        with self._lock:
+            self.request_count += 1
+            first = self.request_count == 1
+            if first:
+                self.first_request_seconds = seconds
+        logger.info("request latency=%.3fs first=%s warmup=%s", seconds, first, self.status)
+        return first
+